@@ -0,0 +1,415 @@
+# analitica.py
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cache
+import consultas
+import perfilador
+from db import consultar, consultar_tabla, leer_de_replica
+
+# Réplica analítica local en DuckDB: una copia columnar de ventas y egresos que
+# un hilo en segundo plano trae de Postgres cada ANALITICA_INTERVALO segundos.
+# Las tablas de análisis del Dashboard (por día, por método y mensual) se
+# calculan sobre ella en vez de sobre la base que recibe las ventas de la caja.
+# Es opcional (duckdb está en requirements-opcional.txt): sin duckdb instalado,
+# con ANALITICA_ACTIVA=0 o si la réplica quedó atrasada, el Dashboard vuelve a
+# consultar Postgres y lo avisa.
+ANALITICA_ACTIVA = os.getenv("ANALITICA_ACTIVA", "1") == "1"
+ANALITICA_PATH = os.getenv("ANALITICA_PATH", str(Path(__file__).resolve().parent / "replica_analitica.duckdb"))
+# Segundos entre sincronizaciones
+ANALITICA_INTERVALO = float(os.getenv("ANALITICA_INTERVALO", 30))
+# Filas que se traen de Postgres por consulta
+ANALITICA_LOTE = int(os.getenv("ANALITICA_LOTE", 50000))
+# Segundos de atraso a partir de los cuales el Dashboard deja de usar la réplica
+ANALITICA_MAX_RETRASO = float(os.getenv("ANALITICA_MAX_RETRASO", 600))
+# Margen (segundos) hacia atrás desde la última verificación al buscar días
+# modificados: cubre transacciones largas que confirman después con una marca anterior
+ANALITICA_MARGEN = float(os.getenv("ANALITICA_MARGEN", 3600))
+
+# Columnas replicadas y resumen diario con el que se verifica cada tabla
+TABLAS = {
+    "ventas": (["id", "fecha", "sucursal", "metodo_pago", "monto", "ingreso", "deuda"], "resumen_ventas_diario"),
+    "egresos": (["id", "fecha", "sucursal", "motivo", "monto"], "resumen_egresos_diario"),
+}
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS ventas (
+        id BIGINT PRIMARY KEY,
+        fecha TIMESTAMP NOT NULL,
+        sucursal VARCHAR NOT NULL,
+        metodo_pago VARCHAR,
+        monto DECIMAL(12,2),
+        ingreso DECIMAL(12,2),
+        deuda DECIMAL(12,2)
+    );
+    CREATE TABLE IF NOT EXISTS egresos (
+        id BIGINT PRIMARY KEY,
+        fecha TIMESTAMP NOT NULL,
+        sucursal VARCHAR NOT NULL,
+        motivo VARCHAR,
+        monto DECIMAL(12,2)
+    );
+    CREATE TABLE IF NOT EXISTS sincronizacion (
+        tabla VARCHAR PRIMARY KEY,
+        ultimo_id BIGINT NOT NULL,
+        -- NULL hasta que la primera sincronización de la réplica termina
+        sincronizada_en TIMESTAMP
+    );
+    -- Hora de Postgres de la última verificación contra los resúmenes diarios
+    ALTER TABLE sincronizacion ADD COLUMN IF NOT EXISTS verificada_en TIMESTAMP;
+"""
+
+# La hora de sincronización solo cambia cuando terminan todas las tablas
+GUARDAR_MARCA = """
+    INSERT INTO sincronizacion (tabla, ultimo_id) VALUES (?, ?)
+    ON CONFLICT (tabla) DO UPDATE SET ultimo_id = excluded.ultimo_id
+"""
+
+# Totales por día de los resúmenes de Postgres; incluyen los meses archivados
+TOTALES_POSTGRES = """
+    SELECT dia, SUM(cantidad)::BIGINT, SUM(monto)
+    FROM {resumen}
+    {filtro}
+    GROUP BY dia
+    HAVING SUM(cantidad) > 0
+"""
+
+# Días que los triggers de resumen tocaron desde ``desde`` (migraciones/0019)
+DIAS_MODIFICADOS = """
+    SELECT DISTINCT dia, CURRENT_TIMESTAMP::TIMESTAMP
+    FROM {resumen}
+    WHERE actualizado_en >= %s
+"""
+
+MESES_ARCHIVADOS = "SELECT mes, archivo FROM meses_archivados WHERE tabla = %s"
+
+# Días cuya cantidad o monto no coincide entre la réplica y Postgres
+DIAS_DISTINTOS = """
+    WITH Replica AS (
+        SELECT CAST(fecha AS DATE) as dia, COUNT(*) as cantidad, SUM(COALESCE(monto, 0)) as monto
+        FROM {tabla}
+        {filtro}
+        GROUP BY 1
+    ),
+    Postgres AS (
+        SELECT CAST(dia AS DATE) as dia, cantidad, CAST(monto AS DECIMAL(16,2)) as monto FROM totales_postgres
+    )
+    SELECT COALESCE(p.dia, r.dia) as dia
+    FROM Postgres p
+    FULL JOIN Replica r ON r.dia = p.dia
+    WHERE p.cantidad IS DISTINCT FROM r.cantidad OR p.monto IS DISTINCT FROM r.monto
+    ORDER BY 1
+"""
+
+# ---------- CONSULTAS DEL DASHBOARD ----------
+# Mismas columnas y orden que las de consultas.py, pero sobre las filas de la réplica
+MOVIMIENTOS_POR_DIA = """
+    SELECT
+        CASE dayofweek(fecha)
+            WHEN 1 THEN 'Lunes'
+            WHEN 2 THEN 'Martes'
+            WHEN 3 THEN 'Miércoles'
+            WHEN 4 THEN 'Jueves'
+            WHEN 5 THEN 'Viernes'
+            WHEN 6 THEN 'Sábado'
+            WHEN 0 THEN 'Domingo'
+        END AS dia_semana,
+        COUNT(*) as cantidad_ventas,
+        CAST(SUM(COALESCE(monto, 0)) AS DOUBLE) as monto_total,
+        CAST(SUM(COALESCE(ingreso, 0)) AS DOUBLE) as ingreso_real,
+        CAST(SUM(COALESCE(deuda, 0)) AS DOUBLE) as deuda_total,
+        CAST(SUM(COALESCE(monto, 0)) / COUNT(*) AS DOUBLE) as promedio_venta
+    FROM ventas
+    WHERE fecha >= ? AND fecha < ?
+    GROUP BY dayofweek(fecha)
+    ORDER BY dayofweek(fecha)
+"""
+
+MOVIMIENTOS_POR_METODO = """
+    SELECT
+        COALESCE(metodo_pago, 'Sin especificar') as metodo_pago,
+        COUNT(*) as cantidad_ventas,
+        CAST(SUM(COALESCE(monto, 0)) AS DOUBLE) as monto_total,
+        CAST(SUM(COALESCE(ingreso, 0)) AS DOUBLE) as ingreso_real,
+        CAST(SUM(COALESCE(deuda, 0)) AS DOUBLE) as deuda_pendiente,
+        CAST(SUM(COALESCE(monto, 0)) / COUNT(*) AS DOUBLE) as promedio_venta
+    FROM ventas
+    WHERE fecha >= ? AND fecha < ?
+    GROUP BY 1
+    ORDER BY monto_total DESC
+"""
+
+# Sin vista materializada: DuckDB agrupa los meses directamente desde las ventas
+MOVIMIENTOS_MENSUALES = """
+    SELECT
+        CAST(DATE_TRUNC('month', fecha) AS DATE) as mes,
+        COUNT(*) as cantidad_ventas,
+        CAST(SUM(COALESCE(ingreso, 0)) AS DOUBLE) as monto_total,
+        CAST(SUM(COALESCE(ingreso, 0)) AS DOUBLE) as ingreso_real,
+        CAST(SUM(COALESCE(deuda, 0)) AS DOUBLE) as deuda_pendiente,
+        CAST(COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago = 'Efectivo'), 0) AS DOUBLE) as total_efectivo,
+        CAST(COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago IN ('Mercado Pago', 'Cuenta DNI')), 0) AS DOUBLE)
+            as total_digital,
+        CAST(SUM(COALESCE(ingreso, 0)) / COUNT(*) AS DOUBLE) as promedio_venta
+    FROM ventas
+    WHERE fecha >= $desde
+    GROUP BY 1
+    ORDER BY mes DESC
+"""
+
+
+class ReplicaAnalitica:
+    def __init__(self, ruta=ANALITICA_PATH):
+        import duckdb
+
+        self._conn = duckdb.connect(ruta)
+        self._conn.execute(ESQUEMA)
+        # Solo el hilo de sincronización escribe; las lecturas usan su propio cursor
+        self._lock = threading.Lock()
+        sincronizadas, sincronizada_en = self._conn.execute(
+            "SELECT COUNT(sincronizada_en), MIN(sincronizada_en) FROM sincronizacion"
+        ).fetchone()
+        self._sincronizada_en = sincronizada_en if sincronizadas == len(TABLAS) else None
+        self._hilo = None
+        self._ultimo_error = None
+
+    def estado(self):
+        return {
+            "sincronizada_en": self._sincronizada_en,
+            "al_dia": self.al_dia(),
+            "ultimo_error": self._ultimo_error,
+        }
+
+    def al_dia(self):
+        return (self._sincronizada_en is not None
+                and datetime.now() - self._sincronizada_en <= timedelta(seconds=ANALITICA_MAX_RETRASO))
+
+    def consultar_tabla(self, sql, parametros=None, columnas=None):
+        """(sincronizada_en, DataFrame) con el resultado de ``sql`` sobre la réplica."""
+        sincronizada_en = self._sincronizada_en
+        cur = self._conn.cursor()
+        try:
+            df = cur.execute(sql, parametros).df()
+        finally:
+            cur.close()
+        if columnas:
+            df.columns = columnas
+        return sincronizada_en, df
+
+    def _guardar(self, cur, tabla, lote):
+        """Inserta o reemplaza las filas de ``lote`` y devuelve los (sucursal, día) que tocó."""
+        cur.register("lote", lote)
+        cur.execute(f"INSERT OR REPLACE INTO {tabla} SELECT * FROM lote")
+        cur.unregister("lote")
+        return set(zip(lote["sucursal"], lote["fecha"].dt.date))
+
+    def _traer_nuevas(self, cur, tabla):
+        """Trae las filas con id mayor que la marca de agua. Devuelve (filas, afectadas)."""
+        columnas, _ = TABLAS[tabla]
+        sql = f"SELECT {', '.join(columnas)} FROM {tabla} WHERE id > %s ORDER BY id LIMIT %s"
+        ultimo_id = (cur.execute("SELECT ultimo_id FROM sincronizacion WHERE tabla = ?", [tabla]).fetchone() or [0])[0]
+        total, afectadas = 0, set()
+        while True:
+            lote = consultar_tabla(sql, (ultimo_id, ANALITICA_LOTE), columnas)
+            if lote.empty:
+                break
+            ultimo_id = int(lote["id"].iloc[-1])
+            cur.execute("BEGIN")
+            afectadas |= self._guardar(cur, tabla, lote)
+            cur.execute(GUARDAR_MARCA, [tabla, ultimo_id])
+            cur.execute("COMMIT")
+            total += len(lote)
+            if len(lote) < ANALITICA_LOTE:
+                break
+        return total, afectadas
+
+    def _dias_distintos(self, cur, tabla, completa):
+        """Días cuyos totales no coinciden con el resumen diario de Postgres.
+
+        Salvo con ``completa`` (o la primera vez), solo se comparan los días que
+        los triggers de resumen tocaron desde la verificación anterior.
+        """
+        _, resumen = TABLAS[tabla]
+        verificada_en = (cur.execute("SELECT verificada_en FROM sincronizacion WHERE tabla = ?",
+                                     [tabla]).fetchone() or [None])[0]
+        if completa or verificada_en is None:
+            ahora = consultar("SELECT CURRENT_TIMESTAMP::TIMESTAMP")[0][0]
+            filtro_postgres, filtro_replica, parametros = "", "", None
+        else:
+            modificados = consultar(DIAS_MODIFICADOS.format(resumen=resumen),
+                                    (verificada_en - timedelta(seconds=ANALITICA_MARGEN),))
+            if not modificados:
+                return [], None
+            ahora = modificados[0][1]
+            dias = sorted(dia for dia, _ in modificados)
+            filtro_postgres, parametros = "WHERE dia = ANY(%(dias)s)", {"dias": dias}
+            filtro_replica = f"WHERE CAST(fecha AS DATE) IN ({', '.join('?' * len(dias))})"
+
+        totales_postgres = consultar_tabla(TOTALES_POSTGRES.format(resumen=resumen, filtro=filtro_postgres),
+                                           parametros, ["dia", "cantidad", "monto"])
+        cur.register("totales_postgres", totales_postgres)
+        try:
+            distintos = cur.execute(DIAS_DISTINTOS.format(tabla=tabla, filtro=filtro_replica),
+                                    dias if filtro_replica else None).fetchall()
+        finally:
+            cur.unregister("totales_postgres")
+        return [dia for (dia,) in distintos], ahora
+
+    def _corregir_dias(self, cur, tabla, completa=False):
+        """Vuelve a copiar los días cuyos totales no coinciden con el resumen diario de Postgres.
+
+        La marca de agua no ve una fila que se confirmó después de otra con id
+        mayor, ni las que se corrigen o borran; los resúmenes diarios sí, porque
+        los triggers los actualizan en la misma transacción. Los días de meses
+        archivados se copian del Parquet del mes (ver archivar.py), así la
+        réplica tiene toda la historia. Devuelve los días corregidos.
+        """
+        columnas, _ = TABLAS[tabla]
+        dias, ahora = self._dias_distintos(cur, tabla, completa)
+
+        archivados = dict(consultar(MESES_ARCHIVADOS, (tabla,)))
+        sql = f"SELECT {', '.join(columnas)} FROM {tabla} WHERE fecha >= %s AND fecha < %s"
+        # Un día de Postgres o el mes archivado completo al que pertenece el día
+        tramos = {}
+        for dia in dias:
+            mes = dia.replace(day=1)
+            if mes in archivados:
+                tramos[mes, consultas.restar_meses(mes, -1)] = archivados[mes]
+            else:
+                tramos[dia, dia + timedelta(days=1)] = None
+
+        for (desde, hasta), archivo in tramos.items():
+            if archivo is not None and not Path(archivo).exists():
+                continue
+            cur.execute("BEGIN")
+            cur.execute(f"DELETE FROM {tabla} WHERE fecha >= ? AND fecha < ?", [desde, hasta])
+            if archivo is not None:
+                cur.execute(
+                    f"INSERT OR REPLACE INTO {tabla} SELECT {', '.join(columnas)} FROM read_parquet(?) "
+                    "WHERE fecha >= ? AND fecha < ?", [archivo, desde, hasta]
+                )
+            else:
+                filas = consultar_tabla(sql, (desde, hasta), columnas)
+                if not filas.empty:
+                    self._guardar(cur, tabla, filas)
+            cur.execute("COMMIT")
+        if ahora is not None:
+            cur.execute("UPDATE sincronizacion SET verificada_en = ? WHERE tabla = ?", [ahora, tabla])
+        return dias
+
+    def sincronizar(self, completa=False):
+        """Trae de Postgres lo nuevo de cada tabla. Devuelve {tabla: (filas nuevas, días corregidos)}.
+
+        Con ``completa`` se comparan contra los resúmenes todos los días y no
+        solo los modificados desde la verificación anterior.
+
+        La réplica queda al día con Postgres tal como estaba al empezar; si
+        Postgres no responde levanta la excepción y la réplica no cambia de hora.
+        """
+        inicio = datetime.now()
+        resultado, afectadas, corregidas = {}, set(), False
+        with self._lock:
+            # Si algo falla a mitad de un lote, cerrar el cursor descarta su transacción
+            cur = self._conn.cursor()
+            try:
+                for tabla in TABLAS:
+                    filas, afectadas_tabla = self._traer_nuevas(cur, tabla)
+                    dias = self._corregir_dias(cur, tabla, completa)
+                    afectadas |= afectadas_tabla
+                    corregidas = corregidas or bool(dias)
+                    resultado[tabla] = (filas, dias)
+                cur.execute("UPDATE sincronizacion SET sincronizada_en = ?", [inicio])
+            finally:
+                cur.close()
+        self._sincronizada_en = inicio
+
+        # Los resultados del Dashboard leídos de la réplica se vuelven a calcular
+        if corregidas:
+            cache.resultados.limpiar()
+        else:
+            for sucursal, dia in afectadas:
+                cache.resultados.invalidar(sucursal, dia)
+        return resultado
+
+    def _bucle(self):
+        perfilador.vista_actual.set("Réplica analítica")
+        # La copia a DuckDB lee de la réplica de Postgres si hay una al día
+        leer_de_replica.set(True)
+        while True:
+            try:
+                self.sincronizar()
+                self._ultimo_error = None
+            except Exception as e:
+                self._ultimo_error = str(e).strip()
+            time.sleep(ANALITICA_INTERVALO)
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._bucle, name="replica-analitica", daemon=True)
+            self._hilo.start()
+        return self
+
+
+# ---------- RÉPLICA DEL PROCESO ----------
+_replica = None
+_error = None
+_replica_lock = threading.Lock()
+
+
+def obtener_replica():
+    """La réplica del proceso con su sincronización en marcha, o None si no se puede usar."""
+    global _replica, _error
+    if not ANALITICA_ACTIVA:
+        return None
+    if _replica is None and _error is None:
+        with _replica_lock:
+            if _replica is None and _error is None:
+                try:
+                    _replica = ReplicaAnalitica().iniciar()
+                except ImportError:
+                    _error = "falta duckdb (pip install -r requirements-opcional.txt)"
+                except Exception as e:
+                    # Por ejemplo, el archivo ya está abierto por otro proceso
+                    _error = str(e).strip()
+    return _replica
+
+
+def estado():
+    """Estado para mostrar en la interfaz: activa, al día, hora de sincronización y último error."""
+    replica = obtener_replica()
+    if replica is None:
+        return {"activa": ANALITICA_ACTIVA, "al_dia": False, "sincronizada_en": None, "ultimo_error": _error}
+    return dict(replica.estado(), activa=True)
+
+
+def consultar_analisis(sql, parametros=None, columnas=None):
+    """(sincronizada_en, DataFrame) de la réplica si está al día; None si hay que ir a Postgres."""
+    replica = obtener_replica()
+    if replica is None or not replica.al_dia():
+        return None
+    return replica.consultar_tabla(sql, parametros, columnas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sincroniza la réplica analítica de ventas y egresos en DuckDB")
+    parser.add_argument("--reconstruir", action="store_true", help="borrar la réplica y copiarla de nuevo")
+    parser.add_argument("--verificar", action="store_true",
+                        help="comparar todos los días con Postgres, no solo los modificados")
+    args = parser.parse_args()
+
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        raise SystemExit("❌ Para la réplica analítica hace falta duckdb (pip install -r requirements-opcional.txt)")
+    if args.reconstruir:
+        for ruta in (Path(ANALITICA_PATH), Path(ANALITICA_PATH + ".wal")):
+            ruta.unlink(missing_ok=True)
+
+    replica = ReplicaAnalitica()
+    for tabla, (filas, dias) in replica.sincronizar(completa=args.verificar).items():
+        print(f"✅ {tabla}: {filas} filas nuevas" + (f", {len(dias)} días corregidos" if dias else ""))
+    print(f"📦 Réplica al {replica.estado()['sincronizada_en']:%d/%m/%Y %H:%M:%S} en {ANALITICA_PATH}")
@@ -1,25 +1,54 @@
 # app.py
 import streamlit as st
-from datetime import datetime, date, timedelta
-import psycopg2
-import os
+from datetime import datetime, date
 import hashlib
 from dotenv import load_dotenv
 import pandas as pd
 import plotly.express as px
-import time
+import psycopg2
 import plotly.graph_objects as go
+from db import conexion, consultar, consultar_tabla, estado_replica, leer_de_replica
+import cache
+import refrescar
+import diario
+import sueldos
+import perfilador
+import exportar
+import paralelo
+import analitica
+import particiones
+import sucursales
+import clientes
+import tempfile
+from pathlib import Path
+import consultas
+from migrar import migrar
 
 st.set_page_config(page_title="Caja Carnicería", layout="wide")
 load_dotenv()
 
 # ---------- FUNCIONES AUXILIARES ----------
 def calcular_vuelto():
-    if st.session_state.dinero_entregado_key > 0 and st.session_state.monto_compra_key > 0:
-        st.session_state.vuelto_calculado = round(st.session_state.dinero_entregado_key - st.session_state.monto_compra_key, 2)
+    dinero_entregado = st.session_state.get("dinero_entregado_key", 0.0)
+    monto_compra = st.session_state.get("monto_compra_key", 0.0)
+    if dinero_entregado > 0 and monto_compra > 0:
+        st.session_state.vuelto_calculado = round(dinero_entregado - monto_compra, 2)
     else:
         st.session_state.vuelto_calculado = 0.0
 
+MESES = {
+    1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
+    5: "Mayo", 6: "Junio", 7: "Julio", 8: "Agosto",
+    9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre"
+}
+
+# Vistas que solo consultan: sus lecturas pueden salir de la réplica (ver db.conexion_lectura)
+VISTAS_EN_REPLICA = ("📊 Dashboard", "💰 Cierre de caja", "👥 Clientes", "📤 Exportar")
+
+def columna_moneda(etiqueta):
+    # El formato lo aplica Streamlit al dibujar: la columna sigue siendo numérica
+    return st.column_config.NumberColumn(etiqueta, format="$%.2f")
+
 # ---------- CONFIGURACIÓN DE USUARIOS ----------
 def make_hashes(password):
     return hashlib.sha256(str.encode(password)).hexdigest()
@@ -33,99 +62,763 @@ usuarios = {
     "cajero2": {"password": make_hashes("1234"), "rol": "cajero"},
 }
 
-# ---------- CONEXIÓN A LA BASE DE DATOS ----------
-def get_connection():
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASS"),
-        port=os.getenv("DB_PORT", 5432)
-    )
-
 # ---------- FUNCIONES DE BASE DE DATOS ----------
-def registrar_venta(sucursal, monto, metodo_pago, entregado, vuelto, ingreso, deuda, cliente_fiado=None, telefono_fiado=None):
-    conn = None
+def registrar_venta(sucursal, monto, metodo_pago, entregado, vuelto, ingreso, deuda, cliente_fiado=None, telefono_fiado=None,
+                    cliente_id=None):
+    # Convertir valores a float y redondear a 2 decimales
+    monto = round(float(monto), 2)
+    entregado = round(float(entregado), 2)
+    vuelto = round(float(vuelto), 2)
+    ingreso = round(float(ingreso), 2)
+    deuda = round(float(deuda), 2)
+
+    # Guardar en el diario local: la venta queda confirmada apenas se escribe
+    # en disco y el sincronizador la envía a Postgres en segundo plano
+    return diario.obtener_diario().encolar("venta", {
+        "sucursal": sucursal,
+        "monto": monto,
+        "metodo_pago": metodo_pago,
+        "entregado": entregado,
+        "vuelto": vuelto,
+        "ingreso": ingreso,
+        "deuda": deuda,
+        "fecha": datetime.now().isoformat(),
+        "cliente_fiado": cliente_fiado,
+        "telefono_fiado": telefono_fiado,
+        "cliente_id": cliente_id
+    })
+
+def registrar_egreso(sucursal, motivo, monto, observacion):
+    # Igual que las ventas: se guarda en el diario local y se sincroniza en segundo plano
+    return diario.obtener_diario().encolar("egreso", {
+        "sucursal": sucursal,
+        "motivo": motivo,
+        "monto": round(float(monto), 2),
+        "observacion": observacion,
+        "fecha": datetime.now().isoformat(),
+        "detalle": None
+    })
+
+def registrar_cobro(sucursal, cliente_id, monto, metodo_pago):
+    # El cobro de un fiado también pasa por el diario; al sincronizarse, el
+    # trigger de movimientos_cliente descuenta el saldo del cliente
+    return diario.obtener_diario().encolar("cobro", {
+        "sucursal": sucursal,
+        "cliente_id": int(cliente_id),
+        "monto": round(float(monto), 2),
+        "metodo_pago": metodo_pago,
+        "fecha": datetime.now().isoformat()
+    })
+
+# Aplicar las migraciones pendientes una sola vez por proceso (no en cada rerun)
+@st.cache_resource(show_spinner="Actualizando base de datos...")
+def preparar_esquema():
+    aplicadas = migrar()
+    # Los meses que vienen quedan particionados desde el arranque
+    particiones.asegurar_particiones()
+    return aplicadas
+
+preparar_esquema()
+
+# ---------- REGISTRO DE OPERACIONES ----------
+# Los formularios de venta y egreso son fragmentos: al registrar solo se
+# redibuja el fragmento y los callbacks limpian los campos antes de mostrarlos,
+# sin sleep ni rerun de toda la app
+ESTILO_REGISTRO = """
+    <style>
+    .stButton>button {
+        background-color: #F0FFF0;
+        color: #2E8B57;
+        padding: 10px 24px;
+        border-radius: 5px;
+        border: none;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        transition: all 0.3s ease;
+        font-weight: 500;
+    }
+    .stButton>button:hover {
+        background-color: #E0EEE0;
+        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+    }
+    .stButton>button:active {
+        background-color: #D1EED1;
+        box-shadow: 0 1px 2px rgba(0,0,0,0.1);
+    }
+    </style>
+"""
+
+def mostrar_mensaje(clave):
+    # Los callbacks dejan (tipo, texto) en session_state; se muestra una sola vez
+    mensaje = st.session_state.pop(clave, None)
+    if mensaje:
+        tipo, texto = mensaje
+        getattr(st, tipo)(texto)
+
+def confirmar_venta():
+    monto_compra = st.session_state.monto_compra_key
+    metodo_pago = st.session_state.metodo_fuera
+    dinero_entregado = st.session_state.dinero_entregado_key
+    cliente_fiado = st.session_state.cliente_fiado_key.strip() or None
+    telefono_fiado = st.session_state.telefono_fiado_key.strip() or None
+    cliente_id = st.session_state.get("cliente_fiado_id")
+
+    if monto_compra <= 0:
+        st.session_state.mensaje_venta = ("error", "❌ El monto debe ser mayor a 0")
+        return
+    if metodo_pago is None:
+        st.session_state.mensaje_venta = ("error", "❌ Debe seleccionar el método de pago")
+        return
+    if metodo_pago == "Efectivo" and dinero_entregado < monto_compra:
+        st.session_state.mensaje_venta = ("error", "❌ El dinero entregado debe ser mayor o igual al monto de la compra")
+        return
+    if metodo_pago == "Fiado" and not cliente_fiado:
+        st.session_state.mensaje_venta = ("error", "❌ Debe ingresar el nombre del cliente para ventas fiadas")
+        return
+
+    # Preparar valores según el método de pago
+    if metodo_pago == "Efectivo":
+        ingreso = monto_compra
+        entregado = dinero_entregado
+        vuelto = dinero_entregado - monto_compra
+        deuda = 0.0
+    elif metodo_pago in ["Mercado Pago", "Cuenta DNI"]:
+        ingreso = monto_compra
+        entregado = monto_compra
+        vuelto = 0.0
+        deuda = 0.0
+    else:  # Fiado
+        ingreso = 0.0
+        entregado = 0.0
+        vuelto = 0.0
+        deuda = monto_compra
+    # Los datos del cliente solo se guardan en las ventas fiadas
+    if metodo_pago != "Fiado":
+        cliente_fiado = telefono_fiado = cliente_id = None
+
     try:
-        # Convertir valores a float y redondear a 2 decimales
-        monto = round(float(monto), 2)
-        entregado = round(float(entregado), 2)
-        vuelto = round(float(vuelto), 2)
-        ingreso = round(float(ingreso), 2)
-        deuda = round(float(deuda), 2)
-        
-        # Establecer conexión
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        # Query de inserción
-        query = """
-            INSERT INTO ventas 
-            (sucursal, monto, metodo_pago, entregado, vuelto, ingreso, deuda, fecha, cliente_fiado, telefono_fiado)
-            VALUES 
-            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id;
-        """
-        
-        # Valores para la inserción
-        valores = (
-            sucursal,
-            monto,
-            metodo_pago,
-            entregado,
-            vuelto,
-            ingreso,
-            deuda,
-            datetime.now(),
-            cliente_fiado,
-            telefono_fiado
-        )
-        
-        # Ejecutar la inserción
-        cur.execute(query, valores)
-        conn.commit()
-        return True
-        
+        registrar_venta(st.session_state["sucursal"], monto_compra, metodo_pago, entregado, vuelto,
+                        ingreso, deuda, cliente_fiado, telefono_fiado, cliente_id)
     except Exception as e:
-        st.error(f"Error al registrar la venta: {str(e)}")
-        if conn:
-            conn.rollback()
+        st.session_state.mensaje_venta = ("error", f"Error al registrar la venta: {str(e)}")
+        return
+
+    st.session_state.mensaje_venta = ("success", "✅ Venta registrada correctamente")
+    # Limpiar los campos para la próxima venta
+    st.session_state.monto_compra_key = 0.0
+    st.session_state.metodo_fuera = "Efectivo"
+    st.session_state.dinero_entregado_key = 0.0
+    soltar_cliente()
+    st.session_state.vuelto_calculado = 0.0
+
+def formato_cliente(cliente):
+    detalle = [cliente.nombre]
+    if cliente.telefono:
+        detalle.append(f"📞 {cliente.telefono}")
+    if cliente.saldo > 0:
+        detalle.append(f"debe ${cliente.saldo:,.2f}")
+    return " · ".join(detalle)
+
+def elegir_cliente():
+    # La venta se asienta en la cuenta del cliente elegido por su id, aunque
+    # haya otro con el mismo nombre
+    cliente = st.session_state.clientes_encontrados.get(st.session_state.cliente_elegido)
+    if cliente is not None:
+        st.session_state.cliente_fiado_id = cliente.id
+        st.session_state.cliente_fiado_key = cliente.nombre
+        st.session_state.telefono_fiado_key = cliente.telefono or ""
+
+def soltar_cliente():
+    st.session_state.cliente_fiado_id = None
+    st.session_state.cliente_fiado_key = ""
+    st.session_state.telefono_fiado_key = ""
+    st.session_state.buscar_cliente_key = ""
+    st.session_state.cliente_elegido = None
+
+@st.experimental_fragment
+def formulario_venta():
+    st.subheader("Registrar venta")
+
+    st.session_state.setdefault("monto_compra_key", 0.0)
+    st.session_state.setdefault("dinero_entregado_key", 0.0)
+    st.session_state.setdefault("cliente_fiado_key", "")
+    st.session_state.setdefault("telefono_fiado_key", "")
+    st.session_state.setdefault("buscar_cliente_key", "")
+    st.session_state.setdefault("cliente_fiado_id", None)
+    st.session_state.setdefault("vuelto_calculado", 0.0)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.number_input("Monto de la compra",
+                        min_value=0.0,
+                        step=100.0,
+                        key="monto_compra_key",
+                        format="%.2f",
+                        on_change=calcular_vuelto)
+    with col2:
+        metodo_pago = st.selectbox("Método de pago",
+                                   ["Efectivo", "Mercado Pago", "Cuenta DNI", "Fiado"],
+                                   key="metodo_fuera",
+                                   index=None)
+
+    # Mostrar campo de dinero entregado si es efectivo
+    if metodo_pago == "Efectivo":
+        st.number_input("Dinero entregado por el cliente",
+                        min_value=0.0,
+                        step=100.0,
+                        key="dinero_entregado_key",
+                        format="%.2f",
+                        on_change=calcular_vuelto)
+
+        # Mostrar el vuelto calculado
+        if st.session_state.vuelto_calculado != 0:
+            if st.session_state.vuelto_calculado >= 0:
+                st.info(f"💵 Vuelto a entregar: ${st.session_state.vuelto_calculado:,.2f}")
+            else:
+                st.warning(f"⚠️ Falta dinero por cobrar: ${abs(st.session_state.vuelto_calculado):,.2f}")
+    elif metodo_pago == "Fiado":
+        # Buscar un cliente registrado completa nombre y teléfono tal como están
+        # en su cuenta; si no aparece, se escribe y queda registrado con la venta
+        elegido = st.session_state.get("cliente_fiado_id") is not None
+        if elegido:
+            st.button("🔄 Cambiar cliente", on_click=soltar_cliente)
+        else:
+            st.text_input("🔎 Buscar cliente (nombre o teléfono)", key="buscar_cliente_key")
+            encontrados = st.session_state.clientes_encontrados = {
+                cliente.id: cliente for cliente in clientes.buscar(st.session_state.buscar_cliente_key)
+            }
+            if st.session_state.get("cliente_elegido") not in encontrados:
+                st.session_state.cliente_elegido = None
+            if encontrados:
+                st.radio("Clientes encontrados", list(encontrados), index=None, key="cliente_elegido",
+                         on_change=elegir_cliente, format_func=lambda c: formato_cliente(encontrados[c]))
+            elif st.session_state.buscar_cliente_key.strip():
+                st.caption("No hay clientes con ese nombre o teléfono: se registra como cliente nuevo")
+        # Con un cliente elegido, nombre y teléfono son los de su cuenta y no se editan
+        col1, col2 = st.columns(2)
+        with col1:
+            st.text_input("Nombre del cliente", key="cliente_fiado_key", disabled=elegido)
+        with col2:
+            st.text_input("Teléfono (opcional)", key="telefono_fiado_key", disabled=elegido)
+
+    st.button("Registrar Venta", on_click=confirmar_venta)
+    mostrar_mensaje("mensaje_venta")
+
+def confirmar_egreso():
+    monto = st.session_state.monto_egreso_key
+    if monto <= 0:
+        st.session_state.mensaje_egreso = ("error", "❌ El monto debe ser mayor a 0")
+        return
+    try:
+        registrar_egreso(st.session_state["sucursal"], st.session_state.motivo_egreso, monto,
+                         st.session_state.observacion_egreso_key)
+    except Exception as e:
+        st.session_state.mensaje_egreso = ("error", f"Error al registrar el egreso: {str(e)}")
+        return
+
+    st.session_state.mensaje_egreso = ("success", f"✅ Egreso de ${monto:,.2f} registrado correctamente")
+    # Limpiar los campos
+    st.session_state.monto_egreso_key = 0.0
+    st.session_state.observacion_egreso_key = ""
+
+def cerrar_turno(sucursal, fecha, hasta, monto_contado, observaciones):
+    """Registra el cierre del turno abierto. Devuelve True si se registró;
+    si no, muestra el motivo."""
+    # Las ventas que siguen en el diario local no estarían en los totales del cierre
+    diario_local = diario.obtener_diario()
+    try:
+        pendientes = diario_local.vaciar()
+    except Exception as e:
+        st.error(f"❌ No se pudo sincronizar el diario con la base: {str(e).strip()}")
         return False
-        
-    finally:
-        if conn:
-            conn.close()
+    if pendientes:
+        st.warning(f"⚠️ Hay {pendientes} operaciones sin sincronizar: el cierre se registra cuando lleguen a la base")
+        return False
+    # Tampoco las que la base rechazó: la caja daría un sobrante que no es tal
+    con_error = diario_local.estado()["con_error"]
+    if con_error:
+        st.error(f"❌ Hay {con_error} operaciones rechazadas por la base que no entrarían en el cierre. "
+                 "Revisá el detalle en la barra lateral antes de cerrar el turno.")
+        return False
+
+    # El turno se cierra con los totales calculados en la misma sentencia
+    fin_turno = min(datetime.now(), datetime.combine(hasta, datetime.min.time()))
+    try:
+        with conexion(escritura=True) as conn:
+            cur = conn.cursor()
+            cur.execute(consultas.REGISTRAR_CIERRE, {
+                "sucursal": sucursal,
+                "fecha": fecha,
+                "hasta": fin_turno,
+                "contado": monto_contado,
+                "observaciones": observaciones or None
+            })
+            turno, diferencia = cur.fetchone()
+            conn.commit()
+    except psycopg2.IntegrityError:
+        # Otro usuario cerró el mismo turno de la sucursal al mismo tiempo
+        cache.resultados.invalidar(sucursal, fecha)
+        st.error("❌ Este turno ya fue cerrado desde otra sesión. Actualizá la página para ver el cierre.")
+        return False
+    except Exception as e:
+        st.error(f"❌ Error al registrar el cierre: {str(e).strip()}")
+        return False
+
+    cache.resultados.invalidar(sucursal, fecha)
+    if diferencia > 0:
+        st.session_state.mensaje_cierre = ("info", f"✅ Cierre del turno {turno} registrado · 📈 Sobrante en caja: ${diferencia:,.2f}")
+    elif diferencia < 0:
+        st.session_state.mensaje_cierre = ("warning", f"✅ Cierre del turno {turno} registrado · 📉 Faltante en caja: ${abs(diferencia):,.2f}")
+    else:
+        st.session_state.mensaje_cierre = ("success", f"✅ Cierre del turno {turno} registrado correctamente")
+    return True
 
-def crear_tabla_empleados():
-    conn = get_connection()
-    cur = conn.cursor()
+def confirmar_pago_sueldos():
+    empleados_a_pagar = st.session_state.get("empleados_a_pagar", [])
+    if not empleados_a_pagar:
+        st.session_state.mensaje_egreso = ("error", "❌ Debe seleccionar al menos un empleado")
+        return
+
+    sucursal = st.session_state["sucursal"]
+    fecha_pago = datetime.now()
     try:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS empleados (
-                id SERIAL PRIMARY KEY,
-                nombre VARCHAR(100) NOT NULL,
-                sucursal VARCHAR(50) NOT NULL,
-                sueldo_base DECIMAL(10,2) NOT NULL,
-                activo BOOLEAN DEFAULT TRUE,
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        # Toda la corrida en una sentencia; los ya pagados en el período se omiten
+        corrida_id, pagados, monto_total = sueldos.pagar_sueldos(
+            sucursal,
+            [(empleado["ID"], empleado["Sueldo Base"]) for empleado in empleados_a_pagar],
+            st.session_state.obs_sueldos,
+            fecha_pago,
+        )
+    except Exception as e:
+        st.session_state.mensaje_egreso = ("error", f"Error al registrar los pagos: {str(e)}")
+        return
+
+    if corrida_id is None:
+        st.session_state.mensaje_egreso = ("warning", "⚠️ Los empleados seleccionados ya cobraron el sueldo de este período")
+    else:
+        cache.resultados.invalidar(sucursal, fecha_pago.date())
+        mensaje = f"✅ Se han pagado {pagados} sueldos por un total de ${monto_total:,.2f} (corrida #{corrida_id})"
+        omitidos = len(empleados_a_pagar) - pagados
+        if omitidos:
+            mensaje += f". {omitidos} ya habían cobrado el período"
+        st.session_state.mensaje_egreso = ("success", mensaje)
+    # Una clave nueva para la tabla descarta las casillas marcadas
+    st.session_state.version_sueldos += 1
+    st.session_state.empleados_a_pagar = []
+    st.session_state.obs_sueldos = ""
+
+def detalle_sueldos():
+    st.write("📋 Detalle de sueldos")
+    st.session_state.setdefault("version_sueldos", 0)
+    st.session_state.setdefault("obs_sueldos", "")
+
+    periodo = sueldos.periodo_de(date.today())
+    st.caption(f"Período: {periodo:%m/%Y}")
+
+    # Obtener empleados activos de la sucursal y su último pago
+    empleados_db = consultar(consultas.EMPLEADOS_ULTIMO_PAGO,
+                             {"sucursal": st.session_state["sucursal"], "periodo": periodo})
+
+    if not empleados_db:
+        st.warning("⚠️ No hay empleados registrados en esta sucursal")
+        if st.button("➕ Agregar empleado"):
+            st.info("Función en desarrollo")
+        return
+
+    # Crear DataFrame con los empleados
+    df_empleados = pd.DataFrame(empleados_db, columns=["ID", "Nombre", "Sueldo Base", "Último Pago", "Pagado"])
+
+    # Agregar columna de checkbox para seleccionar empleados a pagar
+    df_empleados["Pagar"] = False
+
+    # Mostrar la tabla con checkboxes editables
+    df_empleados_editado = st.data_editor(
+        df_empleados,
+        column_config={
+            "ID": st.column_config.NumberColumn("ID", disabled=True),
+            "Nombre": st.column_config.TextColumn("Nombre", disabled=True),
+            "Sueldo Base": st.column_config.NumberColumn(
+                "Sueldo Base",
+                help="Monto base del sueldo",
+                min_value=0,
+                max_value=1000000,
+                step=1000,
+                format="$%d"
+            ),
+            "Último Pago": st.column_config.DatetimeColumn(
+                "Último Pago",
+                help="Fecha del último pago realizado",
+                format="DD/MM/YYYY HH:mm",
+                disabled=True
+            ),
+            "Pagado": st.column_config.CheckboxColumn(
+                "Pagado",
+                help="Ya cobró el sueldo de este período",
+                disabled=True
+            ),
+            "Pagar": st.column_config.CheckboxColumn(
+                "Pagar",
+                help="Seleccionar para pagar"
             )
-        """)
-        conn.commit()
+        },
+        hide_index=True,
+        key=f"tabla_empleados_{st.session_state.version_sueldos}"
+    )
+
+    # Calcular total a pagar de los empleados seleccionados
+    empleados_a_pagar = df_empleados_editado[df_empleados_editado["Pagar"]]
+    st.session_state.empleados_a_pagar = empleados_a_pagar[["ID", "Nombre", "Sueldo Base"]].to_dict("records")
+    monto_total = empleados_a_pagar["Sueldo Base"].sum()
+
+    if monto_total > 0:
+        st.info(f"💰 Total a pagar: ${monto_total:,.2f}")
+        st.text_area("Observaciones (opcional)", height=100, key="obs_sueldos")
+        st.button("💸 Confirmar Pago de Sueldos", on_click=confirmar_pago_sueldos)
+
+@st.experimental_fragment
+def formulario_egreso():
+    st.subheader("➖ Registrar Egreso")
+
+    st.session_state.setdefault("monto_egreso_key", 0.0)
+    st.session_state.setdefault("observacion_egreso_key", "")
+
+    motivo = st.selectbox("Motivo del egreso",
+                          ["Proveedor", "Sueldos", "Reparaciones", "Otros"] if st.session_state["rol"] == "dueño" else ["Proveedor", "Reparaciones", "Otros"],
+                          key="motivo_egreso")
+
+    # Campos específicos para sueldos (solo visible para el dueño)
+    if motivo == "Sueldos" and st.session_state["rol"] == "dueño":
+        detalle_sueldos()
+    else:
+        st.number_input("Monto del egreso",
+                        min_value=0.0,
+                        step=100.0,
+                        format="%.2f",
+                        key="monto_egreso_key")
+        st.text_area("Observaciones (opcional)", height=100, key="observacion_egreso_key")
+        st.button("Registrar Egreso", on_click=confirmar_egreso)
+    mostrar_mensaje("mensaje_egreso")
+
+def confirmar_cobro():
+    cliente_id = st.session_state.cliente_cobro
+    monto = st.session_state.monto_cobro_key
+    if cliente_id is None:
+        st.session_state.mensaje_cobro = ("error", "❌ Debe seleccionar el cliente")
+        return
+    if monto <= 0:
+        st.session_state.mensaje_cobro = ("error", "❌ El monto debe ser mayor a 0")
+        return
+    try:
+        registrar_cobro(st.session_state["sucursal"], cliente_id, monto, st.session_state.metodo_cobro)
     except Exception as e:
-        st.error(f"Error al crear tabla empleados: {str(e)}")
-        conn.rollback()
-    finally:
-        conn.close()
+        st.session_state.mensaje_cobro = ("error", f"Error al registrar el cobro: {str(e)}")
+        return
+
+    nombre, _, saldo = st.session_state.deudores_cobro[cliente_id]
+    saldo -= monto
+    detalle = f"le quedan ${saldo:,.2f} de deuda" if saldo > 0 else "la cuenta queda saldada"
+    st.session_state.mensaje_cobro = ("success", f"✅ Cobro de ${monto:,.2f} a {nombre} registrado: {detalle}")
+    st.session_state.cliente_cobro = None
+    st.session_state.monto_cobro_key = 0.0
+
+@st.experimental_fragment
+def formulario_cobro():
+    st.subheader("💳 Cobrar fiado")
+
+    st.session_state.setdefault("monto_cobro_key", 0.0)
+
+    # El callback usa el saldo que se mostró al elegir el cliente
+    deudores = st.session_state.deudores_cobro = consultas.cargar_clientes_con_deuda()
+    if st.session_state.get("cliente_cobro") not in deudores:
+        st.session_state.cliente_cobro = None
+    col1, col2 = st.columns(2)
+    with col1:
+        st.selectbox("Cliente", list(deudores), index=None, key="cliente_cobro",
+                     format_func=lambda c: formato_cliente(clientes.Cliente(c, *deudores[c])))
+    with col2:
+        st.selectbox("Método de pago", ["Efectivo", "Mercado Pago", "Cuenta DNI"], key="metodo_cobro")
+    st.number_input("Monto cobrado",
+                    min_value=0.0,
+                    step=100.0,
+                    format="%.2f",
+                    key="monto_cobro_key")
+    st.button("Registrar Cobro", on_click=confirmar_cobro)
+    mostrar_mensaje("mensaje_cobro")
+
+def vista_registro():
+    st.title("📝 Registro de Ventas y Egresos")
+    st.markdown(ESTILO_REGISTRO, unsafe_allow_html=True)
+    formulario_venta()
+    st.markdown("---")  # Línea divisoria
+    formulario_egreso()
+    st.markdown("---")
+    formulario_cobro()
+
+# ---------- DASHBOARD ----------
+# Cada sección se dibuja en su propio lugar apenas llega su consulta (ver paralelo.py)
+def cargas_dashboard(primer_dia, fin_mes, primer_dia_anterior):
+    # Los DataFrames cacheados se comparten entre sesiones: solo se leen, nunca se modifican
+    inicio_serie = consultas.inicio_serie_mensual(date.today())
+    return {
+        # Totales de ventas y egresos de ambos meses por sucursal en una sola consulta
+        "comparativa": lambda: cache.resultados.obtener(
+            "comparativa", None, (primer_dia_anterior, fin_mes),
+            lambda: consultas.cargar_comparativa(primer_dia, fin_mes, primer_dia_anterior)
+        ),
+        # Las tablas de análisis salen de la réplica analítica si está al día (ver analitica.py)
+        "por_dia": lambda: cache.resultados.obtener(
+            "por_dia", None, (primer_dia, fin_mes),
+            lambda: cargar_analisis(analitica.MOVIMIENTOS_POR_DIA, consultas.MOVIMIENTOS_POR_DIA, (primer_dia, fin_mes),
+                                    ["Día", "Cant. Ventas", "Monto Total", "Ingreso Real", "Deuda", "Promedio"])
+        ),
+        "por_metodo": lambda: cache.resultados.obtener(
+            "por_metodo", None, (primer_dia, fin_mes),
+            lambda: cargar_analisis(analitica.MOVIMIENTOS_POR_METODO, consultas.MOVIMIENTOS_POR_METODO,
+                                    (primer_dia, fin_mes),
+                                    ["Método de Pago", "Cantidad", "Monto Total",
+                                     "Ingreso Real", "Deuda Pendiente", "Promedio"])
+        ),
+        "mensual": lambda: cache.resultados.obtener(
+            "mensual", None, (inicio_serie, date.max),
+            lambda: cargar_mensual(inicio_serie)
+        ),
+    }
+
+def cargar_analisis(sql_replica, sql_postgres, parametros, columnas):
+    # (sincronizada_en, df) de la réplica; de Postgres sincronizada_en es None
+    return (analitica.consultar_analisis(sql_replica, parametros, columnas)
+            or (None, consultar_tabla(sql_postgres, parametros, columnas)))
+
+def cargar_mensual(inicio_serie):
+    # (sincronizada_en, refrescada_en, desactualizada, df): la réplica agrupa las
+    # ventas sin pasar por resumen_mensual
+    columnas = ["Mes", "Cantidad", "Monto Total", "Ingreso Real", "Deuda Pendiente",
+                "Total Efectivo", "Total Digital", "Promedio"]
+    desde_replica = analitica.consultar_analisis(analitica.MOVIMIENTOS_MENSUALES, {"desde": inicio_serie}, columnas)
+    if desde_replica:
+        sincronizada_en, df_mensual = desde_replica
+        return sincronizada_en, None, False, df_mensual
+    refrescada_en, desactualizada = refrescar.asegurar_resumen_mensual()
+    return (None, refrescada_en, desactualizada,
+            consultar_tabla(consultas.MOVIMIENTOS_MENSUALES, {"desde": inicio_serie}, columnas))
+
+def mostrar_origen(sincronizada_en):
+    # Qué tan atrasada está la réplica de la que salió la sección
+    if sincronizada_en is None:
+        return
+    atraso = int((datetime.now() - sincronizada_en).total_seconds())
+    st.caption(f"🦆 Réplica analítica al {sincronizada_en:%d/%m/%Y %H:%M:%S} "
+               f"(hace {atraso // 60} min {atraso % 60} s)")
+
+# Cards por sucursal: con más de una fila se pueden ordenar y con más de una página, paginar
+SUCURSALES_POR_FILA = 4
+SUCURSALES_POR_PAGINA = 8
+ORDENES_COMPARATIVA = {
+    "Ventas": lambda totales: -totales.ventas,
+    "Variación": lambda totales: -totales.variacion_ventas,
+    "Egresos": lambda totales: -totales.egresos,
+    "Nombre": lambda totales: totales.sucursal,
+}
+
+def mostrar_comparativa(comparativa):
+    lista = list(comparativa.sucursales)
+    if len(lista) > SUCURSALES_POR_FILA:
+        col_orden, col_pagina = st.columns([3, 1])
+        with col_orden:
+            orden = st.radio("Ordenar por", list(ORDENES_COMPARATIVA), horizontal=True, key="orden_comparativa")
+        lista.sort(key=ORDENES_COMPARATIVA[orden])
+        paginas = -(-len(lista) // SUCURSALES_POR_PAGINA)
+        if paginas > 1:
+            with col_pagina:
+                pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas,
+                                         key="pagina_comparativa")
+            lista = lista[(pagina - 1) * SUCURSALES_POR_PAGINA:pagina * SUCURSALES_POR_PAGINA]
+
+    # Mostrar cards con comparativas: ventas y egresos de cada sucursal en su columna
+    for inicio in range(0, len(lista), SUCURSALES_POR_FILA):
+        columnas = st.columns(SUCURSALES_POR_FILA)
+        for columna, totales in zip(columnas, lista[inicio:inicio + SUCURSALES_POR_FILA]):
+            nombre = totales.sucursal.removeprefix("Sucursal ")
+            with columna:
+                st.metric(
+                    f"Ventas {nombre}",
+                    f"${totales.ventas:,.2f}",
+                    f"{totales.variacion_ventas:+.1f}% vs mes anterior",
+                    delta_color="normal" if totales.variacion_ventas >= 0 else "inverse"
+                )
+                st.metric(
+                    f"Egresos {nombre}",
+                    f"${totales.egresos:,.2f}",
+                    f"{totales.variacion_egresos:+.1f}% vs mes anterior",
+                    delta_color="inverse" if totales.variacion_egresos >= 0 else "normal"
+                )
+
+def mostrar_resumen(comparativa):
+    st.markdown("#### 📊 Resumen")
+    # Totales por sucursal ya calculados en la comparativa
+    con_ventas = comparativa.con_ventas
+    if len(con_ventas) <= SUCURSALES_POR_FILA:
+        for totales in con_ventas:
+            st.metric(
+                f"💰 Total {totales.sucursal}",
+                f"${totales.ventas:,.2f}"
+            )
+    else:
+        st.dataframe(
+            pd.DataFrame({"Sucursal": [t.sucursal for t in con_ventas], "Ventas": [t.ventas for t in con_ventas]}),
+            column_config={"Ventas": columna_moneda("💰 Ventas")},
+            hide_index=True,
+            height=min(35 * (len(con_ventas) + 1) + 3, 300)
+        )
 
-# Llamar a la función para crear la tabla al inicio
-crear_tabla_empleados()
+    # Calcular total general
+    st.metric("💰 Total General", f"${comparativa.total_ventas:,.2f}")
+
+def mostrar_por_dia(df_diario):
+    """Dibuja la tabla por día y devuelve el lugar del Resumen, que depende de la comparativa."""
+    if df_diario.empty:
+        st.info("No hay ingresos registrados para mostrar.")
+        return None
+
+    # Crear tres columnas para mejor visualización
+    col1, col2, col3 = st.columns([2,1,1])
+
+    with col1:
+        # Mostrar la tabla con estilo
+        st.dataframe(
+            df_diario,
+            column_config={
+                "Día": st.column_config.TextColumn("📅 Día de la Semana"),
+                "Cant. Ventas": st.column_config.NumberColumn("📊 Cant. Ventas"),
+                "Monto Total": columna_moneda("💰 Monto Total"),
+                "Ingreso Real": columna_moneda("💵 Ingreso Real"),
+                "Deuda": columna_moneda("📝 Deuda"),
+                "Promedio": columna_moneda("📈 Promedio")
+            },
+            hide_index=True,
+            width=800
+        )
+
+    with col2:
+        lugar_resumen = st.empty()
+        lugar_resumen.caption("⏳ Cargando resumen...")
+
+    with col3:
+        st.markdown("#### 🏆 Mejores Días")
+        # Encontrar el día con más ingresos
+        mejor_dia_ingresos = df_diario.loc[df_diario["Ingreso Real"].idxmax()]
+        st.info(f"Mayor Ingreso:\n{mejor_dia_ingresos['Día']}\n${mejor_dia_ingresos['Ingreso Real']:,.2f}")
+
+        # Encontrar el día con más ventas
+        mejor_dia_ventas = df_diario.loc[df_diario["Cant. Ventas"].idxmax()]
+        st.success(f"Más Ventas:\n{mejor_dia_ventas['Día']}\n{mejor_dia_ventas['Cant. Ventas']} ventas")
+
+    return lugar_resumen
+
+def mostrar_por_metodo(df_metodos):
+    if df_metodos.empty:
+        st.info("No hay datos de métodos de pago para mostrar.")
+        return
+
+    # Crear columnas para la visualización
+    col1, col2 = st.columns([2,1])
+
+    with col1:
+        st.dataframe(
+            df_metodos,
+            column_config={
+                "Método de Pago": st.column_config.TextColumn("💳 Método de Pago"),
+                "Cantidad": st.column_config.NumberColumn("📊 Cant. Ventas"),
+                "Monto Total": columna_moneda("💰 Monto Total"),
+                "Ingreso Real": columna_moneda("💵 Ingreso Real"),
+                "Deuda Pendiente": columna_moneda("📝 Deuda"),
+                "Promedio": columna_moneda("📈 Promedio")
+            },
+            hide_index=True,
+            width=800
+        )
+
+    with col2:
+        st.markdown("#### 📊 Análisis")
+        # Calcular totales
+        total_ingreso = df_metodos["Ingreso Real"].sum()
+        total_deuda = df_metodos["Deuda Pendiente"].sum()
+        total_general = total_ingreso + total_deuda
+
+        st.metric("💰 Total Ingresos", f"${total_ingreso:,.2f}")
+        st.metric("📝 Deuda Pendiente", f"${total_deuda:,.2f}")
+        st.metric("💵 Total General", f"${total_general:,.2f}")
+
+        # Método más usado
+        metodo_principal = df_metodos.iloc[0]
+        st.metric(
+            "Método más usado",
+            metodo_principal["Método de Pago"],
+            f"{metodo_principal['Cantidad']} ventas"
+        )
+
+def mostrar_mensual(sincronizada_en, refrescada_en, desactualizada, df_mensual):
+    mostrar_origen(sincronizada_en)
+    if refrescada_en is not None:
+        st.caption(f"Meses cerrados desde la vista materializada, refrescada el {refrescada_en:%d/%m/%Y %H:%M}"
+                   + (" · actualizándose en segundo plano" if desactualizada else ""))
+        if desactualizada and refrescar.ultimo_error:
+            st.caption(f"⚠️ Falló el último refresco: {refrescar.ultimo_error}")
+
+    if df_mensual.empty:
+        st.info("No hay datos mensuales para mostrar.")
+        return
+
+    # Crear columnas para la visualización
+    col1, col2 = st.columns([2,1])
+
+    with col1:
+        st.dataframe(
+            df_mensual,
+            column_config={
+                "Mes": st.column_config.DateColumn("📅 Mes", format="MMMM YYYY"),
+                "Cantidad": st.column_config.NumberColumn("📊 Ventas"),
+                "Monto Total": columna_moneda("💰 Total"),
+                "Ingreso Real": columna_moneda("💵 Ingreso"),
+                "Deuda Pendiente": columna_moneda("📝 Deuda"),
+                "Total Efectivo": columna_moneda("💵 Efectivo"),
+                "Total Digital": columna_moneda("💳 Digital"),
+                "Promedio": columna_moneda("📈 Promedio")
+            },
+            hide_index=True,
+            width=800
+        )
+
+    with col2:
+        st.markdown("#### 📊 Análisis del Mes")
+        # Obtener datos del mes actual
+        mes_actual = df_mensual.iloc[0]
+
+        # Obtener los valores de efectivo y digital
+        efectivo_actual = mes_actual['Total Efectivo']
+        digital_actual = mes_actual['Total Digital']
+
+        # Calcular porcentajes de efectivo y digital
+        total_medios = efectivo_actual + digital_actual
+        if total_medios > 0:
+            porc_efectivo = (efectivo_actual / total_medios) * 100
+            porc_digital = (digital_actual / total_medios) * 100
+
+            # Mostrar solo los porcentajes
+            st.metric("💵 % Efectivo", f"{porc_efectivo:.1f}%")
+            st.metric("💳 % Digital", f"{porc_digital:.1f}%")
+
+def mostrar_error_carga(lugar, error):
+    if isinstance(error, paralelo.TimeoutError):
+        lugar.warning(f"⏳ La consulta no respondió a tiempo ({error}). Se mostrará al actualizar la página.")
+    else:
+        lugar.error(f"⚠️ No se pudo cargar esta sección: {error}")
 
 # ---------- LOGIN ----------
 if not st.session_state.get("logueado"):
     st.title("Login - Sistema de Caja")
     username = st.text_input("Usuario")
     password = st.text_input("Contraseña", type='password')
-    sucursal = st.selectbox("Sucursal", ["Sucursal Centro", "Sucursal Norte"])
+    sucursal = st.selectbox("Sucursal", sucursales.activas())
 
     if st.button("Acceder"):
         if username in usuarios:
@@ -149,1194 +842,323 @@ if st.sidebar.button("🔒 Cerrar sesión"):
         del st.session_state[key]
     st.rerun()
 
+# ---------- SINCRONIZACIÓN CON LA BASE ----------
+estado_diario = diario.obtener_diario().estado()
+if estado_diario["pendientes"]:
+    st.sidebar.warning(f"🔄 {estado_diario['pendientes']} operaciones pendientes de sincronizar")
+else:
+    st.sidebar.caption("✅ Operaciones sincronizadas")
+if estado_diario["con_error"]:
+    st.sidebar.error(f"⚠️ {estado_diario['con_error']} operaciones rechazadas por la base")
+if estado_diario["ultimo_error"]:
+    st.sidebar.caption(f"Último error: {estado_diario['ultimo_error']}")
+
 # ---------- INTERFAZ DUEÑO ----------
 if st.session_state.get("rol") == "dueño":
     st.sidebar.title("📂 Menú de navegación")
     vista = st.sidebar.radio("Seleccionar vista", 
-                           ["📊 Dashboard", "📝 Registro de Operaciones", "💰 Cierre de caja"], 
+                           ["📊 Dashboard", "📝 Registro de Operaciones", "💰 Cierre de caja", "👥 Clientes", "📤 Exportar"], 
                            format_func=lambda x: x.split(' ', 1)[1])
+    # Las consultas de esta ejecución se agrupan por vista en el perfilador
+    perfilador.vista_actual.set(vista.split(' ', 1)[1])
+    # Las vistas de consulta pueden leer de la réplica; el registro lee del primario
+    leer_de_replica.set(vista in VISTAS_EN_REPLICA)
 
     if vista == "📊 Dashboard":
         st.title("📊 Panel de Control")
         
         # Selector de mes
-        meses = {
-            1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
-            5: "Mayo", 6: "Junio", 7: "Julio", 8: "Agosto",
-            9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre"
-        }
-        
         mes_actual = datetime.now().month
         año_actual = datetime.now().year
         
         mes_seleccionado = st.selectbox(
             "Seleccionar Mes",
-            options=list(meses.keys()),
-            format_func=lambda x: meses[x],
+            options=list(MESES.keys()),
+            format_func=lambda x: MESES[x],
             index=mes_actual - 1
         )
         
-        # Calcular primer y último día del mes seleccionado
-        primer_dia = date(año_actual, mes_seleccionado, 1)
-        if mes_seleccionado == 12:
-            ultimo_dia = date(año_actual + 1, 1, 1) - timedelta(days=1)
-        else:
-            ultimo_dia = date(año_actual, mes_seleccionado + 1, 1) - timedelta(days=1)
-            
-        # Calcular primer y último día del mes anterior
-        if mes_seleccionado == 1:
-            primer_dia_anterior = date(año_actual - 1, 12, 1)
-            ultimo_dia_anterior = date(año_actual, 1, 1) - timedelta(days=1)
-        else:
-            primer_dia_anterior = date(año_actual, mes_seleccionado - 1, 1)
-            ultimo_dia_anterior = primer_dia - timedelta(days=1)
+        # Rango [primer_dia, fin_mes) del mes seleccionado y del mes anterior
+        primer_dia, fin_mes = consultas.rango_mes(año_actual, mes_seleccionado)
+        primer_dia_anterior, fin_mes_anterior = consultas.rango_mes_anterior(año_actual, mes_seleccionado)
 
-        # Conexión a la base de datos
-        conn = get_connection()
-        cur = conn.cursor()
+        # Todas las consultas salen a la vez, cada una con su conexión del pool
+        futuros = paralelo.lanzar(cargas_dashboard(primer_dia, fin_mes, primer_dia_anterior))
 
         # ---------- CARDS DE COMPARACIÓN VS MES ANTERIOR ----------
         st.subheader("📈 Comparativa vs Mes Anterior")
-        col1, col2, col3, col4 = st.columns(4)
-
-        # Ventas del mes seleccionado por sucursal
-        cur.execute("""
-            SELECT 
-                sucursal,
-                CAST(SUM(ingreso) AS FLOAT) as total_ventas
-            FROM ventas
-            WHERE DATE(fecha) >= %s AND DATE(fecha) <= %s
-            GROUP BY sucursal
-            ORDER BY total_ventas DESC
-        """, (primer_dia, ultimo_dia))
-        ventas_totales = {row[0]: row[1] for row in cur.fetchall()}
-        
-        # Ventas del mes anterior por sucursal
-        cur.execute("""
-            SELECT 
-                sucursal,
-                CAST(SUM(ingreso) AS FLOAT) as total_ventas
-            FROM ventas
-            WHERE DATE(fecha) >= %s AND DATE(fecha) <= %s
-            GROUP BY sucursal
-        """, (primer_dia_anterior, ultimo_dia_anterior))
-        ventas_mes_anterior = {row[0]: row[1] for row in cur.fetchall()}
-
-        # Egresos del mes seleccionado por sucursal
-        cur.execute("""
-            SELECT 
-                sucursal,
-                CAST(SUM(monto) AS FLOAT) as total_egresos
-            FROM egresos 
-            WHERE DATE(fecha) >= %s AND DATE(fecha) <= %s
-            GROUP BY sucursal
-        """, (primer_dia, ultimo_dia))
-        egresos_mes_actual = {row[0]: row[1] for row in cur.fetchall()}
-        
-        # Egresos del mes anterior por sucursal
-        cur.execute("""
-            SELECT 
-                sucursal,
-                CAST(SUM(monto) AS FLOAT) as total_egresos
-            FROM egresos
-            WHERE DATE(fecha) >= %s AND DATE(fecha) <= %s
-            GROUP BY sucursal
-        """, (primer_dia_anterior, ultimo_dia_anterior))
-        egresos_mes_anterior = {row[0]: row[1] for row in cur.fetchall()}
-        
-        # Mostrar cards con comparativas
-        with col1:
-            ventas_total_centro = float(ventas_totales.get("Sucursal Centro", 0))
-            ventas_anterior_centro = float(ventas_mes_anterior.get("Sucursal Centro", 0))
-            diff_porcentaje_centro = ((ventas_total_centro - ventas_anterior_centro) / ventas_anterior_centro * 100) if ventas_anterior_centro > 0 else 0
-            
-            st.metric(
-                "Ventas Centro",
-                f"${ventas_total_centro:,.2f}",
-                f"{diff_porcentaje_centro:+.1f}% vs mes anterior",
-                delta_color="normal" if diff_porcentaje_centro >= 0 else "inverse"
-            )
-            
-        with col2:
-            ventas_total_norte = float(ventas_totales.get("Sucursal Norte", 0))
-            ventas_anterior_norte = float(ventas_mes_anterior.get("Sucursal Norte", 0))
-            diff_porcentaje_norte = ((ventas_total_norte - ventas_anterior_norte) / ventas_anterior_norte * 100) if ventas_anterior_norte > 0 else 0
-            
-            st.metric(
-                "Ventas Norte",
-                f"${ventas_total_norte:,.2f}",
-                f"{diff_porcentaje_norte:+.1f}% vs mes anterior",
-                delta_color="normal" if diff_porcentaje_norte >= 0 else "inverse"
-            )
-            
-        with col3:
-            egresos_actual_centro = float(egresos_mes_actual.get("Sucursal Centro", 0))
-            egresos_anterior_centro = float(egresos_mes_anterior.get("Sucursal Centro", 0))
-            diff_egresos_centro = egresos_actual_centro - egresos_anterior_centro
-            diff_porcentaje_egresos_centro = (diff_egresos_centro / egresos_anterior_centro * 100) if egresos_anterior_centro > 0 else 0
-            
-            st.metric(
-                "Egresos Centro",
-                f"${egresos_actual_centro:,.2f}",
-                f"{diff_porcentaje_egresos_centro:+.1f}% vs mes anterior",
-                delta_color="inverse" if diff_porcentaje_egresos_centro >= 0 else "normal"
-            )
-            
-        with col4:
-            egresos_actual_norte = float(egresos_mes_actual.get("Sucursal Norte", 0))
-            egresos_anterior_norte = float(egresos_mes_anterior.get("Sucursal Norte", 0))
-            diff_egresos_norte = egresos_actual_norte - egresos_anterior_norte
-            diff_porcentaje_egresos_norte = (diff_egresos_norte / egresos_anterior_norte * 100) if egresos_anterior_norte > 0 else 0
-            
-            st.metric(
-                "Egresos Norte",
-                f"${egresos_actual_norte:,.2f}",
-                f"{diff_porcentaje_egresos_norte:+.1f}% vs mes anterior",
-                delta_color="inverse" if diff_porcentaje_egresos_norte >= 0 else "normal"
-            )
+        lugares = {"comparativa": st.empty()}
 
         # ---------- GRÁFICOS DE ANÁLISIS ----------
         st.subheader("📊 Análisis de Ventas")
+        estado_analitica = analitica.estado()
+        if estado_analitica["activa"] and not estado_analitica["al_dia"]:
+            motivo = estado_analitica["ultimo_error"] or (
+                "sincronizando por primera vez" if estado_analitica["sincronizada_en"] is None else "atrasada"
+            )
+            st.caption(f"⚠️ Réplica analítica no disponible ({motivo}): las tablas se calculan en Postgres")
 
         # 1. Tabla de movimientos por día de la semana
         st.write("### Movimientos por Día")
-        
-        # Consulta SQL para obtener los movimientos por día
-        cur.execute("""
-            WITH DatosVentas AS (
-                SELECT 
-                    CASE EXTRACT(DOW FROM fecha)::INT
-                        WHEN 1 THEN 'Lunes'
-                        WHEN 2 THEN 'Martes'
-                        WHEN 3 THEN 'Miércoles'
-                        WHEN 4 THEN 'Jueves'
-                        WHEN 5 THEN 'Viernes'
-                        WHEN 6 THEN 'Sábado'
-                        WHEN 0 THEN 'Domingo'
-                    END AS dia_semana,
-                    COUNT(*) as cantidad_ventas,
-                    CAST(SUM(monto) AS FLOAT) as monto_total,
-                    CAST(SUM(ingreso) AS FLOAT) as ingreso_real,
-                    CAST(SUM(deuda) AS FLOAT) as deuda_total,
-                    CAST(AVG(monto) AS FLOAT) as promedio_venta
-                FROM ventas
-                WHERE DATE(fecha) >= %s AND DATE(fecha) <= %s
-                GROUP BY EXTRACT(DOW FROM fecha)::INT
-                ORDER BY EXTRACT(DOW FROM fecha)::INT
-            )
-            SELECT * FROM DatosVentas;
-        """, (primer_dia, ultimo_dia))
-        datos_diarios = cur.fetchall()
-        
-        if datos_diarios:
-            # Crear DataFrame
-            df_diario = pd.DataFrame(datos_diarios, 
-                                   columns=["Día", "Cant. Ventas", "Monto Total", 
-                                          "Ingreso Real", "Deuda", "Promedio"])
-            
-            # Formatear las columnas numéricas
-            columnas_moneda = ["Monto Total", "Ingreso Real", "Deuda", "Promedio"]
-            for col in columnas_moneda:
-                df_diario[col] = df_diario[col].apply(lambda x: f"${x:,.2f}")
-            
-            # Crear tres columnas para mejor visualización
-            col1, col2, col3 = st.columns([2,1,1])
-            
-            with col1:
-                # Mostrar la tabla con estilo
-                st.dataframe(
-                    df_diario,
-                    column_config={
-                        "Día": st.column_config.TextColumn("📅 Día de la Semana"),
-                        "Cant. Ventas": st.column_config.NumberColumn("📊 Cant. Ventas"),
-                        "Monto Total": st.column_config.TextColumn("💰 Monto Total"),
-                        "Ingreso Real": st.column_config.TextColumn("💵 Ingreso Real"),
-                        "Deuda": st.column_config.TextColumn("📝 Deuda"),
-                        "Promedio": st.column_config.TextColumn("📈 Promedio")
-                    },
-                    hide_index=True,
-                    width=800
-                )
-            
-            # Calcular y mostrar estadísticas adicionales
-            with col2:
-                st.markdown("#### 📊 Resumen")
-                # Calcular totales generales de ventas por sucursal
-                cur.execute("""
-                    SELECT 
-                        sucursal,
-                        CAST(SUM(ingreso) AS FLOAT) as ingreso_total
-                    FROM ventas
-                    WHERE DATE(fecha) >= %s AND DATE(fecha) <= %s
-                    GROUP BY sucursal
-                    ORDER BY ingreso_total DESC;
-                """, (primer_dia, ultimo_dia))
-                totales_sucursal = cur.fetchall()
-                
-                # Mostrar totales
-                for sucursal, total in totales_sucursal:
-                    st.metric(
-                        f"💰 Total {sucursal}", 
-                        f"${total:,.2f}"
-                    )
-                
-                # Calcular total general
-                total_general = sum(total for _, total in totales_sucursal)
-                st.metric("💰 Total General", f"${total_general:,.2f}")
-
-            with col3:
-                st.markdown("#### 🏆 Mejores Días")
-                # Encontrar el día con más ingresos
-                mejor_dia_ingresos = max(datos_diarios, key=lambda x: x[3])  # Usando ingreso real
-                st.info(f"Mayor Ingreso:\n{mejor_dia_ingresos[0]}\n${mejor_dia_ingresos[3]:,.2f}")
-                
-                # Encontrar el día con más ventas
-                mejor_dia_ventas = max(datos_diarios, key=lambda x: x[1])
-                st.success(f"Más Ventas:\n{mejor_dia_ventas[0]}\n{mejor_dia_ventas[1]} ventas")
-        else:
-            st.info("No hay ingresos registrados para mostrar.")
+        lugares["por_dia"] = st.empty()
 
         st.markdown("---")  # Línea divisoria
 
         # 2. Tabla de ingresos por método de pago
         st.write("### Movimientos por Método de Pago")
-        
-        # Consulta SQL para movimientos por método de pago
-        cur.execute("""
-            WITH DatosPago AS (
-                SELECT 
-                    COALESCE(metodo_pago, 'Sin especificar') as metodo_pago,
-                    COUNT(id) as cantidad_ventas,
-                    CAST(SUM(monto) AS FLOAT) as monto_total,
-                    CAST(SUM(ingreso) AS FLOAT) as ingreso_real,
-                    CAST(SUM(deuda) AS FLOAT) as deuda_pendiente,
-                    CAST(AVG(monto) AS FLOAT) as promedio_venta
-                FROM ventas
-                WHERE metodo_pago != 'Cierre'
-                AND DATE(fecha) >= %s AND DATE(fecha) <= %s
-                GROUP BY metodo_pago
-                HAVING COUNT(id) > 0
-                ORDER BY monto_total DESC
-            )
-            SELECT * FROM DatosPago;
-        """, (primer_dia, ultimo_dia))
-        datos_metodos = cur.fetchall()
-        
-        if datos_metodos:
-            # Crear DataFrame
-            df_metodos = pd.DataFrame(datos_metodos, 
-                                    columns=["Método de Pago", "Cantidad", "Monto Total", 
-                                           "Ingreso Real", "Deuda Pendiente", "Promedio"])
-            
-            # Crear columnas para la visualización
-            col1, col2 = st.columns([2,1])
-            
-            with col1:
-                # Formatear las columnas numéricas para la tabla
-                df_display = df_metodos.copy()
-                for col in ["Monto Total", "Ingreso Real", "Deuda Pendiente", "Promedio"]:
-                    df_display[col] = df_display[col].apply(lambda x: f"${x:,.2f}")
-                
-                st.dataframe(
-                    df_display,
-                    column_config={
-                        "Método de Pago": st.column_config.TextColumn("💳 Método de Pago"),
-                        "Cantidad": st.column_config.NumberColumn("📊 Cant. Ventas"),
-                        "Monto Total": st.column_config.TextColumn("💰 Monto Total"),
-                        "Ingreso Real": st.column_config.TextColumn("💵 Ingreso Real"),
-                        "Deuda Pendiente": st.column_config.TextColumn("📝 Deuda"),
-                        "Promedio": st.column_config.TextColumn("📈 Promedio")
-                    },
-                    hide_index=True,
-                    width=800
-                )
-            
-            with col2:
-                st.markdown("#### 📊 Análisis")
-                # Calcular totales
-                total_ingreso = df_metodos["Ingreso Real"].sum()
-                total_deuda = df_metodos["Deuda Pendiente"].sum()
-                total_general = total_ingreso + total_deuda
-                
-                st.metric("💰 Total Ingresos", f"${total_ingreso:,.2f}")
-                st.metric("📝 Deuda Pendiente", f"${total_deuda:,.2f}")
-                st.metric("💵 Total General", f"${total_general:,.2f}")
-                
-                # Método más usado
-                metodo_principal = df_metodos.iloc[0]
-                st.metric(
-                    "Método más usado",
-                    metodo_principal["Método de Pago"],
-                    f"{metodo_principal['Cantidad']} ventas"
-                )
-        else:
-            st.info("No hay datos de métodos de pago para mostrar.")
+        lugares["por_metodo"] = st.empty()
 
         # 3. Tabla de ventas mensuales
         st.markdown("---")
         st.write("### Movimientos Mensuales")
-        cur.execute("""
-            WITH DatosMensuales AS (
-                SELECT 
-                    DATE_TRUNC('month', fecha)::DATE as mes,
-                    COUNT(id) as cantidad_ventas,
-                    CAST(SUM(ingreso) AS FLOAT) as monto_total,
-                    CAST(SUM(ingreso) AS FLOAT) as ingreso_real,
-                    CAST(SUM(deuda) AS FLOAT) as deuda_pendiente,
-                    CAST(SUM(CASE WHEN metodo_pago = 'Efectivo' THEN ingreso ELSE 0 END) AS FLOAT) as total_efectivo,
-                    CAST(SUM(CASE WHEN metodo_pago IN ('Mercado Pago', 'Cuenta DNI') THEN ingreso ELSE 0 END) AS FLOAT) as total_digital,
-                    CAST(AVG(ingreso) AS FLOAT) as promedio_venta
-                FROM ventas
-                WHERE fecha >= CURRENT_DATE - INTERVAL '12 months'
-                AND metodo_pago != 'Cierre'
-                GROUP BY DATE_TRUNC('month', fecha)::DATE
-                ORDER BY mes DESC
-            )
-            SELECT * FROM DatosMensuales;
-        """)
-        datos_mensuales = cur.fetchall()
-        
-        if datos_mensuales:
-            # Crear DataFrame
-            df_mensual = pd.DataFrame(datos_mensuales, 
-                                    columns=["Mes", "Cantidad", "Monto Total", "Ingreso Real", 
-                                           "Deuda Pendiente", "Total Efectivo", "Total Digital", "Promedio"])
-            
-            # Formatear la fecha para mejor visualización
-            df_mensual["Mes"] = pd.to_datetime(df_mensual["Mes"]).dt.strftime('%B %Y')
-            
-            # Crear columnas para la visualización
-            col1, col2 = st.columns([2,1])
-            
-            with col1:
-                # Formatear las columnas numéricas para la tabla
-                df_display = df_mensual.copy()
-                columnas_moneda = ["Monto Total", "Ingreso Real", "Deuda Pendiente", 
-                                 "Total Efectivo", "Total Digital", "Promedio"]
-                for col in columnas_moneda:
-                    df_display[col] = df_display[col].apply(lambda x: f"${x:,.2f}")
-                
-                st.dataframe(
-                    df_display,
-                    column_config={
-                        "Mes": st.column_config.TextColumn("📅 Mes"),
-                        "Cantidad": st.column_config.NumberColumn("📊 Ventas"),
-                        "Monto Total": st.column_config.TextColumn("💰 Total"),
-                        "Ingreso Real": st.column_config.TextColumn("💵 Ingreso"),
-                        "Deuda Pendiente": st.column_config.TextColumn("📝 Deuda"),
-                        "Total Efectivo": st.column_config.TextColumn("💵 Efectivo"),
-                        "Total Digital": st.column_config.TextColumn("💳 Digital"),
-                        "Promedio": st.column_config.TextColumn("📈 Promedio")
-                    },
-                    hide_index=True,
-                    width=800
-                )
-            
-            with col2:
-                st.markdown("#### 📊 Análisis del Mes")
-                # Obtener datos del mes actual
-                mes_actual = df_mensual.iloc[0]
-                
-                # Obtener los valores de efectivo y digital
-                efectivo_actual = float(mes_actual['Total Efectivo'])
-                digital_actual = float(mes_actual['Total Digital'])
-                
-                # Calcular porcentajes de efectivo y digital
-                total_medios = efectivo_actual + digital_actual
-                if total_medios > 0:
-                    porc_efectivo = (efectivo_actual / total_medios) * 100
-                    porc_digital = (digital_actual / total_medios) * 100
-                    
-                    # Mostrar solo los porcentajes
-                    st.metric("💵 % Efectivo", f"{porc_efectivo:.1f}%")
-                    st.metric("💳 % Digital", f"{porc_digital:.1f}%")
-        else:
-            st.info("No hay datos mensuales para mostrar.")
+        lugares["mensual"] = st.empty()
 
-    elif vista == "📝 Registro de Operaciones":
-        st.title("📝 Registro de Ventas y Egresos")
-        # Mostrar el formulario de registro aquí
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Estilo personalizado para el botón y formulario
-        st.markdown("""
-            <style>
-            .stButton>button {
-                background-color: #F0FFF0;
-                color: #2E8B57;
-                padding: 10px 24px;
-                border-radius: 5px;
-                border: none;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                transition: all 0.3s ease;
-                font-weight: 500;
-            }
-            .stButton>button:hover {
-                background-color: #E0EEE0;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-            }
-            .stButton>button:active {
-                background-color: #D1EED1;
-                box-shadow: 0 1px 2px rgba(0,0,0,0.1);
-            }
-            /* Quitar borde del formulario */
-            .stForm {
-                border: none !important;
-                padding: 0 !important;
-            }
-            div[data-testid="stForm"] {
-                border: none !important;
-                padding: 0 !important;
-            }
-            </style>
-        """, unsafe_allow_html=True)
-
-        # -------- REGISTRO DE VENTAS --------
-        st.subheader("Registrar venta")
-
-        # Inicializar variables en session_state si no existen
-        if 'form_submitted' not in st.session_state:
-            st.session_state.form_submitted = False
+        for lugar in lugares.values():
+            lugar.caption("⏳ Cargando...")
 
-        if 'monto_compra' not in st.session_state:
-            st.session_state.monto_compra = 0.0
-        if 'dinero_entregado' not in st.session_state:
-            st.session_state.dinero_entregado = 0.0
-        if 'vuelto_calculado' not in st.session_state:
-            st.session_state.vuelto_calculado = 0.0
-
-        # Variables para el cálculo del vuelto fuera del formulario
-        col1, col2 = st.columns(2)
-        with col1:
-            monto_compra = st.number_input("Monto de la compra", 
-                                         min_value=0.0, 
-                                         step=100.0, 
-                                         key="monto_compra_key", 
-                                         format="%.2f",
-                                         value=0.0 if st.session_state.form_submitted else st.session_state.get('monto_compra', 0.0),
-                                         on_change=calcular_vuelto)
-        with col2:
-            metodo_pago = st.selectbox("Método de pago", 
-                                     ["Efectivo", "Mercado Pago", "Cuenta DNI", "Fiado"], 
-                                     key="metodo_fuera",
-                                     index=0 if st.session_state.form_submitted else None)
-
-        # Variable para almacenar el vuelto calculado
-        vuelto_calculado = 0.0
-        dinero_entregado = 0.0
-        cliente_fiado = None
-        telefono_fiado = None
-
-        # Mostrar campo de dinero entregado si es efectivo
-        if metodo_pago == "Efectivo":
-            dinero_entregado = st.number_input("Dinero entregado por el cliente", 
-                                             min_value=0.0, 
-                                             step=100.0, 
-                                             key="dinero_entregado_key",
-                                             format="%.2f",
-                                             value=0.0 if st.session_state.form_submitted else st.session_state.get('dinero_entregado', 0.0),
-                                             on_change=calcular_vuelto)
-            
-            # Mostrar el vuelto calculado
-            if st.session_state.vuelto_calculado != 0:
-                if st.session_state.vuelto_calculado >= 0:
-                    st.info(f"💵 Vuelto a entregar: ${st.session_state.vuelto_calculado:,.2f}")
+        # Cada sección se dibuja apenas llega su resultado; el Resumen de la tabla
+        # por día espera además a la comparativa
+        comparativa, lugar_resumen, llegadas = None, None, set()
+        for nombre, resultado, error in paralelo.a_medida_que_terminan(futuros):
+            llegadas.add(nombre)
+            if error is not None:
+                mostrar_error_carga(lugares[nombre], error)
+            else:
+                with lugares[nombre].container():
+                    if nombre == "comparativa":
+                        comparativa = resultado
+                        mostrar_comparativa(comparativa)
+                    elif nombre == "por_dia":
+                        mostrar_origen(resultado[0])
+                        lugar_resumen = mostrar_por_dia(resultado[1])
+                    elif nombre == "por_metodo":
+                        mostrar_origen(resultado[0])
+                        mostrar_por_metodo(resultado[1])
+                    else:
+                        mostrar_mensual(*resultado)
+            if lugar_resumen is not None and "comparativa" in llegadas:
+                if comparativa is None:
+                    lugar_resumen.empty()
                 else:
-                    st.warning(f"⚠️ Falta dinero por cobrar: ${abs(st.session_state.vuelto_calculado):,.2f}")
-        elif metodo_pago == "Fiado":
-            col1, col2 = st.columns(2)
-            with col1:
-                cliente_fiado = st.text_input("Nombre del cliente",
-                                            value="" if st.session_state.form_submitted else st.session_state.get('cliente_fiado', ""))
-            with col2:
-                telefono_fiado = st.text_input("Teléfono (opcional)",
-                                             value="" if st.session_state.form_submitted else st.session_state.get('telefono_fiado', ""))
+                    with lugar_resumen.container():
+                        mostrar_resumen(comparativa)
+                lugar_resumen = None
 
-        # Crear un formulario para la venta
-        with st.form("formulario_venta", clear_on_submit=True):
-            submitted = st.form_submit_button("Registrar Venta")
-            
-            if submitted:
-                if monto_compra <= 0:
-                    st.error("❌ El monto debe ser mayor a 0")
-                elif metodo_pago == "Efectivo" and dinero_entregado < monto_compra:
-                    st.error("❌ El dinero entregado debe ser mayor o igual al monto de la compra")
-                elif metodo_pago == "Fiado" and not cliente_fiado:
-                    st.error("❌ Debe ingresar el nombre del cliente para ventas fiadas")
-                else:
-                    # Preparar valores según el método de pago
-                    if metodo_pago == "Efectivo":
-                        ingreso = monto_compra
-                        entregado = dinero_entregado
-                        vuelto = vuelto_calculado
-                        deuda = 0.0
-                    elif metodo_pago in ["Mercado Pago", "Cuenta DNI"]:
-                        ingreso = monto_compra
-                        entregado = monto_compra
-                        vuelto = 0.0
-                        deuda = 0.0
-                    else:  # Fiado
-                        ingreso = 0.0
-                        entregado = 0.0
-                        vuelto = 0.0
-                        deuda = monto_compra
-
-                    # Registrar la venta
-                    if registrar_venta(
-                        st.session_state["sucursal"], 
-                        monto_compra, 
-                        metodo_pago, 
-                        entregado, 
-                        vuelto, 
-                        ingreso, 
-                        deuda,
-                        cliente_fiado,
-                        telefono_fiado
-                    ):
-                        st.success("✅ Venta registrada correctamente")
-                        # Marcar el formulario como enviado para limpiar los campos
-                        st.session_state.form_submitted = True
-                        # Limpiar los valores almacenados
-                        st.session_state.monto_compra = 0.0
-                        st.session_state.dinero_entregado = 0.0
-                        st.session_state.cliente_fiado = ""
-                        st.session_state.telefono_fiado = ""
-                        time.sleep(0.5)
-                        st.rerun()
-
-        # Después del formulario de ventas
-        st.markdown("---")  # Línea divisoria
+    elif vista == "📝 Registro de Operaciones":
+        vista_registro()
 
-        # -------- REGISTRO DE EGRESOS --------
-        st.subheader("➖ Registrar Egreso")
+    elif vista == "💰 Cierre de caja":
+        st.title("💰 Cierre de Caja por Sucursal")
+        mostrar_mensaje("mensaje_cierre")
+        
+        # Selector de fecha
+        col_fecha, col_espacio = st.columns([1, 3])
+        with col_fecha:
+            fecha_seleccionada = st.date_input(
+                "Seleccionar fecha",
+                value=datetime.now().date(),
+                max_value=datetime.now().date()
+            )
+        
+        # Cierres ya registrados del día (cacheados hasta la próxima escritura)
+        sucursal = st.session_state["sucursal"]
+        desde, hasta = consultas.rango_dia(fecha_seleccionada)
+        cierres = cache.resultados.obtener(
+            "cierres", sucursal, (desde, hasta),
+            lambda: consultas.cargar_cierres(sucursal, fecha_seleccionada)
+        )
 
-        # Inicializar variables para egresos en session_state
-        if 'egreso_submitted' not in st.session_state:
-            st.session_state.egreso_submitted = False
+        # Turno abierto: solo se suman los movimientos posteriores al último cierre
+        fin_turno = min(datetime.now(), datetime.combine(hasta, datetime.min.time()))
+        dia_cerrado = bool(cierres) and cierres[-1].hasta >= fin_turno
+        if dia_cerrado:
+            turno, inicio_turno, totales_turno = None, None, consultas.TotalesCaja()
+        else:
+            turno, inicio_turno, totales_turno = consultas.cargar_turno_abierto(sucursal, fecha_seleccionada, fin_turno)
 
-        with st.form("form_egreso", clear_on_submit=True):
-            motivo = st.selectbox("Motivo del egreso", 
-                                 ["Proveedor", "Sueldos", "Reparaciones", "Otros"] if st.session_state["rol"] == "dueño" else ["Proveedor", "Reparaciones", "Otros"],
-                                 key="motivo_egreso")
+        totales = totales_turno
+        for cierre in cierres:
+            totales = totales + cierre.totales
+
+        if cierres or totales.con_movimientos:
+            # Mostrar resumen del día
+            st.subheader("📊 Resumen del Día")
+            col1, col2 = st.columns(2)
             
-            # Campos específicos para sueldos (solo visible para el dueño)
-            if motivo == "Sueldos" and st.session_state["rol"] == "dueño":
-                st.write("📋 Detalle de sueldos")
-                
-                # Obtener empleados activos de la sucursal y su último pago
-                conn = get_connection()
-                cur = conn.cursor()
-                cur.execute("""
-                    WITH UltimoPago AS (
-                        SELECT 
-                            e.detalle,
-                            MAX(e.fecha) as ultimo_pago
-                        FROM egresos e
-                        WHERE e.motivo = 'Sueldos'
-                        GROUP BY e.detalle
-                    )
-                    SELECT 
-                        emp.id, 
-                        emp.nombre, 
-                        emp.sueldo_base,
-                        up.ultimo_pago
-                    FROM empleados emp
-                    LEFT JOIN UltimoPago up ON up.detalle = CONCAT('Sueldo de ', emp.nombre)
-                    WHERE emp.sucursal = %s AND emp.activo = TRUE
-                    ORDER BY emp.nombre
-                """, (st.session_state["sucursal"],))
-                empleados_db = cur.fetchall()
-                conn.close()
-                
-                if not empleados_db:
-                    st.warning("⚠️ No hay empleados registrados en esta sucursal")
-                    if st.button("➕ Agregar empleado"):
-                        st.info("Función en desarrollo")
-                else:
-                    # Crear DataFrame con los empleados
-                    df_empleados = pd.DataFrame(empleados_db, columns=["ID", "Nombre", "Sueldo Base", "Último Pago"])
-                    
-                    # Agregar columna de checkbox para seleccionar empleados a pagar
-                    df_empleados["Pagar"] = False
-                    
-                    # Mostrar la tabla con checkboxes editables
-                    df_empleados_editado = st.data_editor(
-                        df_empleados,
-                        column_config={
-                            "ID": st.column_config.NumberColumn("ID", disabled=True),
-                            "Nombre": st.column_config.TextColumn("Nombre", disabled=True),
-                            "Sueldo Base": st.column_config.NumberColumn(
-                                "Sueldo Base",
-                                help="Monto base del sueldo",
-                                min_value=0,
-                                max_value=1000000,
-                                step=1000,
-                                format="$%d"
-                            ),
-                            "Último Pago": st.column_config.DatetimeColumn(
-                                "Último Pago",
-                                help="Fecha del último pago realizado",
-                                format="DD/MM/YYYY HH:mm",
-                                disabled=True
-                            ),
-                            "Pagar": st.column_config.CheckboxColumn(
-                                "Pagar",
-                                help="Seleccionar para pagar"
-                            )
-                        },
-                        hide_index=True,
-                        key="tabla_empleados"
-                    )
-                    
-                    # Calcular total a pagar de los empleados seleccionados
-                    empleados_a_pagar = df_empleados_editado[df_empleados_editado["Pagar"]]
-                    monto_total = empleados_a_pagar["Sueldo Base"].sum()
-                    
-                    if monto_total > 0:
-                        st.info(f"💰 Total a pagar: ${monto_total:,.2f}")
-                        
-                        # Campo de observación
-                        observacion = st.text_area(
-                            "Observaciones (opcional)", 
-                            height=100,
-                            value="" if st.session_state.egreso_submitted else st.session_state.get('observacion', ""),
-                            key="obs_sueldos"
-                        )
-                        
-                        # Botón para confirmar el pago
-                        if st.button("💸 Confirmar Pago de Sueldos"):
-                            fecha_pago = datetime.now()
-                            conn = get_connection()
-                            cur = conn.cursor()
-                            try:
-                                for _, empleado in empleados_a_pagar.iterrows():
-                                    detalle = f"Sueldo de {empleado['Nombre']}"
-                                    cur.execute("""
-                                        INSERT INTO egresos (sucursal, motivo, monto, observacion, fecha, detalle)
-                                        VALUES (%s, %s, %s, %s, %s, %s)
-                                    """, (st.session_state["sucursal"], "Sueldos", empleado["Sueldo Base"], 
-                                         observacion, fecha_pago, detalle))
-                                
-                                conn.commit()
-                                st.success(f"✅ Se han pagado {len(empleados_a_pagar)} sueldos por un total de ${monto_total:,.2f}")
-                                time.sleep(1)
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Error al registrar los pagos: {str(e)}")
-                                conn.rollback()
-                            finally:
-                                conn.close()
-            else:
-                monto_total = st.number_input("Monto del egreso", 
-                                            min_value=0.0, 
-                                            step=100.0, 
-                                            format="%.2f",
-                                            value=0.0 if st.session_state.egreso_submitted else st.session_state.get('monto_egreso', 0.0))
+            with col1:
+                st.metric("💵 Ventas en Efectivo", f"${totales.efectivo:,.2f}")
+                st.metric("💳 Ventas Digitales", f"${totales.digital:,.2f}")
+                st.metric("📝 Ventas Fiadas", f"${totales.fiado:,.2f}")
+                st.metric("➖ Egresos", f"${totales.egresos:,.2f}")
+                if totales.cobros_efectivo or totales.cobros_digital:
+                    st.metric("🤝 Cobros de Fiado en Efectivo", f"${totales.cobros_efectivo:,.2f}")
+                    st.metric("🤝 Cobros de Fiado Digitales", f"${totales.cobros_digital:,.2f}")
+                st.metric("💰 Saldo Teórico en Caja", f"${totales.saldo_teorico:,.2f}")
             
-            # Campo de observación
-            observacion = st.text_area("Observaciones (opcional)", 
-                                      height=100,
-                                      value="" if st.session_state.egreso_submitted else st.session_state.get('observacion', ""))
+            with col2:
+                for cierre in cierres:
+                    st.subheader(f"📋 Cierre Turno {cierre.turno} ({cierre.desde:%H:%M} a {cierre.hasta:%H:%M})")
+                    st.metric("💰 Monto Contado", f"${cierre.contado:,.2f}")
+                    if cierre.diferencia > 0:
+                        st.info(f"📈 Sobrante en caja: ${cierre.diferencia:,.2f}")
+                    elif cierre.diferencia < 0:
+                        st.warning(f"📉 Faltante en caja: ${abs(cierre.diferencia):,.2f}")
 
-            submitted = st.form_submit_button("Registrar Egreso")
-            
-            if submitted:
-                if motivo == "Sueldos" and not empleados_a_pagar.empty:
-                    st.error("❌ Debe pagar todos los sueldos antes de registrar el egreso")
-                elif motivo != "Sueldos" and monto_total <= 0:
-                    st.error("❌ El monto debe ser mayor a 0")
-                else:
-                    conn = get_connection()
-                    cur = conn.cursor()
-                    try:
-                        if motivo == "Sueldos":
-                            # Registrar cada sueldo como un egreso individual
-                            for _, empleado in empleados_a_pagar.iterrows():
-                                detalle = f"Sueldo de {empleado['Nombre']}"
-                                cur.execute("""
-                                    INSERT INTO egresos (sucursal, motivo, monto, observacion, fecha, detalle)
-                                    VALUES (%s, %s, %s, %s, %s, %s)
-                                """, (st.session_state["sucursal"], motivo, empleado["Sueldo Base"], observacion, datetime.now(), detalle))
-                        else:
-                            # Registrar egreso normal
-                            cur.execute("""
-                                INSERT INTO egresos (sucursal, motivo, monto, observacion, fecha)
-                                VALUES (%s, %s, %s, %s, %s)
-                            """, (st.session_state["sucursal"], motivo, monto_total, observacion, datetime.now()))
+                if not dia_cerrado:
+                    st.subheader(f"✍️ Registrar Cierre Turno {turno}")
+                    st.caption(f"Desde las {inicio_turno:%H:%M} · Saldo teórico del turno: ${totales_turno.saldo_teorico:,.2f}")
+                    with st.form("form_cierre"):
+                        monto_contado = st.number_input("Monto contado en efectivo", 
+                                                      min_value=0.0, 
+                                                      step=100.0,
+                                                      format="%.2f")
                         
-                        conn.commit()
-                        st.success(f"✅ Egreso de ${monto_total:,.2f} registrado correctamente")
+                        observaciones = st.text_area("Observaciones", height=100)
                         
-                        # Limpiar los campos
-                        st.session_state.egreso_submitted = True
-                        st.session_state.monto_egreso = 0.0
-                        st.session_state.observacion = ""
+                        submitted = st.form_submit_button("Registrar Cierre")
                         
-                        time.sleep(0.5)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error al registrar el egreso: {str(e)}")
-                        conn.rollback()
-                    finally:
-                        conn.close()
-
-    elif vista == "💰 Cierre de caja":
-        st.title("💰 Cierre de Caja por Sucursal")
-        # Establecer conexión al inicio de la vista
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        try:
-            # Selector de fecha
-            col_fecha, col_espacio = st.columns([1, 3])
-            with col_fecha:
-                fecha_seleccionada = st.date_input(
-                    "Seleccionar fecha",
-                    value=datetime.now().date(),
-                    max_value=datetime.now().date()
-                )
-            
-            # Consulta para obtener totales del día
-            cur.execute("""
-                WITH Totales AS (
-                    SELECT 
-                        CAST(SUM(CASE WHEN metodo_pago = 'Efectivo' THEN ingreso ELSE 0 END) AS FLOAT) as efectivo,
-                        CAST(SUM(CASE WHEN metodo_pago IN ('Mercado Pago', 'Cuenta DNI') THEN ingreso ELSE 0 END) AS FLOAT) as digital,
-                        CAST(SUM(CASE WHEN metodo_pago = 'Fiado' THEN monto ELSE 0 END) AS FLOAT) as fiado
-                    FROM ventas 
-                    WHERE DATE(fecha) = %s
-                    AND sucursal = %s
-                    AND metodo_pago != 'Cierre'
-                ),
-                TotalEgresos AS (
-                    SELECT CAST(SUM(monto) AS FLOAT) as egresos
-                    FROM egresos 
-                    WHERE DATE(fecha) = %s
-                    AND sucursal = %s
-                ),
-                CierreCaja AS (
-                    SELECT 
-                        monto as monto_cierre,
-                        ingreso as diferencia
-                    FROM ventas
-                    WHERE DATE(fecha) = %s
-                    AND sucursal = %s
-                    AND metodo_pago = 'Cierre'
-                )
-                SELECT 
-                    COALESCE(efectivo, 0) as efectivo,
-                    COALESCE(digital, 0) as digital,
-                    COALESCE(fiado, 0) as fiado,
-                    COALESCE(egresos, 0) as egresos,
-                    COALESCE(monto_cierre, 0) as monto_cierre,
-                    COALESCE(diferencia, 0) as diferencia
-                FROM Totales, TotalEgresos 
-                LEFT JOIN CierreCaja ON true;
-            """, (fecha_seleccionada, st.session_state["sucursal"], 
-                 fecha_seleccionada, st.session_state["sucursal"],
-                 fecha_seleccionada, st.session_state["sucursal"]))
-            
-            totales = cur.fetchone()
-            if totales:
-                efectivo, digital, fiado, egresos, monto_cierre, diferencia = totales
-                
-                # Mostrar resumen del día
-                st.subheader("📊 Resumen del Día")
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.metric("💵 Ventas en Efectivo", f"${efectivo:,.2f}")
-                    st.metric("💳 Ventas Digitales", f"${digital:,.2f}")
-                    st.metric("📝 Ventas Fiadas", f"${fiado:,.2f}")
-                    st.metric("➖ Egresos", f"${egresos:,.2f}")
-                    
-                    # Calcular saldo teórico en caja
-                    saldo_teorico = efectivo - egresos
-                    st.metric("💰 Saldo Teórico en Caja", f"${saldo_teorico:,.2f}")
-                
-                with col2:
-                    # Verificar si ya existe un cierre
-                    if monto_cierre > 0:
-                        st.subheader("📋 Cierre Registrado")
-                        st.metric("💰 Monto Contado", f"${monto_cierre:,.2f}")
-                        if diferencia > 0:
-                            st.info(f"📈 Sobrante en caja: ${diferencia:,.2f}")
-                        elif diferencia < 0:
-                            st.warning(f"📉 Faltante en caja: ${abs(diferencia):,.2f}")
-                    else:
-                        st.subheader("✍️ Registrar Cierre")
-                        with st.form("form_cierre"):
-                            monto_contado = st.number_input("Monto contado en efectivo", 
-                                                          min_value=0.0, 
-                                                          step=100.0,
-                                                          format="%.2f")
-                            
-                            observaciones = st.text_area("Observaciones", height=100)
-                            
-                            submitted = st.form_submit_button("Registrar Cierre")
-                            
-                            if submitted:
-                                # Calcular diferencia
-                                diferencia = monto_contado - saldo_teorico
-                                
-                                # Registrar el cierre como una venta especial
-                                cur.execute("""
-                                    INSERT INTO ventas 
-                                    (sucursal, monto, metodo_pago, ingreso, deuda, fecha)
-                                    VALUES (%s, %s, 'Cierre', %s, 0, %s)
-                                """, (
-                                    st.session_state["sucursal"],
-                                    monto_contado,
-                                    diferencia,
-                                    fecha_seleccionada
-                                ))
-                                
-                                conn.commit()
-                                st.success("✅ Cierre registrado correctamente")
-                                
-                                if abs(diferencia) > 0:
-                                    if diferencia > 0:
-                                        st.info(f"📈 Sobrante en caja: ${diferencia:,.2f}")
-                                    else:
-                                        st.warning(f"📉 Faltante en caja: ${abs(diferencia):,.2f}")
-                                
-                                time.sleep(1)
-                                st.rerun()
-            else:
-                st.info("No hay movimientos registrados para la fecha seleccionada")
-            
-        finally:
-            # Cerrar la conexión al finalizar
-            cur.close()
-            conn.close()
+                        if submitted and cerrar_turno(sucursal, fecha_seleccionada, hasta, monto_contado, observaciones):
+                            # Se vuelve a dibujar con el cierre nuevo; el resultado queda en mensaje_cierre
+                            st.rerun()
+        else:
+            st.info("No hay movimientos registrados para la fecha seleccionada")
 
-else:
-    # Interfaz para cajeros
-    st.title("📝 Registro de Ventas y Egresos")
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # Estilo personalizado para el botón y formulario
-    st.markdown("""
-        <style>
-        .stButton>button {
-            background-color: #F0FFF0;
-            color: #2E8B57;
-            padding: 10px 24px;
-            border-radius: 5px;
-            border: none;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            transition: all 0.3s ease;
-            font-weight: 500;
-        }
-        .stButton>button:hover {
-            background-color: #E0EEE0;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-        }
-        .stButton>button:active {
-            background-color: #D1EED1;
-            box-shadow: 0 1px 2px rgba(0,0,0,0.1);
-        }
-        /* Quitar borde del formulario */
-        .stForm {
-            border: none !important;
-            padding: 0 !important;
-        }
-        div[data-testid="stForm"] {
-            border: none !important;
-            padding: 0 !important;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-
-    # -------- REGISTRO DE VENTAS --------
-    st.subheader("Registrar venta")
+    elif vista == "👥 Clientes":
+        st.title("👥 Cuentas de Clientes")
 
-    # Inicializar variables en session_state si no existen
-    if 'form_submitted' not in st.session_state:
-        st.session_state.form_submitted = False
+        # Una fila por cliente con saldo: los triggers de la base mantienen saldo y antigüedad
+        saldos = consultas.cargar_saldos_clientes()
+        deudores = [cliente for cliente in saldos if cliente.saldo > 0]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("📝 Deuda total", f"${sum(c.saldo for c in deudores):,.2f}")
+        col2.metric("👥 Clientes con deuda", len(deudores))
+        col3.metric("⏰ Deuda de más de 90 días", f"${sum(c.mas_de_90 for c in deudores):,.2f}")
 
-    if 'monto_compra' not in st.session_state:
-        st.session_state.monto_compra = 0.0
-    if 'dinero_entregado' not in st.session_state:
-        st.session_state.dinero_entregado = 0.0
-    if 'vuelto_calculado' not in st.session_state:
-        st.session_state.vuelto_calculado = 0.0
+        if not saldos:
+            st.info("No hay clientes con saldo pendiente")
+        else:
+            st.subheader("📋 Quién debe cuánto")
+            st.dataframe(
+                pd.DataFrame(saldos).drop(columns="id"),
+                column_config={
+                    "nombre": "Cliente",
+                    "telefono": "Teléfono",
+                    "saldo": columna_moneda("Saldo"),
+                    "hasta_30": columna_moneda("Hasta 30 días"),
+                    "de_31_a_60": columna_moneda("31 a 60 días"),
+                    "de_61_a_90": columna_moneda("61 a 90 días"),
+                    "mas_de_90": columna_moneda("Más de 90 días"),
+                    "deuda_desde": st.column_config.DateColumn("Debe desde", format="DD/MM/YYYY"),
+                    "ultimo_movimiento": st.column_config.DatetimeColumn("Último movimiento", format="DD/MM/YYYY HH:mm"),
+                },
+                hide_index=True
+            )
+            st.caption("Un saldo negativo es dinero a favor del cliente. Los cobros cancelan primero la deuda más vieja.")
 
-    # Variables para el cálculo del vuelto fuera del formulario
-    col1, col2 = st.columns(2)
-    with col1:
-        monto_compra = st.number_input("Monto de la compra", 
-                                     min_value=0.0, 
-                                     step=100.0, 
-                                     key="monto_compra_key", 
-                                     format="%.2f",
-                                     value=0.0 if st.session_state.form_submitted else st.session_state.get('monto_compra', 0.0),
-                                     on_change=calcular_vuelto)
-    with col2:
-        metodo_pago = st.selectbox("Método de pago", 
-                                 ["Efectivo", "Mercado Pago", "Cuenta DNI", "Fiado"], 
-                                 key="metodo_fuera",
-                                 index=0 if st.session_state.form_submitted else None)
+            nombres = {cliente.id: cliente.nombre for cliente in saldos}
+            cliente_id = st.selectbox("Ver movimientos de", list(nombres), index=None,
+                                      format_func=nombres.get)
+            if cliente_id is not None:
+                movimientos = consultar(consultas.MOVIMIENTOS_CLIENTE, {"cliente_id": cliente_id, "limite": 100})
+                st.dataframe(
+                    pd.DataFrame(movimientos, columns=["Fecha", "Tipo", "Monto", "Sucursal", "Método de Pago"]),
+                    column_config={
+                        "Fecha": st.column_config.DatetimeColumn("Fecha", format="DD/MM/YYYY HH:mm"),
+                        "Monto": columna_moneda("Monto"),
+                    },
+                    hide_index=True
+                )
 
-    # Variable para almacenar el vuelto calculado
-    vuelto_calculado = 0.0
-    dinero_entregado = 0.0
-    cliente_fiado = None
-    telefono_fiado = None
+    elif vista == "📤 Exportar":
+        st.title("📤 Exportar para el Contador")
 
-    # Mostrar campo de dinero entregado si es efectivo
-    if metodo_pago == "Efectivo":
-        dinero_entregado = st.number_input("Dinero entregado por el cliente", 
-                                         min_value=0.0, 
-                                         step=100.0, 
-                                         key="dinero_entregado_key",
-                                         format="%.2f",
-                                         value=0.0 if st.session_state.form_submitted else st.session_state.get('dinero_entregado', 0.0),
-                                         on_change=calcular_vuelto)
-        
-        # Mostrar el vuelto calculado
-        if st.session_state.vuelto_calculado != 0:
-            if st.session_state.vuelto_calculado >= 0:
-                st.info(f"💵 Vuelto a entregar: ${st.session_state.vuelto_calculado:,.2f}")
-            else:
-                st.warning(f"⚠️ Falta dinero por cobrar: ${abs(st.session_state.vuelto_calculado):,.2f}")
-    elif metodo_pago == "Fiado":
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         with col1:
-            cliente_fiado = st.text_input("Nombre del cliente",
-                                        value="" if st.session_state.form_submitted else st.session_state.get('cliente_fiado', ""))
+            tabla = st.selectbox("Datos", ["ventas", "egresos"], format_func=str.capitalize)
+            formatos = list(exportar.FORMATOS) if exportar.parquet_disponible() else ["csv"]
+            formato = st.selectbox("Formato", formatos,
+                                   format_func=lambda f: "Parquet (comprimido)" if f == "parquet" else "CSV")
+            if "parquet" not in formatos:
+                st.caption("Para exportar Parquet hace falta pyarrow (pip install -r requirements-opcional.txt)")
         with col2:
-            telefono_fiado = st.text_input("Teléfono (opcional)",
-                                         value="" if st.session_state.form_submitted else st.session_state.get('telefono_fiado', ""))
+            anio = st.selectbox("Año", list(range(datetime.now().year, datetime.now().year - 10, -1)))
+            mes = st.selectbox("Mes", [None] + list(MESES), format_func=lambda m: "Año completo" if m is None else MESES[m])
+        with col3:
+            sucursal_exportar = st.selectbox("Sucursal", [None, *sucursales.activas()],
+                                             format_func=lambda s: s or "Todas")
 
-    # Crear un formulario para la venta
-    with st.form("formulario_venta", clear_on_submit=True):
-        submitted = st.form_submit_button("Registrar Venta")
-        
-        if submitted:
-            if monto_compra <= 0:
-                st.error("❌ El monto debe ser mayor a 0")
-            elif metodo_pago == "Efectivo" and dinero_entregado < monto_compra:
-                st.error("❌ El dinero entregado debe ser mayor o igual al monto de la compra")
-            elif metodo_pago == "Fiado" and not cliente_fiado:
-                st.error("❌ Debe ingresar el nombre del cliente para ventas fiadas")
-            else:
-                # Preparar valores según el método de pago
-                if metodo_pago == "Efectivo":
-                    ingreso = monto_compra
-                    entregado = dinero_entregado
-                    vuelto = vuelto_calculado
-                    deuda = 0.0
-                elif metodo_pago in ["Mercado Pago", "Cuenta DNI"]:
-                    ingreso = monto_compra
-                    entregado = monto_compra
-                    vuelto = 0.0
-                    deuda = 0.0
-                else:  # Fiado
-                    ingreso = 0.0
-                    entregado = 0.0
-                    vuelto = 0.0
-                    deuda = monto_compra
-
-                # Registrar la venta
-                if registrar_venta(
-                    st.session_state["sucursal"], 
-                    monto_compra, 
-                    metodo_pago, 
-                    entregado, 
-                    vuelto, 
-                    ingreso, 
-                    deuda,
-                    cliente_fiado,
-                    telefono_fiado
-                ):
-                    st.success("✅ Venta registrada correctamente")
-                    # Marcar el formulario como enviado para limpiar los campos
-                    st.session_state.form_submitted = True
-                    # Limpiar los valores almacenados
-                    st.session_state.monto_compra = 0.0
-                    st.session_state.dinero_entregado = 0.0
-                    st.session_state.cliente_fiado = ""
-                    st.session_state.telefono_fiado = ""
-                    time.sleep(0.5)
-                    st.rerun()
-
-    # Después del formulario de ventas
-    st.markdown("---")  # Línea divisoria
+        if st.button("Generar archivo"):
+            # El archivo se escribe por lotes en un temporal que se borra apenas
+            # se lee; la descarga se sirve desde memoria, por eso hay un tope
+            # de EXPORTAR_MAX_MB y los archivos más grandes se piden al script
+            st.session_state.pop("exportacion", None)
+            nombre = exportar.nombre_archivo(tabla, anio, mes, formato, sucursal_exportar)
+            desde, hasta = exportar.rango_periodo(anio, mes)
+            with tempfile.TemporaryDirectory(prefix="caja_") as directorio:
+                ruta = Path(directorio) / nombre
+                with st.spinner("Generando archivo..."):
+                    filas = exportar.exportar(tabla, ruta, desde, hasta, formato, sucursal_exportar)
+                tamanio = ruta.stat().st_size
+                if tamanio > exportar.EXPORTAR_MAX_MB * 1024 * 1024:
+                    st.warning(f"⚠️ {nombre} ocupa {tamanio / 1024 / 1024:,.0f} MB, más que el máximo de "
+                               f"{exportar.EXPORTAR_MAX_MB:,.0f} MB para descargar desde la app. Generalo en el servidor con:")
+                    st.code(exportar.comando(tabla, anio, mes, formato, sucursal_exportar), language="bash")
+                else:
+                    st.session_state.exportacion = {"datos": ruta.read_bytes(), "nombre": nombre,
+                                                    "formato": formato, "filas": filas}
 
-    # -------- REGISTRO DE EGRESOS --------
-    st.subheader("➖ Registrar Egreso")
+        exportacion = st.session_state.get("exportacion")
+        if exportacion:
+            st.success(f"✅ {exportacion['nombre']}: {exportacion['filas']} filas ({len(exportacion['datos']) / 1024:,.0f} KB)")
+            st.download_button("⬇️ Descargar", exportacion["datos"], file_name=exportacion["nombre"],
+                               mime=exportar.FORMATOS[exportacion["formato"]])
 
-    # Inicializar variables para egresos en session_state
-    if 'egreso_submitted' not in st.session_state:
-        st.session_state.egreso_submitted = False
+    # ---------- ESTADO DE LA CACHE ----------
+    estadisticas_cache = cache.resultados.estadisticas()
+    with st.sidebar.expander("⚡ Cache de consultas"):
+        st.metric("Aciertos", estadisticas_cache["aciertos"])
+        st.metric("Fallos", estadisticas_cache["fallos"])
+        st.caption(f"{estadisticas_cache['entradas']} resultados guardados · "
+                   f"{estadisticas_cache['invalidaciones']} invalidados por escrituras")
 
-    with st.form("form_egreso", clear_on_submit=True):
-        motivo = st.selectbox("Motivo del egreso", 
-                             ["Proveedor", "Sueldos", "Reparaciones", "Otros"] if st.session_state["rol"] == "dueño" else ["Proveedor", "Reparaciones", "Otros"],
-                             key="motivo_egreso")
-        
-        # Campos específicos para sueldos (solo visible para el dueño)
-        if motivo == "Sueldos" and st.session_state["rol"] == "dueño":
-            st.write("📋 Detalle de sueldos")
-            
-            # Obtener empleados activos de la sucursal y su último pago
-            conn = get_connection()
-            cur = conn.cursor()
-            cur.execute("""
-                WITH UltimoPago AS (
-                    SELECT 
-                        e.detalle,
-                        MAX(e.fecha) as ultimo_pago
-                    FROM egresos e
-                    WHERE e.motivo = 'Sueldos'
-                    GROUP BY e.detalle
-                )
-                SELECT 
-                    emp.id, 
-                    emp.nombre, 
-                    emp.sueldo_base,
-                    up.ultimo_pago
-                FROM empleados emp
-                LEFT JOIN UltimoPago up ON up.detalle = CONCAT('Sueldo de ', emp.nombre)
-                WHERE emp.sucursal = %s AND emp.activo = TRUE
-                ORDER BY emp.nombre
-            """, (st.session_state["sucursal"],))
-            empleados_db = cur.fetchall()
-            conn.close()
-            
-            if not empleados_db:
-                st.warning("⚠️ No hay empleados registrados en esta sucursal")
-                if st.button("➕ Agregar empleado"):
-                    st.info("Función en desarrollo")
-            else:
-                # Crear DataFrame con los empleados
-                df_empleados = pd.DataFrame(empleados_db, columns=["ID", "Nombre", "Sueldo Base", "Último Pago"])
-                
-                # Agregar columna de checkbox para seleccionar empleados a pagar
-                df_empleados["Pagar"] = False
-                
-                # Mostrar la tabla con checkboxes editables
-                df_empleados_editado = st.data_editor(
-                    df_empleados,
-                    column_config={
-                        "ID": st.column_config.NumberColumn("ID", disabled=True),
-                        "Nombre": st.column_config.TextColumn("Nombre", disabled=True),
-                        "Sueldo Base": st.column_config.NumberColumn(
-                            "Sueldo Base",
-                            help="Monto base del sueldo",
-                            min_value=0,
-                            max_value=1000000,
-                            step=1000,
-                            format="$%d"
-                        ),
-                        "Último Pago": st.column_config.DatetimeColumn(
-                            "Último Pago",
-                            help="Fecha del último pago realizado",
-                            format="DD/MM/YYYY HH:mm",
-                            disabled=True
-                        ),
-                        "Pagar": st.column_config.CheckboxColumn(
-                            "Pagar",
-                            help="Seleccionar para pagar"
-                        )
-                    },
-                    hide_index=True,
-                    key="tabla_empleados"
-                )
-                
-                # Calcular total a pagar de los empleados seleccionados
-                empleados_a_pagar = df_empleados_editado[df_empleados_editado["Pagar"]]
-                monto_total = empleados_a_pagar["Sueldo Base"].sum()
-                
-                if monto_total > 0:
-                    st.info(f"💰 Total a pagar: ${monto_total:,.2f}")
-                    
-                    # Campo de observación
-                    observacion = st.text_area(
-                        "Observaciones (opcional)", 
-                        height=100,
-                        value="" if st.session_state.egreso_submitted else st.session_state.get('observacion', ""),
-                        key="obs_sueldos"
-                    )
-                    
-                    # Botón para confirmar el pago
-                    if st.button("💸 Confirmar Pago de Sueldos"):
-                        fecha_pago = datetime.now()
-                        conn = get_connection()
-                        cur = conn.cursor()
-                        try:
-                            for _, empleado in empleados_a_pagar.iterrows():
-                                detalle = f"Sueldo de {empleado['Nombre']}"
-                                cur.execute("""
-                                    INSERT INTO egresos (sucursal, motivo, monto, observacion, fecha, detalle)
-                                    VALUES (%s, %s, %s, %s, %s, %s)
-                                """, (st.session_state["sucursal"], "Sueldos", empleado["Sueldo Base"], 
-                                     observacion, fecha_pago, detalle))
-                                
-                            conn.commit()
-                            st.success(f"✅ Se han pagado {len(empleados_a_pagar)} sueldos por un total de ${monto_total:,.2f}")
-                            time.sleep(1)
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error al registrar los pagos: {str(e)}")
-                            conn.rollback()
-                        finally:
-                            conn.close()
+    # ---------- RÉPLICA DE LECTURA ----------
+    replica = estado_replica() if vista in VISTAS_EN_REPLICA else None
+    if replica is not None:
+        if replica["en_uso"]:
+            st.sidebar.caption(f"🪞 Lecturas desde la réplica (retraso {replica['retraso']:.1f} s)")
         else:
-            monto_total = st.number_input("Monto del egreso", 
-                                        min_value=0.0, 
-                                        step=100.0, 
-                                        format="%.2f",
-                                        value=0.0 if st.session_state.egreso_submitted else st.session_state.get('monto_egreso', 0.0))
-        
-        # Campo de observación
-        observacion = st.text_area("Observaciones (opcional)", 
-                                  height=100,
-                                  value="" if st.session_state.egreso_submitted else st.session_state.get('observacion', ""))
+            motivo = replica["error"] or f"retraso {replica['retraso']:.1f} s"
+            st.sidebar.caption(f"⚠️ Réplica sin usar ({motivo}); se lee del primario")
 
-        submitted = st.form_submit_button("Registrar Egreso")
-        
-        if submitted:
-            if motivo == "Sueldos" and not empleados_a_pagar.empty:
-                st.error("❌ Debe pagar todos los sueldos antes de registrar el egreso")
-            elif motivo != "Sueldos" and monto_total <= 0:
-                st.error("❌ El monto debe ser mayor a 0")
-            else:
-                conn = get_connection()
-                cur = conn.cursor()
-                try:
-                    if motivo == "Sueldos":
-                        # Registrar cada sueldo como un egreso individual
-                        for _, empleado in empleados_a_pagar.iterrows():
-                            detalle = f"Sueldo de {empleado['Nombre']}"
-                            cur.execute("""
-                                INSERT INTO egresos (sucursal, motivo, monto, observacion, fecha, detalle)
-                                VALUES (%s, %s, %s, %s, %s, %s)
-                            """, (st.session_state["sucursal"], motivo, empleado["Sueldo Base"], observacion, datetime.now(), detalle))
-                    else:
-                        # Registrar egreso normal
-                        cur.execute("""
-                            INSERT INTO egresos (sucursal, motivo, monto, observacion, fecha)
-                            VALUES (%s, %s, %s, %s, %s)
-                        """, (st.session_state["sucursal"], motivo, monto_total, observacion, datetime.now()))
-                    
-                    conn.commit()
-                    st.success(f"✅ Egreso de ${monto_total:,.2f} registrado correctamente")
-                    
-                    # Limpiar los campos
-                    st.session_state.egreso_submitted = True
-                    st.session_state.monto_egreso = 0.0
-                    st.session_state.observacion = ""
-                    
-                    time.sleep(0.5)
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error al registrar el egreso: {str(e)}")
-                    conn.rollback()
-                finally:
-                    conn.close()
-
-conn.close()
+    # ---------- CONSULTAS MÁS LENTAS ----------
+    with st.sidebar.expander("🐢 Consultas más lentas"):
+        lentas = perfilador.consultas.top(10)
+        if not lentas:
+            st.caption("Todavía no se registraron consultas")
+        else:
+            st.dataframe(
+                pd.DataFrame(lentas).drop(columns="explain"),
+                column_config={
+                    "huella": st.column_config.TextColumn("Consulta", width="medium"),
+                    "vistas": "Vistas",
+                    "llamadas": "Llamadas",
+                    "promedio_ms": st.column_config.NumberColumn("Promedio", format="%.1f ms"),
+                    "p95_ms": st.column_config.NumberColumn("p95", format="%.1f ms"),
+                    "max_ms": st.column_config.NumberColumn("Máximo", format="%.1f ms"),
+                    "filas_promedio": st.column_config.NumberColumn("Filas", format="%.0f"),
+                },
+                hide_index=True
+            )
+            con_plan = [fila for fila in lentas if fila["explain"]]
+            if con_plan:
+                elegida = st.selectbox("Plan de ejecución", range(len(con_plan)),
+                                       format_func=lambda i: con_plan[i]["huella"][:60])
+                st.code(con_plan[elegida]["explain"], language="text")
+            st.caption(f"Se guarda el EXPLAIN ANALYZE de las lecturas de más de {perfilador.PERFIL_UMBRAL_MS:.0f} ms")
+            if st.button("Reiniciar mediciones"):
+                perfilador.consultas.limpiar()
+
+else:
+    # Interfaz para cajeros
+    perfilador.vista_actual.set("Registro de Operaciones")
+    vista_registro()
@@ -0,0 +1,142 @@
+# archivar.py
+import argparse
+import os
+from datetime import date
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import sql
+
+import consultas
+import exportar
+from db import parametros_conexion
+
+# Archivo frío de los meses cerrados: cada partición mensual de ventas o
+# egresos se escribe en un Parquet (zstd) y se borra de Postgres. Los totales
+# del mes quedan en los resúmenes diarios, así el Dashboard no cambia, y
+# exportar.py lee las filas archivadas del Parquet como si siguieran en la base.
+# Necesita pyarrow (requirements-opcional.txt).
+ARCHIVO_DIR = Path(os.getenv("ARCHIVO_DIR", str(Path(__file__).resolve().parent / "archivo")))
+# Meses cerrados que se mantienen en Postgres además del actual
+ARCHIVO_MESES_VIVOS = int(os.getenv("ARCHIVO_MESES_VIVOS", 24))
+
+# El archivo guarda todas las columnas, incluida la clave de idempotencia
+COLUMNAS = {tabla: columnas + ["clave_idempotencia"] for tabla, columnas in exportar.COLUMNAS.items()}
+
+PARTICIONES_A_ARCHIVAR = """
+    SELECT tabla, mes FROM particiones_mensuales
+    WHERE mes < %s
+    ORDER BY mes, tabla
+"""
+
+REGISTRAR_ARCHIVO = """
+    INSERT INTO meses_archivados (tabla, mes, archivo, filas, monto)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+MESES_ARCHIVADOS = """
+    SELECT tabla, mes, filas, monto, archivo, archivado_en
+    FROM meses_archivados
+    ORDER BY tabla, mes
+"""
+
+
+def ruta_archivo(tabla, mes):
+    # Directorios anio=/mes= al estilo Hive: pyarrow y DuckDB los leen como dataset particionado
+    return ARCHIVO_DIR / tabla / f"anio={mes.year}" / f"mes={mes.month:02d}" / f"{tabla}_{mes:%Y_%m}.parquet"
+
+
+def _totales_archivo(ruta):
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    montos = pq.read_table(ruta, columns=["monto"]).column("monto")
+    return montos.length(), pc.sum(montos).as_py() or 0
+
+
+def archivar_mes(tabla, mes):
+    """Archiva la partición de ``mes`` y devuelve cuántas filas se movieron al Parquet.
+
+    Todo ocurre en una transacción con la partición bloqueada para escritura:
+    se recalculan los resúmenes del mes (quedan como única fuente de sus
+    totales), se escribe y verifica el Parquet contra la partición y recién
+    entonces se registra el mes y se borra la partición. Si algo falla, la
+    partición queda como estaba.
+    """
+    particion = sql.Identifier(f"{tabla}_{mes:%Y_%m}")
+    siguiente = consultas.restar_meses(mes, -1)
+    destino = ruta_archivo(tabla, mes)
+    temporal = destino.with_name(destino.name + ".tmp")
+
+    conn = psycopg2.connect(**parametros_conexion())
+    try:
+        cur = conn.cursor()
+        cur.execute(sql.SQL("LOCK TABLE {} IN SHARE MODE").format(particion))
+        cur.execute("SELECT recalcular_resumenes(%s, %s)", (mes, siguiente))
+        cur.execute(sql.SQL("SELECT COUNT(*), COALESCE(SUM(monto), 0) FROM {}").format(particion))
+        filas, monto = cur.fetchone()
+
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        exportar.escribir_parquet(temporal, COLUMNAS[tabla],
+                                  exportar.leer_lotes(tabla, mes, siguiente, columnas=COLUMNAS[tabla], conn=conn))
+        if _totales_archivo(temporal) != (filas, monto):
+            raise RuntimeError(f"El archivo de {tabla} {mes:%m/%Y} no coincide con la base; no se archivó")
+        with open(temporal, "rb") as archivo:
+            os.fsync(archivo.fileno())
+        os.replace(temporal, destino)
+
+        cur.execute(REGISTRAR_ARCHIVO, (tabla, mes, str(destino), filas, monto))
+        cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(sql.Identifier(tabla), particion))
+        cur.execute(sql.SQL("DROP TABLE {}").format(particion))
+        conn.commit()
+        return filas
+    except Exception:
+        conn.rollback()
+        temporal.unlink(missing_ok=True)
+        raise
+    finally:
+        conn.close()
+
+
+def archivar(antes, mostrar=print):
+    """Archiva todas las particiones de los meses anteriores a ``antes``. Devuelve [(tabla, mes, filas)]."""
+    if antes > date.today().replace(day=1):
+        raise ValueError("Solo se pueden archivar meses ya cerrados")
+    conn = psycopg2.connect(**parametros_conexion())
+    try:
+        cur = conn.cursor()
+        cur.execute(PARTICIONES_A_ARCHIVAR, (antes,))
+        pendientes = cur.fetchall()
+    finally:
+        conn.close()
+
+    archivados = []
+    for tabla, mes in pendientes:
+        filas = archivar_mes(tabla, mes)
+        archivados.append((tabla, mes, filas))
+        mostrar(f"📦 {tabla} {mes:%m/%Y}: {filas} filas archivadas")
+    return archivados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archiva en Parquet los meses cerrados de ventas y egresos")
+    parser.add_argument("--meses-vivos", type=int, default=ARCHIVO_MESES_VIVOS,
+                        help="meses cerrados que quedan en Postgres además del actual")
+    parser.add_argument("--estado", action="store_true", help="solo listar los meses archivados")
+    args = parser.parse_args()
+
+    if not args.estado:
+        if not exportar.parquet_disponible():
+            parser.error("para archivar hace falta pyarrow (pip install -r requirements-opcional.txt)")
+        antes = consultas.restar_meses(date.today().replace(day=1), args.meses_vivos)
+        if not archivar(antes):
+            print(f"✅ No hay meses anteriores a {antes:%m/%Y} para archivar.")
+
+    conn = psycopg2.connect(**parametros_conexion())
+    try:
+        cur = conn.cursor()
+        cur.execute(MESES_ARCHIVADOS)
+        for tabla, mes, filas, monto, archivo, archivado_en in cur.fetchall():
+            print(f"{tabla:<8} {mes:%m/%Y}  {filas:>9} filas  ${monto:>16,.2f}  {archivo}")
+    finally:
+        conn.close()
@@ -0,0 +1,8 @@
+"""Benchmark de las consultas de la caja sobre una base descartable.
+
+    python -m benchmark.generar --anios 3 --sucursales 4 --confirmar
+    python -m benchmark.medir --salida benchmark/resultados.json
+
+Ambos usan las variables DB_* del .env: apuntarlas a una base de pruebas,
+``generar`` vacía las tablas antes de cargar los datos.
+"""
@@ -0,0 +1,196 @@
+# benchmark/generar.py
+import argparse
+import io
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from db import parametros_conexion
+from migrar import aplicar_migraciones
+from refrescar import REFRESCAR_RESUMEN_MENSUAL
+
+NOMBRES_SUCURSALES = ["Sucursal Centro", "Sucursal Norte", "Sucursal Sur", "Sucursal Este", "Sucursal Oeste"]
+METODOS_PAGO = np.array(["Efectivo", "Mercado Pago", "Cuenta DNI", "Fiado"])
+PROBABILIDAD_METODO = [0.45, 0.25, 0.20, 0.10]
+MOTIVOS_EGRESO = np.array(["Proveedor", "Reparaciones", "Otros"])
+PROBABILIDAD_MOTIVO = [0.70, 0.10, 0.20]
+CLIENTES = np.array(["Marta Gómez", "Jorge Díaz", "Rosa Pérez", "Carlos Ruiz", "Ana Sosa", "Luis Romero"])
+
+# Estacionalidad: lunes a domingo, y diciembre con más ventas que el invierno
+FACTOR_DIA_SEMANA = np.array([0.80, 0.85, 0.90, 1.00, 1.25, 1.50, 0.60])
+# Horario de la carnicería: 8 a 21 hs con picos al mediodía y a la tarde
+PERFIL_HORARIO = np.array([0, 0, 0, 0, 0, 0, 0, 0, 3, 6, 9, 10, 8, 4, 2, 2, 4, 7, 9, 8, 5, 2, 0, 0], dtype=float)
+PERFIL_HORARIO /= PERFIL_HORARIO.sum()
+
+
+def nombres_sucursales(cantidad):
+    return [NOMBRES_SUCURSALES[i] if i < len(NOMBRES_SUCURSALES) else f"Sucursal {i + 1}" for i in range(cantidad)]
+
+
+def _momentos(rng, dias, por_dia, ahora):
+    # Un instante por operación: día repetido según la cantidad del día más una hora del perfil
+    dia = np.repeat(dias, por_dia)
+    segundos = rng.choice(24, size=len(dia), p=PERFIL_HORARIO) * 3600 + rng.integers(0, 3600, size=len(dia))
+    fecha = dia + segundos.astype("timedelta64[s]")
+    return fecha[fecha < np.datetime64(ahora, "s")]
+
+
+def generar_ventas(rng, sucursal, dias, ventas_por_dia, ahora):
+    semana = FACTOR_DIA_SEMANA[pd.DatetimeIndex(dias).dayofweek]
+    temporada = 1 + 0.15 * np.cos(2 * np.pi * (pd.DatetimeIndex(dias).month - 12) / 12)
+    escala = rng.uniform(0.6, 1.4)
+    fecha = _momentos(rng, dias, rng.poisson(ventas_por_dia * escala * semana * temporada), ahora)
+    n = len(fecha)
+
+    monto = np.round(rng.lognormal(np.log(8000), 0.7, size=n), -1) + 10
+    metodo = rng.choice(METODOS_PAGO, size=n, p=PROBABILIDAD_METODO)
+    efectivo = metodo == "Efectivo"
+    fiado = metodo == "Fiado"
+    entregado = np.where(efectivo, np.ceil(monto / 1000) * 1000, np.where(fiado, 0, monto))
+    clientes = rng.choice(CLIENTES, size=n)
+    return pd.DataFrame({
+        "sucursal": sucursal,
+        "monto": monto,
+        "metodo_pago": metodo,
+        "entregado": entregado,
+        "vuelto": np.where(efectivo, entregado - monto, 0),
+        "ingreso": np.where(fiado, 0, monto),
+        "deuda": np.where(fiado, monto, 0),
+        "fecha": fecha,
+        "cliente_fiado": np.where(fiado, clientes, None),
+        "telefono_fiado": np.where(fiado, "11" + pd.Series(rng.integers(10**7, 10**8, size=n)).astype(str), None),
+    })
+
+
+def generar_egresos(rng, sucursal, dias, egresos_por_dia, ahora):
+    fecha = _momentos(rng, dias, rng.poisson(egresos_por_dia, size=len(dias)), ahora)
+    n = len(fecha)
+    motivo = rng.choice(MOTIVOS_EGRESO, size=n, p=PROBABILIDAD_MOTIVO)
+    monto = np.round(rng.lognormal(np.log(40000), 0.8, size=n), -2)
+    return pd.DataFrame({
+        "sucursal": sucursal,
+        "motivo": motivo,
+        "monto": np.where(motivo == "Proveedor", monto * 3, monto),
+        "observacion": None,
+        "fecha": fecha,
+        "detalle": None,
+        "empleado_id": None,
+    })
+
+
+def generar_sueldos(empleados, dias, ahora):
+    # Un sueldo por empleado el primer día de cada mes, a las 9 hs
+    primeros = dias[pd.DatetimeIndex(dias).day == 1] + np.timedelta64(9, "h")
+    primeros = primeros[primeros < np.datetime64(ahora, "s")]
+    filas = [
+        (sucursal, "Sueldos", sueldo, None, fecha, f"Sueldo de {nombre}", empleado_id)
+        for empleado_id, nombre, sucursal, sueldo in empleados
+        for fecha in primeros
+    ]
+    return pd.DataFrame(filas, columns=["sucursal", "motivo", "monto", "observacion", "fecha", "detalle", "empleado_id"])
+
+
+def copiar(cur, tabla, df):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep="\\N")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {tabla} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    return len(df)
+
+
+def generar(conn, anios=3, sucursales=2, ventas_por_dia=150, egresos_por_dia=3, empleados_por_sucursal=6, semilla=42):
+    """Vacía las tablas y carga ``anios`` de operaciones. Devuelve la cantidad de filas por tabla."""
+    rng = np.random.default_rng(semilla)
+    ahora = datetime.now()
+    inicio = date(ahora.year - anios, ahora.month, 1)
+    dias = np.arange(np.datetime64(inicio), np.datetime64(ahora.date() + timedelta(days=1))).astype("datetime64[s]")
+
+    aplicar_migraciones(conn, mostrar=lambda _: None)
+    conn.autocommit = False
+    cur = conn.cursor()
+    cur.execute("""
+        TRUNCATE ventas, egresos, cierres, pagos_sueldo, corridas_sueldo, empleados,
+                 resumen_ventas_diario, resumen_egresos_diario, sucursales,
+                 clientes, movimientos_cliente, deudas_abiertas RESTART IDENTITY CASCADE
+    """)
+    cur.execute("INSERT INTO sucursales (nombre) SELECT UNNEST(%s)", (nombres_sucursales(sucursales),))
+    # Los resúmenes se recalculan de una vez al final en lugar de fila por fila
+    cur.execute("SET caja.omitir_resumen = 'on'")
+    for tabla in ("ventas", "egresos"):
+        cur.execute("SELECT asegurar_particiones(%s, %s, %s)", (tabla, inicio, ahora.date()))
+
+    cantidades = {"ventas": 0, "egresos": 0, "empleados": 0}
+    for sucursal in nombres_sucursales(sucursales):
+        empleados = []
+        for i in range(empleados_por_sucursal):
+            nombre = f"Empleado {i + 1} {sucursal.split()[-1]}"
+            sueldo = float(np.round(rng.uniform(400000, 900000), -3))
+            cur.execute(
+                "INSERT INTO empleados (nombre, sucursal, sueldo_base) VALUES (%s, %s, %s) RETURNING id",
+                (nombre, sucursal, sueldo),
+            )
+            empleados.append((cur.fetchone()[0], nombre, sucursal, sueldo))
+        cantidades["empleados"] += len(empleados)
+        cantidades["ventas"] += copiar(cur, "ventas", generar_ventas(rng, sucursal, dias, ventas_por_dia, ahora))
+        egresos = pd.concat([
+            generar_egresos(rng, sucursal, dias, egresos_por_dia, ahora),
+            generar_sueldos(empleados, dias, ahora),
+        ])
+        cantidades["egresos"] += copiar(cur, "egresos", egresos)
+
+    cur.execute("SELECT recalcular_resumenes(%s, %s)", (inicio, ahora.date() + timedelta(days=1)))
+    # Un cierre por día cerrado y sucursal, con una diferencia chica contra el teórico
+    cur.execute("SELECT setseed(%s)", (semilla % 1000 / 1000,))
+    cur.execute("""
+        INSERT INTO cierres (sucursal, fecha, turno, desde, hasta, efectivo, digital, fiado, egresos,
+                             teorico, contado, diferencia)
+        SELECT sucursal, dia, 1, dia, dia + 1, efectivo, digital, fiado, egresos,
+               efectivo - egresos, efectivo - egresos + ajuste, ajuste
+        FROM (
+            SELECT
+                d.dia, d.sucursal,
+                COALESCE(SUM(v.ingreso) FILTER (WHERE v.metodo_pago = 'Efectivo'), 0) as efectivo,
+                COALESCE(SUM(v.ingreso) FILTER (WHERE v.metodo_pago IN ('Mercado Pago', 'Cuenta DNI')), 0) as digital,
+                COALESCE(SUM(v.deuda), 0) as fiado,
+                COALESCE((SELECT SUM(monto) FROM resumen_egresos_diario e
+                          WHERE e.dia = d.dia AND e.sucursal = d.sucursal), 0) as egresos,
+                ROUND(((random() - 0.5) * 2000)::NUMERIC, -1) as ajuste
+            FROM (SELECT DISTINCT dia, sucursal FROM resumen_ventas_diario WHERE dia < CURRENT_DATE) d
+            JOIN resumen_ventas_diario v ON v.dia = d.dia AND v.sucursal = d.sucursal
+            GROUP BY d.dia, d.sucursal
+        ) totales
+    """)
+    cantidades["cierres"] = cur.rowcount
+    cur.execute("RESET caja.omitir_resumen")
+    conn.commit()
+
+    conn.autocommit = True
+    cur.execute(REFRESCAR_RESUMEN_MENSUAL)
+    cur.execute("ANALYZE")
+    return cantidades
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga datos sintéticos en una base descartable")
+    parser.add_argument("--anios", type=int, default=3)
+    parser.add_argument("--sucursales", type=int, default=2)
+    parser.add_argument("--ventas-por-dia", type=float, default=150, help="promedio por sucursal")
+    parser.add_argument("--egresos-por-dia", type=float, default=3, help="promedio por sucursal, sin sueldos")
+    parser.add_argument("--empleados", type=int, default=6, help="empleados por sucursal")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--confirmar", action="store_true", help="confirma que se puede vaciar la base")
+    args = parser.parse_args()
+
+    base = parametros_conexion()["database"]
+    if not args.confirmar:
+        parser.error(f"generar vacía las tablas de la base '{base}'; repetir con --confirmar")
+
+    conn = psycopg2.connect(**parametros_conexion())
+    try:
+        cantidades = generar(conn, args.anios, args.sucursales, args.ventas_por_dia,
+                             args.egresos_por_dia, args.empleados, args.semilla)
+    finally:
+        conn.close()
+    print(f"✅ Base '{base}' cargada: " + ", ".join(f"{n} {tabla}" for tabla, n in cantidades.items()))
@@ -0,0 +1,157 @@
+# benchmark/medir.py
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import psycopg2
+
+from consultas import consultas_calientes
+from db import parametros_conexion
+from diario import Diario
+
+SALIDA = Path(__file__).resolve().parent / "resultados.json"
+
+
+def _cronometrar(cur, sql, parametros):
+    inicio = time.perf_counter()
+    cur.execute(sql, parametros)
+    cur.fetchall()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def medir_consulta(sql, parametros, repeticiones=50, frias=5):
+    """Tiempos en ms de una consulta.
+
+    En frío es la primera ejecución en una conexión nueva (sin cachés de
+    catálogo ni de planes); los buffers de Postgres y del sistema operativo
+    no se vacían. En caliente se repite sobre una misma conexión.
+    """
+    tiempos_frios = []
+    for _ in range(frias):
+        conn = psycopg2.connect(**parametros_conexion())
+        try:
+            tiempos_frios.append(_cronometrar(conn.cursor(), sql, parametros))
+        finally:
+            conn.close()
+
+    conn = psycopg2.connect(**parametros_conexion())
+    try:
+        cur = conn.cursor()
+        _cronometrar(cur, sql, parametros)
+        tiempos = np.array([_cronometrar(cur, sql, parametros) for _ in range(repeticiones)])
+    finally:
+        conn.close()
+    return {
+        "frio_ms": round(float(np.median(tiempos_frios)), 3),
+        "p50_ms": round(float(np.percentile(tiempos, 50)), 3),
+        "p95_ms": round(float(np.percentile(tiempos, 95)), 3),
+        "max_ms": round(float(tiempos.max()), 3),
+    }
+
+
+def medir_ventas(cantidad=2000, sucursal="Sucursal Centro"):
+    """Ventas por segundo con el mismo camino que registrar_venta: diario local y sincronización a Postgres."""
+    with tempfile.TemporaryDirectory() as directorio:
+        diario = Diario(str(Path(directorio) / "diario.db"))
+        inicio = time.perf_counter()
+        for i in range(cantidad):
+            monto = 1000.0 + i % 50 * 100
+            diario.encolar("venta", {
+                "sucursal": sucursal, "monto": monto, "metodo_pago": "Efectivo",
+                "entregado": monto, "vuelto": 0.0, "ingreso": monto, "deuda": 0.0,
+                "fecha": datetime.now().isoformat(), "cliente_fiado": None, "telefono_fiado": None,
+                "cliente_id": None,
+            })
+        encolado = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        while diario.sincronizar():
+            pass
+        sincronizado = time.perf_counter() - inicio
+    return {
+        "ventas": cantidad,
+        "registradas_por_segundo": round(cantidad / encolado, 1),
+        "sincronizadas_por_segundo": round(cantidad / sincronizado, 1),
+    }
+
+
+def volumen():
+    conn = psycopg2.connect(**parametros_conexion())
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM ventas),
+                (SELECT COUNT(*) FROM egresos),
+                (SELECT COUNT(*) FROM cierres),
+                (SELECT COUNT(*) FROM empleados),
+                (SELECT COUNT(DISTINCT sucursal) FROM resumen_ventas_diario),
+                current_setting('server_version')
+        """)
+        ventas, egresos, cierres, empleados, sucursales, version = cur.fetchone()
+    finally:
+        conn.close()
+    return {"ventas": ventas, "egresos": egresos, "cierres": cierres, "empleados": empleados,
+            "sucursales": sucursales, "postgres": version}
+
+
+def comparar(resultados, base, tolerancia):
+    """Devuelve las mediciones que empeoraron más que ``tolerancia`` (1.25 = 25 %) contra ``base``."""
+    regresiones = []
+    for nombre, medicion in resultados["consultas"].items():
+        anterior = base.get("consultas", {}).get(nombre)
+        if anterior and medicion["p95_ms"] > anterior["p95_ms"] * tolerancia:
+            regresiones.append(f"{nombre}: p95 {anterior['p95_ms']} ms → {medicion['p95_ms']} ms")
+    for clave in ("registradas_por_segundo", "sincronizadas_por_segundo"):
+        anterior = base.get("escrituras", {}).get(clave)
+        actual = resultados["escrituras"].get(clave)
+        if anterior and actual and actual * tolerancia < anterior:
+            regresiones.append(f"{clave}: {anterior} → {actual}")
+    return regresiones
+
+
+def medir(repeticiones=50, frias=5, ventas=2000, sucursal="Sucursal Centro", hoy=None):
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "volumen": volumen(),
+        "consultas": {},
+        "escrituras": {},
+    }
+    for nombre, (sql, parametros) in consultas_calientes(hoy, sucursal).items():
+        resultados["consultas"][nombre] = medicion = medir_consulta(sql, parametros, repeticiones, frias)
+        print(f"⏱️ {nombre}: p50 {medicion['p50_ms']} ms · p95 {medicion['p95_ms']} ms · frío {medicion['frio_ms']} ms")
+    if ventas:
+        resultados["escrituras"] = escrituras = medir_ventas(ventas, sucursal)
+        print(f"⏱️ ventas: {escrituras['registradas_por_segundo']}/s registradas · "
+              f"{escrituras['sincronizadas_por_segundo']}/s sincronizadas")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide las consultas y escrituras de la caja")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--frias", type=int, default=5, help="ejecuciones en conexiones nuevas")
+    parser.add_argument("--ventas", type=int, default=2000, help="ventas a registrar (0 para no escribir)")
+    parser.add_argument("--sucursal", default="Sucursal Centro")
+    parser.add_argument("--hoy", type=date.fromisoformat, help="fecha de referencia de las consultas (AAAA-MM-DD)")
+    parser.add_argument("--salida", type=Path, default=SALIDA)
+    parser.add_argument("--comparar", type=Path, help="resultados anteriores para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=1.25)
+    args = parser.parse_args()
+
+    resultados = medir(args.repeticiones, args.frias, args.ventas, args.sucursal, args.hoy)
+    args.salida.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"✅ Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        regresiones = comparar(resultados, json.loads(args.comparar.read_text(encoding="utf-8")), args.tolerancia)
+        for regresion in regresiones:
+            print(f"❌ {regresion}")
+        if regresiones:
+            sys.exit(1)
+        print("✅ Sin regresiones contra " + str(args.comparar))
@@ -0,0 +1,81 @@
+# cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+CACHE_MAX = int(os.getenv("CACHE_MAX", 256))
+CACHE_TTL = float(os.getenv("CACHE_TTL", 600))
+
+
+class CacheResultados:
+    """Cache LRU con TTL para los resultados del Dashboard y del Cierre de caja.
+
+    Las claves son ``(vista, sucursal, periodo)`` con ``periodo = (desde, hasta)``
+    semiabierto; ``sucursal=None`` indica un resultado que abarca todas las
+    sucursales. Cada escritura invalida solo las claves cuyo período contiene
+    el día escrito y cuya sucursal coincide.
+    """
+
+    def __init__(self, maximo=CACHE_MAX, ttl=CACHE_TTL):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        # Se incrementa en cada invalidación; un resultado cargado mientras
+        # hubo una invalidación no se guarda porque puede estar desactualizado
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, vista, sucursal, periodo, cargar):
+        clave = (vista, sucursal, periodo)
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[1]
+            self.fallos += 1
+            generacion = self._generacion
+
+        valor = cargar()
+
+        with self._lock:
+            if generacion == self._generacion:
+                self._datos[clave] = (time.monotonic() + self.ttl, valor)
+                self._datos.move_to_end(clave)
+                while len(self._datos) > self.maximo:
+                    self._datos.popitem(last=False)
+        return valor
+
+    def invalidar(self, sucursal, dia=None):
+        dia = dia or date.today()
+        with self._lock:
+            self._generacion += 1
+            for clave in list(self._datos):
+                _, sucursal_clave, (desde, hasta) = clave
+                if sucursal_clave in (None, sucursal) and desde <= dia < hasta:
+                    del self._datos[clave]
+                    self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "entradas": len(self._datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+# Cache compartida por todas las sesiones del proceso
+resultados = CacheResultados()
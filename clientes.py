@@ -0,0 +1,162 @@
+# clientes.py
+import argparse
+import bisect
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from db import consultar
+
+# Búsqueda de clientes para las ventas fiadas (migraciones/0016_busqueda_clientes.sql).
+# Con pg_trgm la resuelve Postgres con los índices de trigramas; si el
+# servidor no tiene la extensión, se busca en un índice de prefijos en memoria
+# que se vuelve a leer cada CLIENTES_TTL segundos.
+CLIENTES_TTL = float(os.getenv("CLIENTES_TTL", 60))
+# Sugerencias por búsqueda
+CLIENTES_SUGERENCIAS = int(os.getenv("CLIENTES_SUGERENCIAS", 8))
+# Coincidencias que se ordenan en memoria antes de quedarse con las mejores
+CLIENTES_CANDIDATOS = 500
+
+# Igual que normalizar_nombre() en migraciones/0015_cuentas_clientes.sql
+_SIN_ACENTOS = str.maketrans("áéíóúüàèìòùñ", "aeiouuaeioun")
+
+TRIGRAMAS_INSTALADOS = "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+
+# Primero los nombres que empiezan con el texto y después los más parecidos;
+# el operador % (similitud) también encuentra nombres con errores de tipeo
+BUSCAR_CLIENTES = """
+    SELECT id, nombre, telefono, CAST(saldo AS FLOAT)
+    FROM clientes
+    WHERE nombre_normalizado LIKE %(contiene)s
+    OR nombre_normalizado %% %(texto)s
+    OR telefono_normalizado LIKE %(telefono)s
+    ORDER BY
+        nombre_normalizado LIKE %(prefijo)s DESC,
+        similarity(nombre_normalizado, %(texto)s) DESC,
+        ultimo_movimiento DESC NULLS LAST
+    LIMIT %(limite)s
+"""
+
+TODOS_LOS_CLIENTES = """
+    SELECT id, nombre, telefono, CAST(saldo AS FLOAT), nombre_normalizado, telefono_normalizado,
+           EXTRACT(EPOCH FROM ultimo_movimiento)
+    FROM clientes
+"""
+
+
+@dataclass(frozen=True)
+class Cliente:
+    id: int
+    nombre: str
+    telefono: str
+    saldo: float
+
+
+def normalizar(texto):
+    return " ".join((texto or "").lower().translate(_SIN_ACENTOS).split())
+
+
+def _escapar_like(texto):
+    return re.sub(r"([\\%_])", r"\\\1", texto)
+
+
+class IndicePrefijos:
+    """Índice en memoria: una clave por cada palabra del nombre (el nombre desde
+    esa palabra hasta el final) y otra por el teléfono, ordenadas para buscar
+    por prefijo con bisect."""
+
+    def __init__(self, filas):
+        self.clientes = {}
+        claves = []
+        for cliente_id, nombre, telefono, saldo, normalizado, telefono_normalizado, ultimo in filas:
+            self.clientes[cliente_id] = Cliente(cliente_id, nombre, telefono, saldo)
+            # Orden entre coincidencias: nombre que empieza con el texto, luego el más reciente
+            reciente = -float(ultimo or 0)
+            palabras = normalizado.split(" ")
+            for i in range(len(palabras)):
+                claves.append((" ".join(palabras[i:]), min(i, 1), reciente, cliente_id))
+            if telefono_normalizado:
+                claves.append((telefono_normalizado, 1, reciente, cliente_id))
+        claves.sort()
+        self._claves = claves
+
+    def buscar(self, textos, limite):
+        candidatos = {}
+        for texto in textos:
+            inicio = bisect.bisect_left(self._claves, (texto,))
+            for clave, rango, reciente, cliente_id in self._claves[inicio:inicio + CLIENTES_CANDIDATOS]:
+                if not clave.startswith(texto):
+                    break
+                candidatos[cliente_id] = min(candidatos.get(cliente_id, (rango, reciente)), (rango, reciente))
+        mejores = sorted(candidatos, key=candidatos.get)[:limite]
+        return [self.clientes[cliente_id] for cliente_id in mejores]
+
+
+_indice = (0.0, None)
+_trigramas = None
+_lock = threading.Lock()
+
+
+def usa_trigramas():
+    global _trigramas
+    if _trigramas is None:
+        with _lock:
+            if _trigramas is None:
+                _trigramas = consultar(TRIGRAMAS_INSTALADOS)[0][0]
+    return _trigramas
+
+
+def _obtener_indice():
+    global _indice
+    vence, indice = _indice
+    if vence > time.monotonic():
+        return indice
+    with _lock:
+        vence, indice = _indice
+        if vence <= time.monotonic():
+            indice = IndicePrefijos(consultar(TODOS_LOS_CLIENTES))
+            _indice = (time.monotonic() + CLIENTES_TTL, indice)
+    return indice
+
+
+def invalidar():
+    global _indice
+    with _lock:
+        _indice = (0.0, None)
+
+
+def buscar(texto, limite=CLIENTES_SUGERENCIAS):
+    """Clientes cuyo nombre o teléfono coincide con ``texto``, los más probables primero."""
+    texto = normalizar(texto)
+    if not texto:
+        return []
+    # Se busca por teléfono cuando el texto no tiene letras ("11 4455-6677")
+    digitos = "" if re.search(r"[a-z]", texto) else re.sub(r"\D", "", texto)
+    if usa_trigramas():
+        return [Cliente(*fila) for fila in consultar(BUSCAR_CLIENTES, {
+            "texto": texto,
+            "contiene": f"%{_escapar_like(texto)}%",
+            "prefijo": f"{_escapar_like(texto)}%",
+            # Con menos de 3 dígitos casi todos los teléfonos coinciden
+            "telefono": f"%{digitos}%" if len(digitos) >= 3 else None,
+            "limite": limite,
+        })]
+    return _obtener_indice().buscar({texto, digitos} - {""}, limite)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba la búsqueda de clientes")
+    parser.add_argument("texto")
+    args = parser.parse_args()
+
+    # La primera búsqueda del proceso carga el índice en memoria; se mide la segunda
+    buscar(args.texto)
+    inicio = time.perf_counter()
+    encontrados = buscar(args.texto)
+    demora = (time.perf_counter() - inicio) * 1000
+    for cliente in encontrados:
+        print(f"{cliente.id:>6} {cliente.nombre:<40} {cliente.telefono or '':<16} ${cliente.saldo:>14,.2f}")
+    origen = "índice de trigramas (pg_trgm)" if usa_trigramas() else "índice en memoria"
+    print(f"{len(encontrados)} clientes en {demora:.1f} ms con el {origen}")
@@ -0,0 +1,491 @@
+# consultas.py
+from calendar import monthrange
+from dataclasses import astuple, dataclass
+from datetime import date, datetime, timedelta
+
+from db import consultar
+
+# Todas las consultas filtran fecha con rangos semiabiertos [desde, hasta)
+# sobre la columna sin envolver, para que puedan usar los índices de fecha.
+
+
+# ---------- RANGOS DE FECHAS ----------
+def rango_dia(dia):
+    return dia, dia + timedelta(days=1)
+
+
+def rango_mes(anio, mes):
+    desde = date(anio, mes, 1)
+    hasta = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+    return desde, hasta
+
+
+def rango_mes_anterior(anio, mes):
+    return rango_mes(anio - 1, 12) if mes == 1 else rango_mes(anio, mes - 1)
+
+
+def restar_meses(dia, meses):
+    # Igual que dia - INTERVAL 'n months' en Postgres: ajusta al último día si no existe
+    anio, mes = divmod(dia.year * 12 + dia.month - 1 - meses, 12)
+    return date(anio, mes + 1, min(dia.day, monthrange(anio, mes + 1)[1]))
+
+
+def inicio_serie_mensual(hoy):
+    # Primer día del mes de hace 12 meses: la serie muestra meses completos
+    return restar_meses(hoy, 12).replace(day=1)
+
+
+# ---------- DASHBOARD ----------
+# El Dashboard lee los resúmenes diarios (migraciones/0005_resumenes_diarios.sql),
+# así su costo depende de la cantidad de días del rango y no de las ventas.
+# La comparativa trae todas las sucursales en una fila cada una: las activas
+# aunque no tengan movimientos y las dadas de baja que sí los tuvieron.
+COMPARATIVA_MENSUAL = """
+    WITH Ventas AS (
+        SELECT
+            sucursal,
+            SUM(ingreso) FILTER (WHERE dia >= %(desde)s) as ventas,
+            SUM(ingreso) FILTER (WHERE dia < %(desde)s) as ventas_anterior
+        FROM resumen_ventas_diario
+        WHERE dia >= %(desde_anterior)s AND dia < %(hasta)s
+        GROUP BY sucursal
+    ),
+    Egresos AS (
+        SELECT
+            sucursal,
+            SUM(monto) FILTER (WHERE dia >= %(desde)s) as egresos,
+            SUM(monto) FILTER (WHERE dia < %(desde)s) as egresos_anterior
+        FROM resumen_egresos_diario
+        WHERE dia >= %(desde_anterior)s AND dia < %(hasta)s
+        GROUP BY sucursal
+    )
+    SELECT
+        COALESCE(v.sucursal, e.sucursal, s.nombre) as sucursal,
+        CAST(v.ventas AS FLOAT) as ventas,
+        CAST(COALESCE(v.ventas_anterior, 0) AS FLOAT) as ventas_anterior,
+        CAST(COALESCE(e.egresos, 0) AS FLOAT) as egresos,
+        CAST(COALESCE(e.egresos_anterior, 0) AS FLOAT) as egresos_anterior
+    FROM Ventas v
+    FULL JOIN Egresos e ON e.sucursal = v.sucursal
+    FULL JOIN (SELECT nombre FROM sucursales WHERE activa) s ON s.nombre = COALESCE(v.sucursal, e.sucursal)
+    ORDER BY v.ventas DESC NULLS LAST, 1
+"""
+
+
+@dataclass(frozen=True)
+class TotalesSucursal:
+    sucursal: str
+    ventas: float = 0.0
+    ventas_anterior: float = 0.0
+    egresos: float = 0.0
+    egresos_anterior: float = 0.0
+    # False si la sucursal no tuvo ventas en el mes (solo egresos o nada)
+    con_ventas: bool = False
+
+    @staticmethod
+    def _variacion(actual, anterior):
+        return (actual - anterior) / anterior * 100 if anterior > 0 else 0
+
+    @property
+    def variacion_ventas(self):
+        return self._variacion(self.ventas, self.ventas_anterior)
+
+    @property
+    def variacion_egresos(self):
+        return self._variacion(self.egresos, self.egresos_anterior)
+
+
+@dataclass(frozen=True)
+class ComparativaMensual:
+    """Totales por sucursal del mes seleccionado y del anterior, ordenados por ventas."""
+    sucursales: tuple = ()
+
+    def sucursal(self, nombre):
+        for totales in self.sucursales:
+            if totales.sucursal == nombre:
+                return totales
+        return TotalesSucursal(nombre)
+
+    @property
+    def con_ventas(self):
+        return [totales for totales in self.sucursales if totales.con_ventas]
+
+    @property
+    def total_ventas(self):
+        return sum(totales.ventas for totales in self.sucursales)
+
+
+def cargar_comparativa(desde, hasta, desde_anterior):
+    """Una sola consulta para todas las cards y el Resumen del Dashboard.
+
+    Lee un único rango [desde_anterior, hasta) que cubre ambos meses y separa
+    cada período con FILTER.
+    """
+    filas = consultar(COMPARATIVA_MENSUAL, {"desde": desde, "hasta": hasta, "desde_anterior": desde_anterior})
+    return ComparativaMensual(tuple(
+        TotalesSucursal(sucursal, ventas or 0.0, ventas_anterior, egresos, egresos_anterior, ventas is not None)
+        for sucursal, ventas, ventas_anterior, egresos, egresos_anterior in filas
+    ))
+
+MOVIMIENTOS_POR_DIA = """
+    WITH DatosVentas AS (
+        SELECT
+            CASE EXTRACT(DOW FROM dia)::INT
+                WHEN 1 THEN 'Lunes'
+                WHEN 2 THEN 'Martes'
+                WHEN 3 THEN 'Miércoles'
+                WHEN 4 THEN 'Jueves'
+                WHEN 5 THEN 'Viernes'
+                WHEN 6 THEN 'Sábado'
+                WHEN 0 THEN 'Domingo'
+            END AS dia_semana,
+            SUM(cantidad) as cantidad_ventas,
+            CAST(SUM(monto) AS FLOAT) as monto_total,
+            CAST(SUM(ingreso) AS FLOAT) as ingreso_real,
+            CAST(SUM(deuda) AS FLOAT) as deuda_total,
+            CAST(SUM(monto) / NULLIF(SUM(cantidad), 0) AS FLOAT) as promedio_venta
+        FROM resumen_ventas_diario
+        WHERE dia >= %s AND dia < %s
+        GROUP BY EXTRACT(DOW FROM dia)::INT
+        HAVING SUM(cantidad) > 0
+        ORDER BY EXTRACT(DOW FROM dia)::INT
+    )
+    SELECT * FROM DatosVentas;
+"""
+
+MOVIMIENTOS_POR_METODO = """
+    WITH DatosPago AS (
+        SELECT
+            metodo_pago,
+            SUM(cantidad) as cantidad_ventas,
+            CAST(SUM(monto) AS FLOAT) as monto_total,
+            CAST(SUM(ingreso) AS FLOAT) as ingreso_real,
+            CAST(SUM(deuda) AS FLOAT) as deuda_pendiente,
+            CAST(SUM(monto) / NULLIF(SUM(cantidad), 0) AS FLOAT) as promedio_venta
+        FROM resumen_ventas_diario
+        WHERE dia >= %s AND dia < %s
+        GROUP BY metodo_pago
+        HAVING SUM(cantidad) > 0
+        ORDER BY monto_total DESC
+    )
+    SELECT * FROM DatosPago;
+"""
+
+# Los meses cerrados salen de la vista materializada resumen_mensual (ver
+# refrescar.py) y los posteriores a su último refresco del resumen diario.
+MOVIMIENTOS_MENSUALES = """
+    WITH Corte AS (
+        SELECT hasta_mes FROM refrescos_materializados WHERE vista = 'resumen_mensual'
+    ),
+    Meses AS (
+        SELECT mes, cantidad, ingreso, deuda, efectivo, digital
+        FROM resumen_mensual
+        WHERE mes >= %(desde)s
+        AND mes < (SELECT hasta_mes FROM Corte)
+        UNION ALL
+        SELECT
+            DATE_TRUNC('month', dia)::DATE,
+            SUM(cantidad),
+            SUM(ingreso),
+            SUM(deuda),
+            COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago = 'Efectivo'), 0),
+            COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago IN ('Mercado Pago', 'Cuenta DNI')), 0)
+        FROM resumen_ventas_diario
+        WHERE dia >= GREATEST(%(desde)s, (SELECT hasta_mes FROM Corte))
+        GROUP BY 1
+    )
+    SELECT
+        mes,
+        SUM(cantidad)::BIGINT as cantidad_ventas,
+        CAST(SUM(ingreso) AS FLOAT) as monto_total,
+        CAST(SUM(ingreso) AS FLOAT) as ingreso_real,
+        CAST(SUM(deuda) AS FLOAT) as deuda_pendiente,
+        CAST(SUM(efectivo) AS FLOAT) as total_efectivo,
+        CAST(SUM(digital) AS FLOAT) as total_digital,
+        CAST(SUM(ingreso) / NULLIF(SUM(cantidad), 0) AS FLOAT) as promedio_venta
+    FROM Meses
+    GROUP BY mes
+    HAVING SUM(cantidad) > 0
+    ORDER BY mes DESC;
+"""
+
+# ---------- CIERRE DE CAJA ----------
+# Cada cierre es un punto de control (migraciones/0011_cierres.sql): el turno
+# abierto va desde el último cierre del día, así solo se suman las ventas y
+# egresos posteriores a él. El turno nunca empieza antes del día: fecha >=
+# %(fecha)s es redundante pero deja que el planner descarte las demás particiones.
+_TURNO_ABIERTO = """
+    WITH Control AS (
+        SELECT
+            COALESCE(MAX(hasta), %(fecha)s::TIMESTAMP) as desde,
+            COALESCE(MAX(turno), 0) + 1 as turno
+        FROM cierres
+        WHERE sucursal = %(sucursal)s AND fecha = %(fecha)s
+    ),
+    Totales AS (
+        SELECT
+            COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago = 'Efectivo'), 0) as efectivo,
+            COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago IN ('Mercado Pago', 'Cuenta DNI')), 0) as digital,
+            COALESCE(SUM(monto) FILTER (WHERE metodo_pago = 'Fiado'), 0) as fiado
+        FROM ventas
+        WHERE fecha >= (SELECT desde FROM Control) AND fecha < %(hasta)s
+        AND fecha >= %(fecha)s
+        AND sucursal = %(sucursal)s
+    ),
+    TotalEgresos AS (
+        SELECT COALESCE(SUM(monto), 0) as egresos
+        FROM egresos
+        WHERE fecha >= (SELECT desde FROM Control) AND fecha < %(hasta)s
+        AND fecha >= %(fecha)s
+        AND sucursal = %(sucursal)s
+    ),
+    -- Cobros de cuentas de clientes (se guardan con monto negativo)
+    TotalCobros AS (
+        SELECT
+            COALESCE(-SUM(monto) FILTER (WHERE metodo_pago = 'Efectivo'), 0) as cobros_efectivo,
+            COALESCE(-SUM(monto) FILTER (WHERE metodo_pago IN ('Mercado Pago', 'Cuenta DNI')), 0) as cobros_digital
+        FROM movimientos_cliente
+        WHERE tipo = 'cobro'
+        AND fecha >= (SELECT desde FROM Control) AND fecha < %(hasta)s
+        AND fecha >= %(fecha)s
+        AND sucursal = %(sucursal)s
+    )
+"""
+
+TURNO_ABIERTO = _TURNO_ABIERTO + """
+    SELECT
+        turno,
+        desde,
+        CAST(efectivo AS FLOAT),
+        CAST(digital AS FLOAT),
+        CAST(fiado AS FLOAT),
+        CAST(egresos AS FLOAT),
+        CAST(cobros_efectivo AS FLOAT),
+        CAST(cobros_digital AS FLOAT)
+    FROM Control, Totales, TotalEgresos, TotalCobros
+"""
+
+# Cierra el turno abierto con los mismos totales que muestra TURNO_ABIERTO.
+# El efectivo esperado en caja incluye los cobros en efectivo.
+REGISTRAR_CIERRE = _TURNO_ABIERTO + """
+    INSERT INTO cierres (sucursal, fecha, turno, desde, hasta, efectivo, digital, fiado, egresos,
+                         cobros_efectivo, cobros_digital, teorico, contado, diferencia, observaciones)
+    SELECT
+        %(sucursal)s, %(fecha)s, turno, desde, %(hasta)s, efectivo, digital, fiado, egresos,
+        cobros_efectivo, cobros_digital, efectivo + cobros_efectivo - egresos, %(contado)s,
+        %(contado)s - (efectivo + cobros_efectivo - egresos), %(observaciones)s
+    FROM Control, Totales, TotalEgresos, TotalCobros
+    RETURNING turno, CAST(diferencia AS FLOAT)
+"""
+
+CIERRES_DEL_DIA = """
+    SELECT
+        turno,
+        desde,
+        hasta,
+        CAST(efectivo AS FLOAT),
+        CAST(digital AS FLOAT),
+        CAST(fiado AS FLOAT),
+        CAST(egresos AS FLOAT),
+        CAST(cobros_efectivo AS FLOAT),
+        CAST(cobros_digital AS FLOAT),
+        CAST(contado AS FLOAT),
+        CAST(diferencia AS FLOAT),
+        observaciones
+    FROM cierres
+    WHERE sucursal = %(sucursal)s AND fecha = %(fecha)s
+    ORDER BY turno
+"""
+
+
+@dataclass(frozen=True)
+class TotalesCaja:
+    efectivo: float = 0.0
+    digital: float = 0.0
+    fiado: float = 0.0
+    egresos: float = 0.0
+    cobros_efectivo: float = 0.0
+    cobros_digital: float = 0.0
+
+    @property
+    def saldo_teorico(self):
+        return self.efectivo + self.cobros_efectivo - self.egresos
+
+    @property
+    def con_movimientos(self):
+        return any(astuple(self))
+
+    def __add__(self, otro):
+        return TotalesCaja(*(a + b for a, b in zip(astuple(self), astuple(otro))))
+
+
+@dataclass(frozen=True)
+class CierreTurno:
+    turno: int
+    desde: datetime
+    hasta: datetime
+    totales: TotalesCaja
+    contado: float
+    diferencia: float
+    observaciones: str = None
+
+
+def cargar_cierres(sucursal, dia):
+    filas = consultar(CIERRES_DEL_DIA, {"sucursal": sucursal, "fecha": dia})
+    return tuple(
+        CierreTurno(turno, desde, hasta, TotalesCaja(*totales), contado, diferencia, observaciones)
+        for turno, desde, hasta, *totales, contado, diferencia, observaciones in filas
+    )
+
+
+def cargar_turno_abierto(sucursal, dia, hasta):
+    """Turno desde el último cierre del día hasta ``hasta``: (turno, desde, totales)."""
+    turno, desde, *totales = consultar(TURNO_ABIERTO, {"sucursal": sucursal, "fecha": dia, "hasta": hasta})[0]
+    return turno, desde, TotalesCaja(*totales)
+
+
+# ---------- SUELDOS ----------
+# Empleados activos de la sucursal con la fecha de su último sueldo pagado y
+# si ya cobraron el período. El último pago sale de idx_egresos_empleado_fecha
+# con una lectura por empleado en cada partición mensual de egresos (Merge
+# Append con LIMIT 1), sin importar cuántos sueldos haya en cada mes.
+EMPLEADOS_ULTIMO_PAGO = """
+    SELECT
+        emp.id,
+        emp.nombre,
+        emp.sueldo_base,
+        up.fecha as ultimo_pago,
+        EXISTS (
+            SELECT 1 FROM pagos_sueldo ps
+            WHERE ps.empleado_id = emp.id AND ps.periodo = %(periodo)s
+        ) AS pagado
+    FROM empleados emp
+    LEFT JOIN LATERAL (
+        SELECT e.fecha
+        FROM egresos e
+        WHERE e.empleado_id = emp.id
+        ORDER BY e.fecha DESC
+        LIMIT 1
+    ) up ON TRUE
+    WHERE emp.sucursal = %(sucursal)s AND emp.activo = TRUE
+    ORDER BY emp.nombre
+"""
+
+
+# ---------- CUENTAS DE CLIENTES ----------
+# Saldos y deuda abierta por día los mantienen los triggers de
+# migraciones/0015_cuentas_clientes.sql: el reporte lee una fila por cliente
+# más sus días con deuda impaga, sin importar cuántas ventas fiadas tenga.
+SALDOS_CLIENTES = """
+    SELECT
+        c.id,
+        c.nombre,
+        c.telefono,
+        CAST(c.saldo AS FLOAT) as saldo,
+        CAST(COALESCE(SUM(d.pendiente) FILTER (WHERE d.dia > %(hoy)s - 30), 0) AS FLOAT) as hasta_30,
+        CAST(COALESCE(SUM(d.pendiente) FILTER (WHERE d.dia <= %(hoy)s - 30 AND d.dia > %(hoy)s - 60), 0) AS FLOAT) as de_31_a_60,
+        CAST(COALESCE(SUM(d.pendiente) FILTER (WHERE d.dia <= %(hoy)s - 60 AND d.dia > %(hoy)s - 90), 0) AS FLOAT) as de_61_a_90,
+        CAST(COALESCE(SUM(d.pendiente) FILTER (WHERE d.dia <= %(hoy)s - 90), 0) AS FLOAT) as mas_de_90,
+        MIN(d.dia) as deuda_desde,
+        c.ultimo_movimiento
+    FROM clientes c
+    LEFT JOIN deudas_abiertas d ON d.cliente_id = c.id
+    WHERE c.saldo <> 0
+    GROUP BY c.id
+    ORDER BY c.saldo DESC
+"""
+
+MOVIMIENTOS_CLIENTE = """
+    SELECT fecha, tipo, CAST(monto AS FLOAT), sucursal, metodo_pago
+    FROM movimientos_cliente
+    WHERE cliente_id = %(cliente_id)s
+    ORDER BY fecha DESC, id DESC
+    LIMIT %(limite)s
+"""
+
+# Clientes a los que se les puede registrar un cobro
+CLIENTES_CON_DEUDA = """
+    SELECT id, nombre, telefono, CAST(saldo AS FLOAT)
+    FROM clientes
+    WHERE saldo > 0
+    ORDER BY nombre
+"""
+
+TRAMOS_ANTIGUEDAD = ("hasta_30", "de_31_a_60", "de_61_a_90", "mas_de_90")
+
+
+@dataclass(frozen=True)
+class SaldoCliente:
+    id: int
+    nombre: str
+    telefono: str
+    saldo: float
+    hasta_30: float
+    de_31_a_60: float
+    de_61_a_90: float
+    mas_de_90: float
+    deuda_desde: date
+    ultimo_movimiento: datetime
+
+
+def cargar_saldos_clientes(hoy=None):
+    """Clientes con saldo distinto de cero, de mayor a menor deuda, con su deuda por antigüedad."""
+    return tuple(SaldoCliente(*fila) for fila in consultar(SALDOS_CLIENTES, {"hoy": hoy or date.today()}))
+
+
+def cargar_clientes_con_deuda():
+    """{id: (nombre, teléfono, saldo)} de los clientes que deben algo, por nombre."""
+    return {cliente_id: (nombre, telefono, saldo) for cliente_id, nombre, telefono, saldo in consultar(CLIENTES_CON_DEUDA)}
+
+
+# ---------- ESCRITURAS ----------
+# ON CONFLICT sobre la clave de idempotencia: reenviar la misma operación no la duplica.
+# La clave única incluye fecha porque las tablas están particionadas por mes
+# (migraciones/0012_particiones_mensuales.sql); un reenvío trae la misma fecha.
+INSERTAR_VENTA = """
+    INSERT INTO ventas
+    (sucursal, monto, metodo_pago, entregado, vuelto, ingreso, deuda, fecha, cliente_fiado, telefono_fiado,
+     cliente_id, clave_idempotencia)
+    VALUES
+    (%(sucursal)s, %(monto)s, %(metodo_pago)s, %(entregado)s, %(vuelto)s, %(ingreso)s, %(deuda)s, %(fecha)s,
+     %(cliente_fiado)s, %(telefono_fiado)s, %(cliente_id)s, %(clave)s)
+    ON CONFLICT (clave_idempotencia, fecha) DO NOTHING
+"""
+
+INSERTAR_EGRESO = """
+    INSERT INTO egresos (sucursal, motivo, monto, observacion, fecha, detalle, clave_idempotencia)
+    VALUES (%(sucursal)s, %(motivo)s, %(monto)s, %(observacion)s, %(fecha)s, %(detalle)s, %(clave)s)
+    ON CONFLICT (clave_idempotencia, fecha) DO NOTHING
+"""
+
+# El cobro se guarda con signo negativo: descuenta del saldo del cliente
+INSERTAR_COBRO = """
+    INSERT INTO movimientos_cliente (cliente_id, fecha, tipo, monto, sucursal, metodo_pago, clave_idempotencia)
+    VALUES (%(cliente_id)s, %(fecha)s, 'cobro', -(%(monto)s), %(sucursal)s, %(metodo_pago)s, %(clave)s)
+    ON CONFLICT (clave_idempotencia) DO NOTHING
+"""
+
+
+# ---------- CONSULTAS CALIENTES ----------
+def consultas_calientes(hoy=None, sucursal="Sucursal Centro"):
+    """Consultas de lectura que se ejecutan en cada vista, con parámetros de ejemplo.
+
+    Las usa ``indices.py`` para comprobar con EXPLAIN que todas
+    tienen un índice que las respalde, y ``benchmark/medir.py`` para medirlas.
+    """
+    hoy = hoy or date.today()
+    desde, hasta = rango_mes(hoy.year, hoy.month)
+    desde_anterior, _ = rango_mes_anterior(hoy.year, hoy.month)
+    dia_desde, dia_hasta = rango_dia(hoy)
+    return {
+        "comparativa_mensual": (COMPARATIVA_MENSUAL, {"desde": desde, "hasta": hasta, "desde_anterior": desde_anterior}),
+        "movimientos_por_dia": (MOVIMIENTOS_POR_DIA, (desde, hasta)),
+        "movimientos_por_metodo": (MOVIMIENTOS_POR_METODO, (desde, hasta)),
+        "movimientos_mensuales": (MOVIMIENTOS_MENSUALES, {"desde": inicio_serie_mensual(hoy)}),
+        "turno_abierto": (TURNO_ABIERTO, {"fecha": dia_desde, "hasta": dia_hasta, "sucursal": sucursal}),
+        "cierres_del_dia": (CIERRES_DEL_DIA, {"fecha": dia_desde, "sucursal": sucursal}),
+        "empleados_ultimo_pago": (EMPLEADOS_ULTIMO_PAGO, {"sucursal": sucursal, "periodo": desde}),
+        "saldos_clientes": (SALDOS_CLIENTES, {"hoy": hoy}),
+        "clientes_con_deuda": (CLIENTES_CON_DEUDA, None),
+        "movimientos_cliente": (MOVIMIENTOS_CLIENTE, {"cliente_id": 1, "limite": 50}),
+    }
@@ -0,0 +1,447 @@
+# db.py
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+import perfilador
+
+load_dotenv()
+
+# ---------- CONFIGURACIÓN DEL POOL ----------
+POOL_MIN = int(os.getenv("DB_POOL_MIN", 2))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", 20))
+# Segundos que una conexión puede quedar ociosa antes de cerrarse (sin bajar de POOL_MIN)
+POOL_IDLE = float(os.getenv("DB_POOL_IDLE", 300))
+# Segundos máximos de espera cuando todas las conexiones están en uso
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# Una conexión ociosa más de estos segundos se verifica con SELECT 1 antes de entregarse
+POOL_CHECK = float(os.getenv("DB_POOL_CHECK", 30))
+
+# Segundos máximos por consulta en el contexto actual (None: sin límite). Lo usan
+# consultar() y consultar_tabla() con SET LOCAL, así Postgres cancela la consulta
+# y la conexión vuelve al pool aunque nadie espere ya el resultado
+limite_consulta = contextvars.ContextVar("limite_consulta", default=None)
+
+
+def parametros_conexion():
+    return dict(
+        host=os.getenv("DB_HOST"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASS"),
+        port=os.getenv("DB_PORT", 5432),
+        connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", 5)),
+    )
+
+
+class PoolAgotado(Exception):
+    pass
+
+
+class PoolConexiones:
+    """Pool de conexiones psycopg2 compartido por todos los hilos del proceso.
+
+    Las conexiones se entregan con ``conexion()`` como context manager: al salir
+    se hace rollback de cualquier transacción abierta y la conexión vuelve al
+    pool. Las conexiones rotas se descartan y se reemplazan por una nueva.
+    """
+
+    def __init__(self, minimo, maximo, idle, timeout, check, **parametros):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.idle = idle
+        self.timeout = timeout
+        self.check = check
+        self._parametros = parametros
+        self._libres = []  # (conexión, último uso), la más reciente al final
+        self._total = 0
+        self._cond = threading.Condition()
+        self._cerrado = False
+
+    def _conectar(self):
+        return psycopg2.connect(**self._parametros)
+
+    def _esta_sana(self, conn, ultimo_uso):
+        if conn.closed:
+            return False
+        if time.monotonic() - ultimo_uso < self.check:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _cerrar_silencioso(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _reciclar_ociosas(self):
+        # Se llama con el lock tomado: cierra las conexiones ociosas más viejas
+        # mientras el pool tenga más de POOL_MIN conexiones
+        limite = time.monotonic() - self.idle
+        while self._libres and self._total > self.minimo and self._libres[0][1] < limite:
+            conn, _ = self._libres.pop(0)
+            self._cerrar_silencioso(conn)
+            self._total -= 1
+
+    def obtener(self):
+        vence = time.monotonic() + self.timeout
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._cerrado:
+                        raise PoolAgotado("El pool de conexiones está cerrado")
+                    self._reciclar_ociosas()
+                    if self._libres:
+                        conn, ultimo_uso = self._libres.pop()
+                        break
+                    if self._total < self.maximo:
+                        self._total += 1
+                        break
+                    restante = vence - time.monotonic()
+                    if restante <= 0:
+                        raise PoolAgotado(f"No hay conexiones libres (máximo {self.maximo})")
+                    self._cond.wait(restante)
+
+            if conn is None:
+                try:
+                    return self._conectar()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._esta_sana(conn, ultimo_uso):
+                return conn
+
+            # Conexión caída: se descarta y se vuelve a intentar con otra
+            self._cerrar_silencioso(conn)
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+
+    def devolver(self, conn, descartar=False):
+        if not descartar and not conn.closed:
+            try:
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except psycopg2.Error:
+                descartar = True
+
+        with self._cond:
+            if descartar or conn.closed or self._cerrado:
+                self._cerrar_silencioso(conn)
+                self._total -= 1
+            else:
+                self._libres.append((conn, time.monotonic()))
+                self._reciclar_ociosas()
+            self._cond.notify()
+
+    @contextmanager
+    def conexion(self):
+        conn = self.obtener()
+        descartar = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            descartar = True
+            raise
+        finally:
+            self.devolver(conn, descartar)
+
+    def cerrar(self):
+        with self._cond:
+            self._cerrado = True
+            for conn, _ in self._libres:
+                self._cerrar_silencioso(conn)
+                self._total -= 1
+            self._libres.clear()
+            self._cond.notify_all()
+
+
+# ---------- POOL DEL PROCESO ----------
+_pool = None
+_pool_replica = None
+_pool_lock = threading.Lock()
+
+
+def _crear_pool(parametros):
+    instrumentado = {"cursor_factory": perfilador.CursorInstrumentado} if perfilador.PERFIL_ACTIVO else {}
+    return PoolConexiones(POOL_MIN, POOL_MAX, POOL_IDLE, POOL_TIMEOUT, POOL_CHECK, **parametros, **instrumentado)
+
+
+def obtener_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _crear_pool(parametros_conexion())
+    return _pool
+
+
+def obtener_pool_replica():
+    """Pool de la réplica de lectura, o None si DB_REPLICA_HOST no está configurado."""
+    global _pool_replica
+    parametros = parametros_replica()
+    if parametros is None:
+        return None
+    if _pool_replica is None:
+        with _pool_lock:
+            if _pool_replica is None:
+                _pool_replica = _crear_pool(parametros)
+    return _pool_replica
+
+
+@contextmanager
+def conexion(escritura=False):
+    """Conexión al primario, para escrituras y lecturas que no pueden ir a la réplica.
+
+    Con réplica configurada, los bloques que escriben (``escritura=True``) y
+    terminan con la transacción confirmada anotan la posición del WAL del
+    primario: las lecturas siguientes solo van a la réplica cuando ya la aplicó.
+    """
+    with obtener_pool().conexion() as conn:
+        yield conn
+        confirmada = conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        if escritura and confirmada and parametros_replica() is not None:
+            _anotar_escritura(conn)
+
+
+# ---------- RÉPLICA DE LECTURA ----------
+# Con DB_REPLICA_HOST en el .env, las lecturas de las vistas que activan
+# leer_de_replica (Dashboard, Cierre de caja, Exportar) van a esa réplica y las
+# escrituras siguen yendo al primario con conexion(). Se vuelve al primario si
+# la réplica no responde, si está atrasada más de REPLICA_MAX_RETRASO segundos
+# o si todavía no aplicó la última escritura de este proceso.
+REPLICA_MAX_RETRASO = float(os.getenv("DB_REPLICA_MAX_RETRASO", 10))
+# Segundos entre verificaciones del estado de la réplica
+REPLICA_CHECK = float(os.getenv("DB_REPLICA_CHECK", 5))
+# Segundos sin intentar usar la réplica después de un error de conexión
+REPLICA_REINTENTO = float(os.getenv("DB_REPLICA_REINTENTO", 30))
+
+# True en el contexto de las vistas cuyas lecturas pueden ir a la réplica
+leer_de_replica = contextvars.ContextVar("leer_de_replica", default=False)
+
+# Si la réplica no está en recuperación (una instancia suelta usada para
+# pruebas) no hay WAL con qué comparar: se la considera al día
+ESTADO_REPLICA = """
+    SELECT
+        pg_is_in_recovery(),
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END,
+        pg_last_wal_replay_lsn()::TEXT
+"""
+
+_replica_lock = threading.Lock()
+_replica = {"verificada": 0.0, "retraso": None, "lsn": None, "caida_hasta": 0.0, "error": None}
+# Posición del WAL del primario después de la última escritura del proceso
+_ultima_escritura = 0
+
+
+def parametros_replica():
+    host = os.getenv("DB_REPLICA_HOST")
+    if not host:
+        return None
+    return dict(
+        parametros_conexion(),
+        host=host,
+        port=os.getenv("DB_REPLICA_PORT", os.getenv("DB_PORT", 5432)),
+        database=os.getenv("DB_REPLICA_NAME", os.getenv("DB_NAME")),
+        user=os.getenv("DB_REPLICA_USER", os.getenv("DB_USER")),
+        password=os.getenv("DB_REPLICA_PASS", os.getenv("DB_PASS")),
+    )
+
+
+def _lsn(texto):
+    # '16/B374D848' -> entero comparable
+    alto, bajo = texto.split("/")
+    return (int(alto, 16) << 32) + int(bajo, 16)
+
+
+def _anotar_escritura(conn):
+    global _ultima_escritura
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_current_wal_lsn()::TEXT")
+        lsn = _lsn(cur.fetchone()[0])
+        conn.rollback()
+    except psycopg2.Error:
+        return
+    with _replica_lock:
+        _ultima_escritura = max(_ultima_escritura, lsn)
+
+
+def _marcar_caida(error):
+    with _replica_lock:
+        _replica.update(caida_hasta=time.monotonic() + REPLICA_REINTENTO, error=str(error).strip().partition("\n")[0])
+
+
+def _verificar_replica(pool):
+    try:
+        with pool.conexion() as conn:
+            cur = conn.cursor()
+            cur.execute(ESTADO_REPLICA)
+            en_recuperacion, retraso, lsn = cur.fetchone()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+        _marcar_caida(e)
+        return
+    except (psycopg2.Error, PoolAgotado):
+        return
+    with _replica_lock:
+        _replica.update(
+            verificada=time.monotonic(),
+            retraso=float(retraso) if en_recuperacion and retraso is not None else 0.0,
+            lsn=_lsn(lsn) if en_recuperacion and lsn else None,
+            error=None,
+        )
+
+
+def _aplico_escrituras():
+    # Se llama con _replica_lock tomado
+    return _replica["lsn"] is None or _replica["lsn"] >= _ultima_escritura
+
+
+def _replica_utilizable(pool):
+    with _replica_lock:
+        if time.monotonic() < _replica["caida_hasta"]:
+            return False
+        retraso_ok = _replica["retraso"] is not None and _replica["retraso"] <= REPLICA_MAX_RETRASO
+        if time.monotonic() - _replica["verificada"] < REPLICA_CHECK:
+            # Con el retraso al día pero sin la última escritura aplicada se
+            # verifica ya: la réplica suele alcanzarla en milisegundos
+            if not retraso_ok or _aplico_escrituras():
+                return retraso_ok
+    _verificar_replica(pool)
+    with _replica_lock:
+        return (time.monotonic() >= _replica["caida_hasta"] and _replica["retraso"] is not None
+                and _replica["retraso"] <= REPLICA_MAX_RETRASO and _aplico_escrituras())
+
+
+def estado_replica():
+    """None sin réplica configurada; si no, {'en_uso', 'retraso', 'error'} para mostrar en la interfaz."""
+    pool = obtener_pool_replica()
+    if pool is None:
+        return None
+    en_uso = _replica_utilizable(pool)
+    with _replica_lock:
+        return {"en_uso": en_uso, "retraso": _replica["retraso"], "error": _replica["error"]}
+
+
+def parametros_lectura():
+    """Parámetros para una conexión propia de solo lectura: los de la réplica si está al día."""
+    pool = obtener_pool_replica()
+    if pool is not None and _replica_utilizable(pool):
+        return parametros_replica()
+    return parametros_conexion()
+
+
+@contextmanager
+def conexion_lectura():
+    """Conexión para consultas de solo lectura.
+
+    Sale de la réplica si el contexto lo permite (leer_de_replica) y la
+    réplica está al día; si no, o si no se puede conectar, del primario.
+    """
+    pool = obtener_pool()
+    replica = obtener_pool_replica() if leer_de_replica.get() else None
+    if replica is not None and _replica_utilizable(replica):
+        try:
+            conn = replica.obtener()
+            pool = replica
+        except psycopg2.OperationalError as e:
+            _marcar_caida(e)
+        except PoolAgotado:
+            pass
+    if pool is not replica:
+        conn = pool.obtener()
+
+    descartar = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+        descartar = True
+        if pool is replica:
+            _marcar_caida(e)
+        raise
+    finally:
+        pool.devolver(conn, descartar)
+
+
+def _aplicar_limite(cur):
+    limite = limite_consulta.get()
+    if limite:
+        cur.execute("SET LOCAL statement_timeout = %s", (int(limite * 1000),))
+
+
+def consultar(sql, parametros=None):
+    with conexion_lectura() as conn:
+        cur = conn.cursor()
+        _aplicar_limite(cur)
+        cur.execute(sql, parametros)
+        return cur.fetchall()
+
+
+# ---------- RESULTADOS COMO TABLAS ----------
+# consultar_tabla arma cada columna de una vez según el tipo de Postgres, sin
+# pasar por objetos Decimal ni formatear celda por celda en Python
+NUMERIC_A_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, "NUMERIC_A_FLOAT",
+    lambda valor, cur: None if valor is None else float(valor)
+)
+_ENTEROS = set(psycopg2.extensions.INTEGER.values + psycopg2.extensions.LONGINTEGER.values)
+_DECIMALES = set(psycopg2.extensions.FLOAT.values + psycopg2.extensions.DECIMAL.values)
+_FECHAS = set(psycopg2.extensions.DATE.values + psycopg2.extensions.PYDATETIME.values)
+_FECHAS_TZ = set(psycopg2.extensions.PYDATETIMETZ.values)
+
+
+def _columna(valores, tipo):
+    if tipo in _DECIMALES:
+        return np.array(valores, dtype=np.float64)
+    if tipo in _ENTEROS:
+        # Con NULL la columna queda en float64 (NaN) como haría pandas
+        return np.array(valores, dtype=np.float64 if None in valores else np.int64)
+    if tipo in _FECHAS:
+        return np.array(valores, dtype="datetime64[us]")
+    if tipo in _FECHAS_TZ:
+        # timestamptz: numpy no guarda la zona horaria, se pasa todo a UTC
+        return pd.to_datetime(list(valores), utc=True)
+    return np.array(valores, dtype=object)
+
+
+def consultar_tabla(sql, parametros=None, columnas=None):
+    """Como consultar() pero devuelve un DataFrame con columnas tipadas.
+
+    NUMERIC llega como float64, los enteros como int64 y las fechas como
+    datetime64 (las que tienen zona horaria, en UTC); ``columnas`` renombra
+    las columnas del cursor en orden.
+    """
+    with conexion_lectura() as conn:
+        cur = conn.cursor()
+        psycopg2.extensions.register_type(NUMERIC_A_FLOAT, cur)
+        _aplicar_limite(cur)
+        cur.execute(sql, parametros)
+        tipos = [descripcion.type_code for descripcion in cur.description]
+        nombres = columnas or [descripcion.name for descripcion in cur.description]
+        filas = cur.fetchall()
+    valores = zip(*filas) if filas else [()] * len(tipos)
+    return pd.DataFrame(
+        {nombre: _columna(columna, tipo) for nombre, columna, tipo in zip(nombres, valores, tipos)},
+        copy=False,
+    )
@@ -0,0 +1,197 @@
+# diario.py
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import psycopg2
+
+import cache
+import clientes
+import consultas
+import perfilador
+from db import PoolAgotado, conexion
+
+# Diario local de ventas, egresos y cobros todavía no sincronizados con Postgres.
+# La caja confirma la operación apenas queda escrita (y sincronizada a disco)
+# en SQLite; un hilo en segundo plano la reenvía a Postgres en orden.
+DIARIO_PATH = os.getenv("DIARIO_PATH", str(Path(__file__).resolve().parent / "diario_local.db"))
+# Operaciones reenviadas por transacción de Postgres
+DIARIO_LOTE = int(os.getenv("DIARIO_LOTE", 50))
+# Segundos entre intentos cuando no hay nada que sincronizar
+DIARIO_INTERVALO = float(os.getenv("DIARIO_INTERVALO", 5))
+# Reintentos antes de apartar una operación que Postgres rechaza por sus datos
+DIARIO_MAX_INTENTOS = int(os.getenv("DIARIO_MAX_INTENTOS", 5))
+
+INSERCIONES = {
+    "venta": consultas.INSERTAR_VENTA,
+    "egreso": consultas.INSERTAR_EGRESO,
+    "cobro": consultas.INSERTAR_COBRO,
+}
+
+
+class Diario:
+    def __init__(self, ruta=DIARIO_PATH):
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # FULL: cada commit hace fsync del WAL antes de confirmar la operación
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pendientes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    clave TEXT NOT NULL UNIQUE,
+                    tipo TEXT NOT NULL,
+                    datos TEXT NOT NULL,
+                    creado_en TEXT NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    ultimo_error TEXT
+                )
+            """)
+        # Un solo reenvío a la vez (hilo de fondo o vaciar() desde un pedido):
+        # abarca leer el lote, enviarlo y borrarlo, así el orden se respeta y
+        # los intentos de una operación rechazada no se pisan
+        self._envio = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._hilo = None
+        self._ultimo_error = None
+
+    def encolar(self, tipo, datos):
+        """Guarda una operación en el diario y devuelve su clave de idempotencia."""
+        if tipo not in INSERCIONES:
+            raise ValueError(f"Tipo de operación desconocido: {tipo}")
+        clave = str(uuid.uuid4())
+        datos = dict(datos, clave=clave)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pendientes (clave, tipo, datos, creado_en) VALUES (?, ?, ?, ?)",
+                (clave, tipo, json.dumps(datos, default=str), datetime.now().isoformat()),
+            )
+        self._hay_trabajo.set()
+        return clave
+
+    def estado(self):
+        with self._lock:
+            filas = self._conn.execute("SELECT estado, COUNT(*) FROM pendientes GROUP BY estado").fetchall()
+        conteos = dict(filas)
+        return {
+            "pendientes": conteos.get("pendiente", 0),
+            "con_error": conteos.get("error", 0),
+            "ultimo_error": self._ultimo_error,
+        }
+
+    def _siguientes(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, tipo, datos, intentos FROM pendientes WHERE estado = 'pendiente' ORDER BY id LIMIT ?",
+                (DIARIO_LOTE,),
+            ).fetchall()
+
+    def sincronizar(self):
+        """Reenvía un lote a Postgres. Devuelve cuántas operaciones se sincronizaron.
+
+        Si Postgres no responde levanta la excepción y el lote queda intacto;
+        una operación rechazada por sus datos se reintenta y, tras
+        DIARIO_MAX_INTENTOS, se aparta con estado 'error' para no trabar la cola.
+        """
+        with self._envio:
+            return self._sincronizar_lote()
+
+    def _sincronizar_lote(self):
+        lote = self._siguientes()
+        if not lote:
+            return 0
+
+        enviadas, rechazadas, afectadas = [], [], set()
+        fiadas = False
+        # Con réplica, el envío anota su posición del WAL: una operación del
+        # diario se ve en las lecturas recién cuando se sincronizó, no al encolarla
+        with conexion(escritura=True) as conn:
+            cur = conn.cursor()
+            for id_, tipo, datos, intentos in lote:
+                datos = json.loads(datos)
+                if tipo == "venta":
+                    # Ventas encoladas antes de que se guardara el cliente elegido
+                    datos.setdefault("cliente_id", None)
+                cur.execute("SAVEPOINT operacion")
+                try:
+                    cur.execute(INSERCIONES[tipo], datos)
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    raise
+                except psycopg2.Error as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT operacion")
+                    rechazadas.append((id_, intentos + 1, str(e).strip()))
+                    continue
+                enviadas.append(id_)
+                afectadas.add((datos["sucursal"], datos["fecha"][:10]))
+                fiadas = fiadas or datos.get("metodo_pago") == "Fiado"
+            conn.commit()
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM pendientes WHERE id = ?", [(id_,) for id_ in enviadas])
+            self._conn.executemany(
+                "UPDATE pendientes SET intentos = ?, ultimo_error = ?, "
+                "estado = CASE WHEN ? >= ? THEN 'error' ELSE estado END WHERE id = ?",
+                [(intentos, error, intentos, DIARIO_MAX_INTENTOS, id_) for id_, intentos, error in rechazadas],
+            )
+            self._conn.execute("COMMIT")
+
+        for sucursal, dia in afectadas:
+            cache.resultados.invalidar(sucursal, datetime.fromisoformat(dia).date())
+        if fiadas:
+            # Una venta fiada puede haber creado un cliente o cambiado su teléfono
+            clientes.invalidar()
+        self._ultimo_error = rechazadas[-1][2] if rechazadas else None
+        return len(enviadas)
+
+    def vaciar(self):
+        """Sincroniza en el momento todo lo pendiente. Devuelve cuántas operaciones quedan sin enviar."""
+        with self._envio:
+            while self._sincronizar_lote() == DIARIO_LOTE:
+                pass
+        return self.estado()["pendientes"]
+
+    def _bucle(self):
+        perfilador.vista_actual.set("Sincronización del diario")
+        espera = DIARIO_INTERVALO
+        while True:
+            self._hay_trabajo.wait(espera)
+            self._hay_trabajo.clear()
+            try:
+                while self.sincronizar() == DIARIO_LOTE:
+                    pass
+                espera = DIARIO_INTERVALO
+            except (psycopg2.Error, PoolAgotado) as e:
+                # Sin conexión: se reintenta con espera creciente hasta un minuto
+                self._ultimo_error = str(e).strip()
+                espera = min(espera * 2, 60)
+            except Exception as e:
+                self._ultimo_error = str(e).strip()
+                espera = DIARIO_INTERVALO
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._bucle, name="sincronizador-diario", daemon=True)
+            self._hilo.start()
+            self._hay_trabajo.set()
+        return self
+
+
+# ---------- DIARIO DEL PROCESO ----------
+_diario = None
+_diario_lock = threading.Lock()
+
+
+def obtener_diario():
+    global _diario
+    if _diario is None:
+        with _diario_lock:
+            if _diario is None:
+                _diario = Diario().iniciar()
+    return _diario
@@ -0,0 +1,206 @@
+# exportar.py
+import argparse
+import csv
+import os
+from datetime import date, datetime
+from pathlib import Path
+
+import psycopg2
+
+from consultas import rango_mes
+from db import parametros_lectura
+
+# El formato Parquet y la lectura de los meses archivados necesitan pyarrow
+# (requirements-opcional.txt); sin pyarrow solo se exporta CSV de los meses
+# que siguen en Postgres.
+
+# Filas que se traen del cursor del servidor por vez: la memoria usada no depende del período
+EXPORTAR_LOTE = int(os.getenv("EXPORTAR_LOTE", 5000))
+
+COLUMNAS = {
+    "ventas": ["id", "fecha", "sucursal", "metodo_pago", "monto", "entregado", "vuelto", "ingreso", "deuda",
+               "cliente_fiado", "telefono_fiado"],
+    "egresos": ["id", "fecha", "sucursal", "motivo", "monto", "observacion", "detalle", "empleado_id"],
+}
+FORMATOS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+# Tamaño máximo de un archivo descargable desde la app. st.download_button
+# guarda el archivo entero en memoria mientras se ofrece la descarga; los
+# más grandes se generan con este script.
+EXPORTAR_MAX_MB = float(os.getenv("EXPORTAR_MAX_MB", 25))
+
+# Meses archivados en Parquet por archivar.py que se cruzan con el período
+MESES_ARCHIVADOS = """
+    SELECT mes, archivo FROM meses_archivados
+    WHERE tabla = %(tabla)s
+    AND mes >= DATE_TRUNC('month', %(desde)s::DATE) AND mes < %(hasta)s
+    ORDER BY mes
+"""
+
+
+def rango_periodo(anio, mes=None):
+    return rango_mes(anio, mes) if mes else (date(anio, 1, 1), date(anio + 1, 1, 1))
+
+
+def nombre_archivo(tabla, anio, mes=None, formato="csv", sucursal=None):
+    partes = [tabla, str(anio)] + ([f"{mes:02d}"] if mes else [])
+    if sucursal:
+        partes.append(sucursal.lower().replace("sucursal ", "").replace(" ", "_"))
+    return "_".join(partes) + "." + formato
+
+
+def comando(tabla, anio, mes=None, formato="csv", sucursal=None):
+    """Línea de comandos que genera el mismo archivo sin pasar por la app."""
+    partes = ["python exportar.py", tabla, f"--anio {anio}"]
+    if mes:
+        partes.append(f"--mes {mes}")
+    if sucursal:
+        partes.append(f'--sucursal "{sucursal}"')
+    if formato != "csv":
+        partes.append(f"--formato {formato}")
+    return " ".join(partes)
+
+
+def parquet_disponible():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _esquema(columnas):
+    import pyarrow as pa
+
+    tipos = {
+        "id": pa.int64(), "fecha": pa.timestamp("us"), "empleado_id": pa.int64(),
+        "monto": pa.decimal128(12, 2), "entregado": pa.decimal128(12, 2), "vuelto": pa.decimal128(12, 2),
+        "ingreso": pa.decimal128(12, 2), "deuda": pa.decimal128(12, 2),
+    }
+    return pa.schema([(columna, tipos.get(columna, pa.string())) for columna in columnas])
+
+
+def _siguiente_mes(mes):
+    return rango_mes(mes.year, mes.month)[1]
+
+
+def _tramos(desde, hasta, archivados):
+    """Divide [desde, hasta) en tramos consecutivos (desde, hasta, archivo); archivo None es Postgres."""
+    tramos, actual = [], desde
+    for mes, archivo in archivados:
+        inicio, fin = max(mes, desde), min(_siguiente_mes(mes), hasta)
+        if actual < inicio:
+            tramos.append((actual, inicio, None))
+        tramos.append((inicio, fin, archivo))
+        actual = fin
+    if actual < hasta:
+        tramos.append((actual, hasta, None))
+    return tramos
+
+
+def _lotes_postgres(conn, tabla, columnas, desde, hasta, sucursal, lote):
+    sql = f"SELECT {', '.join(columnas)} FROM {tabla} WHERE fecha >= %(desde)s AND fecha < %(hasta)s"
+    if sucursal:
+        sql += " AND sucursal = %(sucursal)s"
+    sql += " ORDER BY fecha, id"
+
+    cur = conn.cursor(name=f"exportar_{tabla}")
+    cur.itersize = lote
+    cur.execute(sql, {"desde": desde, "hasta": hasta, "sucursal": sucursal})
+    try:
+        while True:
+            filas = cur.fetchmany(lote)
+            if not filas:
+                break
+            yield filas
+    finally:
+        cur.close()
+
+
+def _lotes_parquet(archivo, columnas, desde, hasta, sucursal, lote):
+    import pyarrow.dataset as ds
+
+    filtro = (ds.field("fecha") >= datetime.combine(desde, datetime.min.time())) & \
+             (ds.field("fecha") < datetime.combine(hasta, datetime.min.time()))
+    if sucursal:
+        filtro &= ds.field("sucursal") == sucursal
+    for lote_archivo in ds.dataset(archivo, format="parquet").to_batches(
+            columns=columnas, filter=filtro, batch_size=lote):
+        if lote_archivo.num_rows:
+            yield list(zip(*(lote_archivo.column(columna).to_pylist() for columna in columnas)))
+
+
+def leer_lotes(tabla, desde, hasta, sucursal=None, lote=EXPORTAR_LOTE, columnas=None, conn=None):
+    """Filas del período en lotes, leídas con un cursor del servidor.
+
+    Usa una conexión propia (no la del pool de la caja) en una transacción de
+    solo lectura: la exportación ve una foto fija de los datos y no ocupa
+    conexiones que necesita el registro de ventas. Los meses archivados por
+    archivar.py se leen de su Parquet, con las mismas columnas y tipos.
+    """
+    columnas = columnas or COLUMNAS[tabla]
+    propia = conn is None
+    if propia:
+        conn = psycopg2.connect(**parametros_lectura())
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    try:
+        cur = conn.cursor()
+        cur.execute(MESES_ARCHIVADOS, {"tabla": tabla, "desde": desde, "hasta": hasta})
+        for inicio, fin, archivo in _tramos(desde, hasta, cur.fetchall()):
+            if archivo:
+                yield from _lotes_parquet(archivo, columnas, inicio, fin, sucursal, lote)
+            # Un mes archivado normalmente ya no tiene filas en Postgres; si se
+            # cargó algo después de archivarlo, también se incluye
+            yield from _lotes_postgres(conn, tabla, columnas, inicio, fin, sucursal, lote)
+    finally:
+        if propia:
+            conn.close()
+
+
+def escribir_parquet(destino, columnas, lotes):
+    """Escribe los lotes en un Parquet con compresión zstd, un row group por lote. Devuelve las filas."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    total = 0
+    esquema = _esquema(columnas)
+    with pq.ParquetWriter(destino, esquema, compression="zstd") as escritor:
+        for filas in lotes:
+            escritor.write_table(pa.Table.from_pylist(
+                [dict(zip(esquema.names, fila)) for fila in filas], schema=esquema))
+            total += len(filas)
+    return total
+
+
+def exportar(tabla, destino, desde, hasta, formato="csv", sucursal=None, lote=EXPORTAR_LOTE):
+    """Escribe las filas del período en ``destino`` (ruta o archivo binario). Devuelve cuántas filas escribió."""
+    total = 0
+    lotes = leer_lotes(tabla, desde, hasta, sucursal, lote)
+    if formato == "parquet":
+        total = escribir_parquet(destino, COLUMNAS[tabla], lotes)
+    else:
+        # utf-8-sig para que Excel reconozca los acentos
+        with open(destino, "w", newline="", encoding="utf-8-sig") as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(COLUMNAS[tabla])
+            for filas in lotes:
+                escritor.writerows(filas)
+                total += len(filas)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta ventas o egresos de un mes o un año")
+    parser.add_argument("tabla", choices=list(COLUMNAS))
+    parser.add_argument("--anio", type=int, default=date.today().year)
+    parser.add_argument("--mes", type=int, choices=range(1, 13), help="sin --mes se exporta el año completo")
+    parser.add_argument("--sucursal")
+    parser.add_argument("--formato", choices=list(FORMATOS), default="csv")
+    parser.add_argument("--salida", type=Path)
+    args = parser.parse_args()
+
+    if args.formato == "parquet" and not parquet_disponible():
+        parser.error("para exportar Parquet hace falta pyarrow (pip install -r requirements-opcional.txt)")
+    salida = args.salida or Path(nombre_archivo(args.tabla, args.anio, args.mes, args.formato, args.sucursal))
+    desde, hasta = rango_periodo(args.anio, args.mes)
+    filas = exportar(args.tabla, salida, desde, hasta, args.formato, args.sucursal)
+    print(f"✅ {filas} filas de {args.tabla} exportadas a {salida}")
@@ -0,0 +1,198 @@
+# importar.py
+import argparse
+import io
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import refrescar
+from db import conexion
+
+# Los archivos Parquet se leen con pyarrow (requirements-opcional.txt); los CSV no lo necesitan.
+
+# Filas por lote: cada lote se copia a la tabla temporal y se inserta en una transacción
+IMPORTAR_LOTE = 50000
+METODOS_PAGO = ["Efectivo", "Mercado Pago", "Cuenta DNI", "Fiado"]
+# Espacio de nombres de las claves de idempotencia: reimportar el mismo archivo no duplica filas
+ESPACIO_CLAVES = uuid.UUID("6f1d2c1e-5b7a-4c36-9a52-2b8e0d6f4a10")
+
+OBLIGATORIAS = {
+    "ventas": {"fecha", "monto", "metodo_pago"},
+    "egresos": {"fecha", "monto", "motivo"},
+}
+COLUMNAS = {
+    "ventas": ["sucursal", "monto", "metodo_pago", "entregado", "vuelto", "ingreso", "deuda", "fecha",
+               "cliente_fiado", "telefono_fiado", "clave_idempotencia"],
+    "egresos": ["sucursal", "motivo", "monto", "observacion", "fecha", "detalle", "clave_idempotencia"],
+}
+
+
+def leer_lotes(ruta, lote):
+    if ruta.suffix.lower() == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Para importar Parquet hace falta pyarrow (pip install -r requirements-opcional.txt)")
+        for batch in pq.ParquetFile(ruta).iter_batches(batch_size=lote):
+            yield batch.to_pandas()
+    else:
+        # Todo como texto: los números se convierten en _numero y los teléfonos quedan intactos
+        yield from pd.read_csv(ruta, chunksize=lote, dtype=str, keep_default_na=False)
+
+
+def _texto(df, columna):
+    if columna not in df:
+        return pd.Series(None, index=df.index, dtype=object)
+    serie = df[columna].astype("string").str.strip()
+    serie = serie.mask(serie == "")
+    return serie.astype(object).where(serie.notna(), None)
+
+
+def _numero(df, columna, decimal):
+    serie = df[columna]
+    if serie.dtype == object or pd.api.types.is_string_dtype(serie):
+        serie = serie.astype("string").str.strip().str.replace("$", "", regex=False)
+        if decimal == ",":
+            serie = serie.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(serie, errors="coerce").round(2)
+
+
+def _comunes(df, sucursal, dia_primero, decimal):
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    salida = pd.DataFrame(index=df.index)
+    salida["sucursal"] = _texto(df, "sucursal") if "sucursal" in df else sucursal
+    if sucursal:
+        salida["sucursal"] = salida["sucursal"].fillna(sucursal)
+    salida["monto"] = _numero(df, "monto", decimal)
+    salida["fecha"] = pd.to_datetime(df.get("fecha"), errors="coerce", dayfirst=dia_primero)
+    errores = pd.Series("", index=df.index)
+    errores = errores.mask(salida["sucursal"].isna(), "falta la sucursal")
+    errores = errores.mask(salida["fecha"].isna(), "fecha inválida")
+    errores = errores.mask(~(salida["monto"] > 0), "el monto debe ser mayor a 0")
+    return df, salida, errores
+
+
+def preparar_ventas(df, sucursal=None, dia_primero=False, decimal="."):
+    """Valida las ventas y calcula ingreso/entregado/vuelto/deuda según el método de pago,
+    igual que el formulario de venta (confirmar_venta en app.py). Devuelve (válidas, rechazadas)."""
+    df, ventas, errores = _comunes(df, sucursal, dia_primero, decimal)
+    metodo = _texto(df, "metodo_pago")
+    monto = ventas["monto"]
+    entregado_informado = _numero(df, "entregado", decimal) if "entregado" in df else monto
+    efectivo = metodo == "Efectivo"
+    digital = metodo.isin(["Mercado Pago", "Cuenta DNI"])
+    fiado = metodo == "Fiado"
+
+    ventas["metodo_pago"] = metodo
+    ventas["entregado"] = np.select([efectivo, digital], [entregado_informado.fillna(monto), monto], 0.0)
+    ventas["vuelto"] = np.where(efectivo, ventas["entregado"] - monto, 0.0).round(2)
+    ventas["ingreso"] = np.where(fiado, 0.0, monto)
+    ventas["deuda"] = np.where(fiado, monto, 0.0)
+    ventas["cliente_fiado"] = _texto(df, "cliente_fiado").where(fiado, None)
+    ventas["telefono_fiado"] = _texto(df, "telefono_fiado").where(fiado, None)
+
+    errores = errores.mask(~metodo.isin(METODOS_PAGO), "método de pago desconocido")
+    errores = errores.mask(efectivo & (ventas["entregado"] < monto), "el dinero entregado es menor al monto")
+    errores = errores.mask(fiado & ventas["cliente_fiado"].isna(), "falta el cliente de la venta fiada")
+    return _separar(df, ventas, errores)
+
+
+def preparar_egresos(df, sucursal=None, dia_primero=False, decimal="."):
+    df, egresos, errores = _comunes(df, sucursal, dia_primero, decimal)
+    egresos["motivo"] = _texto(df, "motivo")
+    egresos["observacion"] = _texto(df, "observacion")
+    egresos["detalle"] = _texto(df, "detalle")
+    errores = errores.mask(egresos["motivo"].isna(), "falta el motivo")
+    return _separar(df, egresos, errores)
+
+
+def _separar(original, preparado, errores):
+    validas = errores == ""
+    rechazadas = original[~validas].assign(error=errores[~validas])
+    return preparado[validas], rechazadas
+
+
+def copiar_lote(cur, tabla, df):
+    """COPY del lote a una tabla temporal e inserción en la tabla real; devuelve las filas nuevas."""
+    columnas = COLUMNAS[tabla]
+    temporal = f"importacion_{tabla}"
+    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {temporal} (LIKE {tabla} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+    buffer = io.StringIO()
+    df[columnas].to_csv(buffer, index=False, header=False, na_rep="\\N", date_format="%Y-%m-%d %H:%M:%S.%f")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {temporal} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    cur.execute(f"""
+        INSERT INTO {tabla} ({', '.join(columnas)})
+        SELECT {', '.join(columnas)} FROM {temporal}
+        ON CONFLICT (clave_idempotencia, fecha) DO NOTHING
+    """)
+    return cur.rowcount
+
+
+def importar(tabla, ruta, sucursal=None, lote=IMPORTAR_LOTE, dia_primero=False, decimal=".", mostrar=print):
+    """Importa un CSV o Parquet a ventas o egresos. Devuelve (insertadas, rechazadas).
+
+    Los resúmenes diarios no se actualizan fila por fila: se recalcula una vez
+    el rango de fechas importado y después se refresca resumen_mensual.
+    """
+    ruta = Path(ruta)
+    preparar = preparar_ventas if tabla == "ventas" else preparar_egresos
+    rechazos = ruta.with_name(ruta.stem + ".rechazados.csv")
+    rechazos.unlink(missing_ok=True)
+    insertadas = rechazadas = leidas = 0
+    desde = hasta = None
+
+    with conexion(escritura=True) as conn:
+        cur = conn.cursor()
+        for df in leer_lotes(ruta, lote):
+            faltantes = OBLIGATORIAS[tabla] - {str(c).strip().lower() for c in df.columns}
+            if faltantes:
+                raise SystemExit(f"❌ Faltan columnas en {ruta.name}: {', '.join(sorted(faltantes))}")
+            # Número de fila del archivo (desde 1): identifica la fila en la clave y en los rechazos
+            df.index = pd.RangeIndex(leidas + 1, leidas + 1 + len(df), name="fila")
+            leidas += len(df)
+            validas, malas = preparar(df, sucursal, dia_primero, decimal)
+            validas = validas.assign(clave_idempotencia=[
+                str(uuid.uuid5(ESPACIO_CLAVES, f"{tabla}:{ruta.name}:{fila}")) for fila in validas.index
+            ])
+            if len(malas):
+                malas.to_csv(rechazos, mode="a", header=rechazadas == 0)
+                rechazadas += len(malas)
+            if validas.empty:
+                continue
+            cur.execute("SET LOCAL caja.omitir_resumen = 'on'")
+            insertadas += copiar_lote(cur, tabla, validas)
+            conn.commit()
+            desde = min(desde or validas["fecha"].min(), validas["fecha"].min())
+            hasta = max(hasta or validas["fecha"].max(), validas["fecha"].max())
+            mostrar(f"⏳ {leidas} filas leídas, {insertadas} importadas")
+
+        if desde is not None:
+            # Los meses importados sin partición propia cayeron en la de por defecto
+            cur.execute("SELECT asegurar_particiones(%s, %s, %s)", (tabla, desde.date(), hasta.date()))
+            cur.execute("SELECT recalcular_resumenes(%s, %s)", (desde.date(), hasta.date() + pd.Timedelta(days=1)))
+        cur.execute(f"DROP TABLE IF EXISTS importacion_{tabla}")
+        conn.commit()
+    if desde is not None:
+        refrescar.refrescar_resumen_mensual()
+    if rechazadas:
+        mostrar(f"⚠️ {rechazadas} filas rechazadas guardadas en {rechazos}")
+    return insertadas, rechazadas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importación masiva de ventas o egresos desde CSV o Parquet")
+    parser.add_argument("tabla", choices=["ventas", "egresos"])
+    parser.add_argument("archivo", type=Path)
+    parser.add_argument("--sucursal", help="sucursal para las filas que no la indican")
+    parser.add_argument("--lote", type=int, default=IMPORTAR_LOTE)
+    parser.add_argument("--dia-primero", action="store_true", help="fechas como DD/MM/AAAA")
+    parser.add_argument("--decimal", default=".", help="separador decimal (con ',' el '.' se toma como separador de miles)")
+    args = parser.parse_args()
+
+    insertadas, rechazadas = importar(args.tabla, args.archivo, args.sucursal, args.lote,
+                                      args.dia_primero, args.decimal)
+    print(f"✅ Importación de {args.tabla}: {insertadas} filas nuevas, {rechazadas} rechazadas. "
+          "La app las muestra cuando vence su cache de consultas (CACHE_TTL).")
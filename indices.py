@@ -0,0 +1,97 @@
+# indices.py
+import json
+import re
+import sys
+
+import psycopg2
+
+from consultas import consultas_calientes
+from db import parametros_conexion
+
+# Los índices se crean en migraciones/0004_indices_fecha.sql; este script
+# verifica que cada consulta caliente efectivamente los use.
+TABLAS_CALIENTES = {"ventas", "egresos", "resumen_ventas_diario", "resumen_egresos_diario"}
+# ventas y egresos están particionadas por mes (migraciones/0012_particiones_mensuales.sql):
+# en el plan aparecen ventas_2025_03, ventas_fuera_de_rango, etc.
+PATRON_PARTICION = re.compile(r"^(ventas|egresos)_(\d{4}_\d{2}|fuera_de_rango)$")
+# Consultas que no filtran por fecha y por lo tanto leen todas las particiones
+SIN_RANGO_FECHA = {"empleados_ultimo_pago"}
+
+
+def _tabla(relacion):
+    coincidencia = PATRON_PARTICION.match(relacion or "")
+    return coincidencia.group(1) if coincidencia else relacion
+
+
+def _seq_scans(plan):
+    encontrados = []
+    if plan.get("Node Type") == "Seq Scan" and _tabla(plan.get("Relation Name")) in TABLAS_CALIENTES:
+        encontrados.append(_tabla(plan["Relation Name"]))
+    for hijo in plan.get("Plans", []):
+        encontrados.extend(_seq_scans(hijo))
+    return encontrados
+
+
+def _particiones_leidas(plan, leidas=None):
+    # {tabla: {particiones}} de las particiones que el plan no pudo descartar
+    leidas = {} if leidas is None else leidas
+    relacion = plan.get("Relation Name")
+    if relacion and PATRON_PARTICION.match(relacion):
+        leidas.setdefault(_tabla(relacion), set()).add(relacion)
+    for hijo in plan.get("Plans", []):
+        _particiones_leidas(hijo, leidas)
+    return leidas
+
+
+def _total_particiones(cur):
+    cur.execute("""
+        SELECT padre.relname, COUNT(*)
+        FROM pg_inherits i
+        JOIN pg_class padre ON padre.oid = i.inhparent
+        WHERE padre.relname IN ('ventas', 'egresos') AND pg_table_is_visible(padre.oid)
+        GROUP BY padre.relname
+    """)
+    return dict(cur.fetchall())
+
+
+def verificar_consultas(conn):
+    """Corre EXPLAIN sobre cada consulta caliente y devuelve las que leen una tabla caliente completa.
+
+    También falla si una consulta con rango de fechas lee todas las particiones
+    de ventas o egresos, es decir, si el planner no pudo podar ninguna.
+    """
+    cur = conn.cursor()
+    totales = _total_particiones(cur)
+    # Con enable_seqscan apagado el planner solo elige un Seq Scan si no existe
+    # ningún índice utilizable, así la verificación no depende del tamaño de la tabla.
+    cur.execute("SET enable_seqscan = off")
+    fallidas = {}
+    for nombre, (sql, parametros) in consultas_calientes().items():
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, parametros)
+        plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        tablas = _seq_scans(plan[0]["Plan"])
+        leidas = _particiones_leidas(plan[0]["Plan"])
+        detalle = "".join(f" · {len(particiones)}/{totales.get(tabla, 0)} particiones de {tabla}"
+                          for tabla, particiones in sorted(leidas.items()))
+        sin_poda = [tabla for tabla, particiones in leidas.items()
+                    if nombre not in SIN_RANGO_FECHA and 1 < totales.get(tabla, 0) <= len(particiones)]
+        if tablas:
+            fallidas[nombre] = tablas
+            print(f"❌ {nombre}: Seq Scan sobre {', '.join(sorted(set(tablas)))}")
+        elif sin_poda:
+            fallidas[nombre] = sin_poda
+            print(f"❌ {nombre}: lee todas las particiones de {', '.join(sorted(sin_poda))}")
+        else:
+            print(f"✅ {nombre}: usa índices{detalle}")
+    conn.rollback()
+    return fallidas
+
+
+if __name__ == "__main__":
+    conn = psycopg2.connect(**parametros_conexion())
+    try:
+        sys.exit(1 if verificar_consultas(conn) else 0)
+    finally:
+        conn.close()
@@ -0,0 +1,24 @@
+-- Tablas originales de ventas y egresos
+CREATE TABLE IF NOT EXISTS ventas (
+    id SERIAL PRIMARY KEY,
+    sucursal VARCHAR(50) NOT NULL,
+    monto DECIMAL(12,2) NOT NULL,
+    metodo_pago VARCHAR(30) NOT NULL,
+    entregado DECIMAL(12,2) DEFAULT 0,
+    vuelto DECIMAL(12,2) DEFAULT 0,
+    ingreso DECIMAL(12,2) DEFAULT 0,
+    deuda DECIMAL(12,2) DEFAULT 0,
+    fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    cliente_fiado VARCHAR(100),
+    telefono_fiado VARCHAR(30)
+);
+
+CREATE TABLE IF NOT EXISTS egresos (
+    id SERIAL PRIMARY KEY,
+    sucursal VARCHAR(50) NOT NULL,
+    motivo VARCHAR(50) NOT NULL,
+    monto DECIMAL(12,2) NOT NULL,
+    observacion TEXT,
+    fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    detalle VARCHAR(200)
+);
@@ -0,0 +1,9 @@
+-- Antes se creaba en cada rerun desde crear_tabla_empleados()
+CREATE TABLE IF NOT EXISTS empleados (
+    id SERIAL PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL,
+    sucursal VARCHAR(50) NOT NULL,
+    sueldo_base DECIMAL(10,2) NOT NULL,
+    activo BOOLEAN DEFAULT TRUE,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
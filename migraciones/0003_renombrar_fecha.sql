@@ -0,0 +1,12 @@
+-- Antes init_fix.py: renombrar la columna "fecha " (con espacio) de ventas
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'ventas'
+        AND column_name = 'fecha '
+    ) THEN
+        ALTER TABLE ventas RENAME COLUMN "fecha " TO fecha;
+    END IF;
+END $$;
@@ -0,0 +1,7 @@
+-- migrar: sin transaccion
+-- Índices para los filtros por rango de fecha del Dashboard y del Cierre de caja
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_fecha ON ventas (fecha);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_sucursal_fecha ON ventas (sucursal, fecha);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_cierre ON ventas (sucursal, fecha) WHERE metodo_pago = 'Cierre';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_egresos_fecha ON egresos (fecha);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_egresos_sucursal_fecha ON egresos (sucursal, fecha);
@@ -0,0 +1,137 @@
+-- Resúmenes diarios de ventas y egresos que alimentan el Dashboard.
+-- Se mantienen con triggers por sentencia en la misma transacción de cada escritura.
+CREATE TABLE IF NOT EXISTS resumen_ventas_diario (
+    dia DATE NOT NULL,
+    sucursal VARCHAR(50) NOT NULL,
+    metodo_pago VARCHAR(30) NOT NULL,
+    cantidad INTEGER NOT NULL DEFAULT 0,
+    monto DECIMAL(14,2) NOT NULL DEFAULT 0,
+    ingreso DECIMAL(14,2) NOT NULL DEFAULT 0,
+    deuda DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, sucursal, metodo_pago)
+);
+
+CREATE TABLE IF NOT EXISTS resumen_egresos_diario (
+    dia DATE NOT NULL,
+    sucursal VARCHAR(50) NOT NULL,
+    motivo VARCHAR(50) NOT NULL,
+    cantidad INTEGER NOT NULL DEFAULT 0,
+    monto DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, sucursal, motivo)
+);
+
+-- Suma (signo = 1) o resta (signo = -1) un conjunto de filas de ventas al resumen.
+-- Las cargas masivas pueden poner caja.omitir_resumen = 'on' y recalcular al final.
+CREATE OR REPLACE FUNCTION acumular_resumen_ventas() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('caja.omitir_resumen', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO resumen_ventas_diario AS r (dia, sucursal, metodo_pago, cantidad, monto, ingreso, deuda)
+        SELECT fecha::DATE, sucursal, COALESCE(metodo_pago, 'Sin especificar'),
+               -COUNT(*), -SUM(COALESCE(monto, 0)), -SUM(COALESCE(ingreso, 0)), -SUM(COALESCE(deuda, 0))
+        FROM viejas
+        GROUP BY 1, 2, 3
+        ON CONFLICT (dia, sucursal, metodo_pago) DO UPDATE SET
+            cantidad = r.cantidad + EXCLUDED.cantidad,
+            monto = r.monto + EXCLUDED.monto,
+            ingreso = r.ingreso + EXCLUDED.ingreso,
+            deuda = r.deuda + EXCLUDED.deuda;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO resumen_ventas_diario AS r (dia, sucursal, metodo_pago, cantidad, monto, ingreso, deuda)
+        SELECT fecha::DATE, sucursal, COALESCE(metodo_pago, 'Sin especificar'),
+               COUNT(*), SUM(COALESCE(monto, 0)), SUM(COALESCE(ingreso, 0)), SUM(COALESCE(deuda, 0))
+        FROM nuevas
+        GROUP BY 1, 2, 3
+        ON CONFLICT (dia, sucursal, metodo_pago) DO UPDATE SET
+            cantidad = r.cantidad + EXCLUDED.cantidad,
+            monto = r.monto + EXCLUDED.monto,
+            ingreso = r.ingreso + EXCLUDED.ingreso,
+            deuda = r.deuda + EXCLUDED.deuda;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION acumular_resumen_egresos() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('caja.omitir_resumen', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO resumen_egresos_diario AS r (dia, sucursal, motivo, cantidad, monto)
+        SELECT fecha::DATE, sucursal, motivo, -COUNT(*), -SUM(COALESCE(monto, 0))
+        FROM viejas
+        GROUP BY 1, 2, 3
+        ON CONFLICT (dia, sucursal, motivo) DO UPDATE SET
+            cantidad = r.cantidad + EXCLUDED.cantidad,
+            monto = r.monto + EXCLUDED.monto;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO resumen_egresos_diario AS r (dia, sucursal, motivo, cantidad, monto)
+        SELECT fecha::DATE, sucursal, motivo, COUNT(*), SUM(COALESCE(monto, 0))
+        FROM nuevas
+        GROUP BY 1, 2, 3
+        ON CONFLICT (dia, sucursal, motivo) DO UPDATE SET
+            cantidad = r.cantidad + EXCLUDED.cantidad,
+            monto = r.monto + EXCLUDED.monto;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumen_ventas_insert ON ventas;
+DROP TRIGGER IF EXISTS trg_resumen_ventas_update ON ventas;
+DROP TRIGGER IF EXISTS trg_resumen_ventas_delete ON ventas;
+CREATE TRIGGER trg_resumen_ventas_insert AFTER INSERT ON ventas
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_ventas();
+CREATE TRIGGER trg_resumen_ventas_update AFTER UPDATE ON ventas
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_ventas();
+CREATE TRIGGER trg_resumen_ventas_delete AFTER DELETE ON ventas
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_ventas();
+
+DROP TRIGGER IF EXISTS trg_resumen_egresos_insert ON egresos;
+DROP TRIGGER IF EXISTS trg_resumen_egresos_update ON egresos;
+DROP TRIGGER IF EXISTS trg_resumen_egresos_delete ON egresos;
+CREATE TRIGGER trg_resumen_egresos_insert AFTER INSERT ON egresos
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_egresos();
+CREATE TRIGGER trg_resumen_egresos_update AFTER UPDATE ON egresos
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_egresos();
+CREATE TRIGGER trg_resumen_egresos_delete AFTER DELETE ON egresos
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_egresos();
+
+-- Reconstruye los resúmenes de los días en [desde, hasta) a partir de las filas crudas
+CREATE OR REPLACE FUNCTION recalcular_resumenes(desde DATE, hasta DATE) RETURNS void AS $$
+BEGIN
+    DELETE FROM resumen_ventas_diario WHERE dia >= desde AND dia < hasta;
+    INSERT INTO resumen_ventas_diario (dia, sucursal, metodo_pago, cantidad, monto, ingreso, deuda)
+    SELECT fecha::DATE, sucursal, COALESCE(metodo_pago, 'Sin especificar'),
+           COUNT(*), SUM(COALESCE(monto, 0)), SUM(COALESCE(ingreso, 0)), SUM(COALESCE(deuda, 0))
+    FROM ventas
+    WHERE fecha >= desde AND fecha < hasta
+    GROUP BY 1, 2, 3;
+
+    DELETE FROM resumen_egresos_diario WHERE dia >= desde AND dia < hasta;
+    INSERT INTO resumen_egresos_diario (dia, sucursal, motivo, cantidad, monto)
+    SELECT fecha::DATE, sucursal, motivo, COUNT(*), SUM(COALESCE(monto, 0))
+    FROM egresos
+    WHERE fecha >= desde AND fecha < hasta
+    GROUP BY 1, 2, 3;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT recalcular_resumenes('-infinity', 'infinity');
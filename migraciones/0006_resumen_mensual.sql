@@ -0,0 +1,61 @@
+-- Serie mensual materializada (mes x sucursal) de los meses ya cerrados.
+-- El mes abierto se sigue leyendo de resumen_ventas_diario.
+CREATE MATERIALIZED VIEW IF NOT EXISTS resumen_mensual AS
+SELECT
+    DATE_TRUNC('month', dia)::DATE as mes,
+    sucursal,
+    SUM(cantidad)::BIGINT as cantidad,
+    SUM(monto) as monto,
+    SUM(ingreso) as ingreso,
+    SUM(deuda) as deuda,
+    COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago = 'Efectivo'), 0) as efectivo,
+    COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago IN ('Mercado Pago', 'Cuenta DNI')), 0) as digital
+FROM resumen_ventas_diario
+WHERE metodo_pago != 'Cierre'
+AND dia < DATE_TRUNC('month', CURRENT_DATE)
+GROUP BY 1, 2;
+
+-- Requerido por REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_resumen_mensual_mes_sucursal ON resumen_mensual (mes, sucursal);
+
+-- Último refresco de cada vista materializada. hasta_mes es el primer mes que
+-- la vista todavía no incluye; pendiente se marca si se escribe antes de ese mes.
+CREATE TABLE IF NOT EXISTS refrescos_materializados (
+    vista VARCHAR(100) PRIMARY KEY,
+    refrescada_en TIMESTAMP NOT NULL,
+    hasta_mes DATE NOT NULL,
+    pendiente BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+INSERT INTO refrescos_materializados (vista, refrescada_en, hasta_mes)
+VALUES ('resumen_mensual', CURRENT_TIMESTAMP, DATE_TRUNC('month', CURRENT_DATE)::DATE)
+ON CONFLICT (vista) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION marcar_resumen_mensual_pendiente() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE refrescos_materializados r SET pendiente = TRUE
+        WHERE r.vista = 'resumen_mensual' AND NOT r.pendiente
+        AND EXISTS (SELECT 1 FROM viejas WHERE fecha < r.hasta_mes);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE refrescos_materializados r SET pendiente = TRUE
+        WHERE r.vista = 'resumen_mensual' AND NOT r.pendiente
+        AND EXISTS (SELECT 1 FROM nuevas WHERE fecha < r.hasta_mes);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumen_mensual_insert ON ventas;
+DROP TRIGGER IF EXISTS trg_resumen_mensual_update ON ventas;
+DROP TRIGGER IF EXISTS trg_resumen_mensual_delete ON ventas;
+CREATE TRIGGER trg_resumen_mensual_insert AFTER INSERT ON ventas
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION marcar_resumen_mensual_pendiente();
+CREATE TRIGGER trg_resumen_mensual_update AFTER UPDATE ON ventas
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION marcar_resumen_mensual_pendiente();
+CREATE TRIGGER trg_resumen_mensual_delete AFTER DELETE ON ventas
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION marcar_resumen_mensual_pendiente();
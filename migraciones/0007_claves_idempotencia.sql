@@ -0,0 +1,5 @@
+-- Clave única por operación para que el diario local pueda reenviar sin duplicar
+ALTER TABLE ventas ADD COLUMN IF NOT EXISTS clave_idempotencia UUID;
+ALTER TABLE egresos ADD COLUMN IF NOT EXISTS clave_idempotencia UUID;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ventas_clave_idempotencia ON ventas (clave_idempotencia);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_egresos_clave_idempotencia ON egresos (clave_idempotencia);
@@ -0,0 +1,19 @@
+-- Corridas de sueldos: cada pago de sueldos queda agrupado en una corrida y
+-- cada empleado se puede pagar una sola vez por período
+CREATE TABLE IF NOT EXISTS corridas_sueldo (
+    id SERIAL PRIMARY KEY,
+    sucursal VARCHAR(50) NOT NULL,
+    periodo DATE NOT NULL,
+    observacion TEXT,
+    creada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS pagos_sueldo (
+    corrida_id INTEGER NOT NULL REFERENCES corridas_sueldo (id),
+    empleado_id INTEGER NOT NULL REFERENCES empleados (id),
+    periodo DATE NOT NULL,
+    monto DECIMAL(12,2) NOT NULL,
+    PRIMARY KEY (empleado_id, periodo)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pagos_sueldo_corrida ON pagos_sueldo (corrida_id);
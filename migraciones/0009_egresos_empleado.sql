@@ -0,0 +1,19 @@
+-- Los sueldos se vinculan al empleado por id y no por el texto de detalle
+ALTER TABLE egresos ADD COLUMN IF NOT EXISTS empleado_id INTEGER REFERENCES empleados (id);
+
+-- Sueldos históricos: 'Sueldo de <nombre>' del mismo empleado en la misma
+-- sucursal. Si dos empleados de la sucursal comparten el nombre el pago es
+-- ambiguo y queda sin vincular.
+UPDATE egresos e
+SET empleado_id = emp.id
+FROM empleados emp
+WHERE e.motivo = 'Sueldos'
+AND e.empleado_id IS NULL
+AND e.sucursal = emp.sucursal
+AND e.detalle = CONCAT('Sueldo de ', emp.nombre)
+AND NOT EXISTS (
+    SELECT 1 FROM empleados otro
+    WHERE otro.sucursal = emp.sucursal
+    AND otro.nombre = emp.nombre
+    AND otro.id <> emp.id
+);
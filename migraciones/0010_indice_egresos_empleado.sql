@@ -0,0 +1,3 @@
+-- migrar: sin transaccion
+-- Último pago de cada empleado con una sola lectura del índice (LATERAL ... LIMIT 1)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_egresos_empleado_fecha ON egresos (empleado_id, fecha DESC);
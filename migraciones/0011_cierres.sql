@@ -0,0 +1,91 @@
+-- Los cierres de caja dejan de guardarse como ventas con metodo_pago = 'Cierre'.
+-- Cada cierre cierra un turno: cubre [desde, hasta) y el siguiente turno del
+-- día arranca en el hasta del anterior.
+CREATE TABLE IF NOT EXISTS cierres (
+    id SERIAL PRIMARY KEY,
+    sucursal VARCHAR(50) NOT NULL,
+    fecha DATE NOT NULL,
+    turno SMALLINT NOT NULL,
+    desde TIMESTAMP NOT NULL,
+    hasta TIMESTAMP NOT NULL,
+    efectivo DECIMAL(12,2) NOT NULL DEFAULT 0,
+    digital DECIMAL(12,2) NOT NULL DEFAULT 0,
+    fiado DECIMAL(12,2) NOT NULL DEFAULT 0,
+    egresos DECIMAL(12,2) NOT NULL DEFAULT 0,
+    teorico DECIMAL(12,2) NOT NULL,
+    contado DECIMAL(12,2) NOT NULL,
+    diferencia DECIMAL(12,2) NOT NULL,
+    observaciones TEXT,
+    registrado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (sucursal, fecha, turno)
+);
+
+-- Cierres existentes: cada uno cerraba el día completo (monto = contado,
+-- ingreso = diferencia). Los totales del día se recalculan de ventas y egresos.
+INSERT INTO cierres (sucursal, fecha, turno, desde, hasta, efectivo, digital, fiado, egresos,
+                     teorico, contado, diferencia, registrado_en)
+SELECT
+    c.sucursal,
+    c.fecha::DATE,
+    ROW_NUMBER() OVER (PARTITION BY c.sucursal, c.fecha::DATE ORDER BY c.id),
+    c.fecha::DATE,
+    c.fecha::DATE + 1,
+    COALESCE(v.efectivo, 0),
+    COALESCE(v.digital, 0),
+    COALESCE(v.fiado, 0),
+    COALESCE(e.egresos, 0),
+    c.monto - c.ingreso,
+    c.monto,
+    c.ingreso,
+    c.fecha
+FROM ventas c
+LEFT JOIN LATERAL (
+    SELECT
+        SUM(ingreso) FILTER (WHERE metodo_pago = 'Efectivo') as efectivo,
+        SUM(ingreso) FILTER (WHERE metodo_pago IN ('Mercado Pago', 'Cuenta DNI')) as digital,
+        SUM(monto) FILTER (WHERE metodo_pago = 'Fiado') as fiado
+    FROM ventas v
+    WHERE v.sucursal = c.sucursal
+    AND v.fecha >= c.fecha::DATE AND v.fecha < c.fecha::DATE + 1
+    AND v.metodo_pago != 'Cierre'
+) v ON TRUE
+LEFT JOIN LATERAL (
+    SELECT SUM(monto) as egresos
+    FROM egresos e
+    WHERE e.sucursal = c.sucursal
+    AND e.fecha >= c.fecha::DATE AND e.fecha < c.fecha::DATE + 1
+) e ON TRUE
+WHERE c.metodo_pago = 'Cierre'
+ON CONFLICT (sucursal, fecha, turno) DO NOTHING;
+
+-- Los triggers de 0005 descuentan los cierres borrados de resumen_ventas_diario;
+-- las filas 'Cierre' que quedan en cero se eliminan
+DELETE FROM ventas WHERE metodo_pago = 'Cierre';
+DELETE FROM resumen_ventas_diario WHERE metodo_pago = 'Cierre';
+DROP INDEX IF EXISTS idx_ventas_cierre;
+ALTER TABLE ventas DROP CONSTRAINT IF EXISTS ventas_metodo_pago_no_cierre;
+ALTER TABLE ventas ADD CONSTRAINT ventas_metodo_pago_no_cierre CHECK (metodo_pago != 'Cierre');
+
+-- resumen_mensual ya no necesita excluir los cierres
+DROP MATERIALIZED VIEW IF EXISTS resumen_mensual;
+CREATE MATERIALIZED VIEW resumen_mensual AS
+SELECT
+    DATE_TRUNC('month', dia)::DATE as mes,
+    sucursal,
+    SUM(cantidad)::BIGINT as cantidad,
+    SUM(monto) as monto,
+    SUM(ingreso) as ingreso,
+    SUM(deuda) as deuda,
+    COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago = 'Efectivo'), 0) as efectivo,
+    COALESCE(SUM(ingreso) FILTER (WHERE metodo_pago IN ('Mercado Pago', 'Cuenta DNI')), 0) as digital
+FROM resumen_ventas_diario
+WHERE dia < DATE_TRUNC('month', CURRENT_DATE)
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_resumen_mensual_mes_sucursal ON resumen_mensual (mes, sucursal);
+
+UPDATE refrescos_materializados
+SET refrescada_en = CURRENT_TIMESTAMP,
+    hasta_mes = DATE_TRUNC('month', CURRENT_DATE)::DATE,
+    pendiente = FALSE
+WHERE vista = 'resumen_mensual';
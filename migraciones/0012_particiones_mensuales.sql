@@ -0,0 +1,158 @@
+-- ventas y egresos pasan a estar particionadas por mes sobre fecha. Las vistas
+-- casi siempre leen un día o un mes, así cada consulta, índice y VACUUM
+-- trabaja solo con las particiones de ese período.
+--
+-- Toda clave única de una tabla particionada debe incluir la columna de
+-- partición: la clave primaria pasa a ser (id, fecha) y la de idempotencia
+-- (clave_idempotencia, fecha). Las filas de un mes sin partición caen en
+-- <tabla>_fuera_de_rango hasta que particiones.py cree ese mes.
+--
+-- TIEMPO SIN SERVICIO: todo corre en la transacción de la migración. El
+-- RENAME toma ACCESS EXCLUSIVE sobre ventas y egresos y lo mantiene hasta el
+-- COMMIT, después de copiar todas las filas (INSERT ... SELECT *) y de crear
+-- los índices. Mientras tanto toda lectura o escritura de esas tablas espera:
+-- en las instancias ya abiertas el Dashboard y el Cierre de caja quedan
+-- colgados y las ventas se acumulan en el diario local; una instancia que
+-- arranca no atiende hasta que preparar_esquema() termina de migrar. La
+-- demora crece con el tamaño de las tablas: medirla antes sobre una copia
+-- restaurada de la base y correr python migrar.py fuera del horario de atención.
+
+-- Crea la partición del mes de ``mes`` si no existe. Si la partición por
+-- defecto ya tiene filas de ese mes, se mueven a la nueva antes de adjuntarla.
+-- Las escrituras directas sobre las particiones no disparan los triggers de
+-- resumen de la tabla padre, así que los resúmenes no cambian.
+CREATE OR REPLACE FUNCTION crear_particion_mensual(tabla TEXT, mes DATE) RETURNS BOOLEAN AS $$
+DECLARE
+    desde DATE := DATE_TRUNC('month', mes)::DATE;
+    hasta DATE := (DATE_TRUNC('month', mes) + INTERVAL '1 month')::DATE;
+    particion TEXT := FORMAT('%s_%s', tabla, TO_CHAR(desde, 'YYYY_MM'));
+    defecto TEXT := tabla || '_fuera_de_rango';
+BEGIN
+    IF TO_REGCLASS(particion) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE FORMAT('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', particion, tabla);
+    IF TO_REGCLASS(defecto) IS NOT NULL THEN
+        EXECUTE FORMAT(
+            'WITH movidas AS (DELETE FROM %I WHERE fecha >= %L AND fecha < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM movidas',
+            defecto, desde, hasta, particion
+        );
+    END IF;
+    EXECUTE FORMAT('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', tabla, particion, desde, hasta);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Crea las particiones de todos los meses entre desde y hasta (inclusive);
+-- devuelve cuántas eran nuevas
+CREATE OR REPLACE FUNCTION asegurar_particiones(tabla TEXT, desde DATE, hasta DATE) RETURNS INTEGER AS $$
+DECLARE
+    mes DATE := DATE_TRUNC('month', desde)::DATE;
+    creadas INTEGER := 0;
+BEGIN
+    WHILE mes <= hasta LOOP
+        IF crear_particion_mensual(tabla, mes) THEN
+            creadas := creadas + 1;
+        END IF;
+        mes := (mes + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN creadas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Particiones mensuales adjuntas de ventas y egresos (sin la de por defecto)
+CREATE OR REPLACE VIEW particiones_mensuales AS
+SELECT
+    padre.relname::TEXT as tabla,
+    hija.relname::TEXT as particion,
+    TO_DATE(RIGHT(hija.relname, 7), 'YYYY_MM') as mes,
+    GREATEST(hija.reltuples, 0)::BIGINT as filas_estimadas,
+    pg_total_relation_size(hija.oid) as bytes
+FROM pg_inherits i
+JOIN pg_class padre ON padre.oid = i.inhparent
+JOIN pg_class hija ON hija.oid = i.inhrelid
+WHERE padre.relname IN ('ventas', 'egresos')
+AND pg_table_is_visible(padre.oid)
+AND hija.relname ~ '_\d{4}_\d{2}$';
+
+-- ---------- VENTAS ----------
+-- La tabla nueva copia columnas, defaults y CHECK de la actual y reutiliza su secuencia
+ALTER TABLE ventas RENAME TO ventas_sin_particionar;
+ALTER SEQUENCE ventas_id_seq OWNED BY NONE;
+CREATE TABLE ventas (LIKE ventas_sin_particionar INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (fecha);
+ALTER TABLE ventas ALTER COLUMN fecha SET NOT NULL;
+ALTER SEQUENCE ventas_id_seq OWNED BY ventas.id;
+CREATE TABLE ventas_fuera_de_rango PARTITION OF ventas DEFAULT;
+SELECT asegurar_particiones(
+    'ventas',
+    COALESCE((SELECT MIN(fecha) FROM ventas_sin_particionar)::DATE, CURRENT_DATE),
+    (CURRENT_DATE + INTERVAL '3 months')::DATE
+);
+
+-- Los triggers de resumen se crean después de copiar: las filas ya están en los resúmenes
+INSERT INTO ventas SELECT * FROM ventas_sin_particionar;
+DROP TABLE ventas_sin_particionar;
+
+ALTER TABLE ventas ADD CONSTRAINT ventas_pkey PRIMARY KEY (id, fecha);
+CREATE UNIQUE INDEX idx_ventas_clave_idempotencia ON ventas (clave_idempotencia, fecha);
+CREATE INDEX idx_ventas_fecha ON ventas (fecha);
+CREATE INDEX idx_ventas_sucursal_fecha ON ventas (sucursal, fecha);
+
+CREATE TRIGGER trg_resumen_ventas_insert AFTER INSERT ON ventas
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_ventas();
+CREATE TRIGGER trg_resumen_ventas_update AFTER UPDATE ON ventas
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_ventas();
+CREATE TRIGGER trg_resumen_ventas_delete AFTER DELETE ON ventas
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_ventas();
+CREATE TRIGGER trg_resumen_mensual_insert AFTER INSERT ON ventas
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION marcar_resumen_mensual_pendiente();
+CREATE TRIGGER trg_resumen_mensual_update AFTER UPDATE ON ventas
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION marcar_resumen_mensual_pendiente();
+CREATE TRIGGER trg_resumen_mensual_delete AFTER DELETE ON ventas
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION marcar_resumen_mensual_pendiente();
+
+-- ---------- EGRESOS ----------
+ALTER TABLE egresos RENAME TO egresos_sin_particionar;
+ALTER SEQUENCE egresos_id_seq OWNED BY NONE;
+CREATE TABLE egresos (LIKE egresos_sin_particionar INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (fecha);
+ALTER TABLE egresos ALTER COLUMN fecha SET NOT NULL;
+ALTER SEQUENCE egresos_id_seq OWNED BY egresos.id;
+CREATE TABLE egresos_fuera_de_rango PARTITION OF egresos DEFAULT;
+SELECT asegurar_particiones(
+    'egresos',
+    COALESCE((SELECT MIN(fecha) FROM egresos_sin_particionar)::DATE, CURRENT_DATE),
+    (CURRENT_DATE + INTERVAL '3 months')::DATE
+);
+
+INSERT INTO egresos SELECT * FROM egresos_sin_particionar;
+DROP TABLE egresos_sin_particionar;
+
+ALTER TABLE egresos ADD CONSTRAINT egresos_pkey PRIMARY KEY (id, fecha);
+ALTER TABLE egresos ADD CONSTRAINT egresos_empleado_id_fkey FOREIGN KEY (empleado_id) REFERENCES empleados (id);
+CREATE UNIQUE INDEX idx_egresos_clave_idempotencia ON egresos (clave_idempotencia, fecha);
+CREATE INDEX idx_egresos_fecha ON egresos (fecha);
+CREATE INDEX idx_egresos_sucursal_fecha ON egresos (sucursal, fecha);
+CREATE INDEX idx_egresos_empleado_fecha ON egresos (empleado_id, fecha DESC);
+
+CREATE TRIGGER trg_resumen_egresos_insert AFTER INSERT ON egresos
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_egresos();
+CREATE TRIGGER trg_resumen_egresos_update AFTER UPDATE ON egresos
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_egresos();
+CREATE TRIGGER trg_resumen_egresos_delete AFTER DELETE ON egresos
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_resumen_egresos();
+
+ANALYZE ventas;
+ANALYZE egresos;
@@ -0,0 +1,39 @@
+-- Meses de ventas y egresos archivados en Parquet por archivar.py. Sus filas
+-- ya no están en Postgres (la partición del mes se borra), pero sus totales
+-- siguen en los resúmenes diarios y exportar.py las lee del archivo.
+CREATE TABLE IF NOT EXISTS meses_archivados (
+    tabla VARCHAR(20) NOT NULL,
+    mes DATE NOT NULL,
+    archivo TEXT NOT NULL,
+    filas BIGINT NOT NULL,
+    monto DECIMAL(16,2) NOT NULL,
+    archivado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tabla, mes)
+);
+
+-- Igual que en 0005, pero sin tocar los días de meses archivados: sin sus
+-- filas crudas, recalcularlos los dejaría en cero
+CREATE OR REPLACE FUNCTION recalcular_resumenes(desde DATE, hasta DATE) RETURNS void AS $$
+BEGIN
+    DELETE FROM resumen_ventas_diario
+    WHERE dia >= desde AND dia < hasta
+    AND DATE_TRUNC('month', dia)::DATE NOT IN (SELECT mes FROM meses_archivados WHERE tabla = 'ventas');
+    INSERT INTO resumen_ventas_diario (dia, sucursal, metodo_pago, cantidad, monto, ingreso, deuda)
+    SELECT fecha::DATE, sucursal, COALESCE(metodo_pago, 'Sin especificar'),
+           COUNT(*), SUM(COALESCE(monto, 0)), SUM(COALESCE(ingreso, 0)), SUM(COALESCE(deuda, 0))
+    FROM ventas
+    WHERE fecha >= desde AND fecha < hasta
+    AND DATE_TRUNC('month', fecha)::DATE NOT IN (SELECT mes FROM meses_archivados WHERE tabla = 'ventas')
+    GROUP BY 1, 2, 3;
+
+    DELETE FROM resumen_egresos_diario
+    WHERE dia >= desde AND dia < hasta
+    AND DATE_TRUNC('month', dia)::DATE NOT IN (SELECT mes FROM meses_archivados WHERE tabla = 'egresos');
+    INSERT INTO resumen_egresos_diario (dia, sucursal, motivo, cantidad, monto)
+    SELECT fecha::DATE, sucursal, motivo, COUNT(*), SUM(COALESCE(monto, 0))
+    FROM egresos
+    WHERE fecha >= desde AND fecha < hasta
+    AND DATE_TRUNC('month', fecha)::DATE NOT IN (SELECT mes FROM meses_archivados WHERE tabla = 'egresos')
+    GROUP BY 1, 2, 3;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,24 @@
+-- Registro de sucursales: el login, las cards del Dashboard y la exportación
+-- las leen de esta tabla (ver sucursales.py) en lugar de una lista fija.
+-- Una sucursal dada de baja deja de ofrecerse, pero su historia sigue en
+-- ventas y egresos con el mismo nombre.
+CREATE TABLE IF NOT EXISTS sucursales (
+    id SERIAL PRIMARY KEY,
+    nombre VARCHAR(50) NOT NULL UNIQUE,
+    activa BOOLEAN NOT NULL DEFAULT TRUE,
+    creada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Las dos sucursales que estaban fijas en la app y cualquier otra que ya tenga movimientos
+INSERT INTO sucursales (nombre)
+SELECT nombre FROM (
+    VALUES ('Sucursal Centro'), ('Sucursal Norte')
+) AS fijas (nombre)
+UNION
+SELECT sucursal FROM resumen_ventas_diario
+UNION
+SELECT sucursal FROM resumen_egresos_diario
+UNION
+SELECT sucursal FROM empleados
+ORDER BY 1
+ON CONFLICT (nombre) DO NOTHING;
@@ -0,0 +1,174 @@
+-- Cuentas corrientes de los clientes que compran fiado. Cada venta fiada y
+-- cada cobro es un movimiento en movimientos_cliente; el saldo de cada
+-- cliente y su deuda abierta por día se mantienen con triggers en la misma
+-- transacción que la venta o el cobro. "Quién debe cuánto" y la antigüedad
+-- de la deuda se leen de unas pocas filas por cliente, sin recorrer ventas.
+
+-- Nombre para comparar clientes: minúsculas, sin acentos y con los espacios colapsados
+CREATE OR REPLACE FUNCTION normalizar_nombre(nombre TEXT) RETURNS TEXT AS $$
+    SELECT BTRIM(REGEXP_REPLACE(TRANSLATE(LOWER(nombre), 'áéíóúüàèìòùñ', 'aeiouuaeioun'), '\s+', ' ', 'g'))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE TABLE IF NOT EXISTS clientes (
+    id SERIAL PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL,
+    nombre_normalizado TEXT GENERATED ALWAYS AS (normalizar_nombre(nombre)) STORED UNIQUE,
+    telefono VARCHAR(30),
+    saldo DECIMAL(14,2) NOT NULL DEFAULT 0,
+    ultimo_movimiento TIMESTAMP,
+    creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- monto positivo aumenta la deuda (fiado) y negativo la reduce (cobro)
+CREATE TABLE IF NOT EXISTS movimientos_cliente (
+    id BIGSERIAL PRIMARY KEY,
+    cliente_id INTEGER NOT NULL REFERENCES clientes (id),
+    fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    tipo VARCHAR(10) NOT NULL CHECK (tipo IN ('fiado', 'cobro')),
+    monto DECIMAL(12,2) NOT NULL,
+    sucursal VARCHAR(50),
+    metodo_pago VARCHAR(30),
+    venta_id INTEGER,
+    clave_idempotencia UUID UNIQUE,
+    CONSTRAINT movimientos_cliente_signo CHECK ((tipo = 'fiado' AND monto > 0) OR (tipo = 'cobro' AND monto < 0))
+);
+
+CREATE INDEX IF NOT EXISTS idx_movimientos_cliente_cliente_fecha ON movimientos_cliente (cliente_id, fecha);
+
+-- Deuda impaga de cada cliente por día de compra. Los cobros cancelan primero
+-- lo más viejo, así la suma por cliente es siempre GREATEST(saldo, 0) y el día
+-- más viejo con deuda da su antigüedad.
+CREATE TABLE IF NOT EXISTS deudas_abiertas (
+    cliente_id INTEGER NOT NULL REFERENCES clientes (id),
+    dia DATE NOT NULL,
+    pendiente DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (cliente_id, dia)
+);
+
+-- Recorta la deuda abierta de los clientes ``ids`` para que sume GREATEST(saldo, 0):
+-- se conservan los días más nuevos y se descuenta desde el más viejo
+CREATE OR REPLACE FUNCTION ajustar_deudas_abiertas(ids INTEGER[]) RETURNS void AS $$
+BEGIN
+    UPDATE deudas_abiertas d
+    SET pendiente = GREATEST(a.cubierto, 0)
+    FROM (
+        SELECT
+            d.cliente_id,
+            d.dia,
+            d.pendiente,
+            -- Parte del saldo que queda para este día después de los días más nuevos
+            GREATEST(c.saldo, 0) - SUM(d.pendiente) OVER (PARTITION BY d.cliente_id ORDER BY d.dia DESC)
+                + d.pendiente as cubierto
+        FROM deudas_abiertas d
+        JOIN clientes c ON c.id = d.cliente_id
+        WHERE d.cliente_id = ANY(ids)
+    ) a
+    WHERE d.cliente_id = a.cliente_id AND d.dia = a.dia
+    AND a.cubierto < a.pendiente;
+
+    DELETE FROM deudas_abiertas WHERE cliente_id = ANY(ids) AND pendiente <= 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION acumular_cuentas_clientes() RETURNS trigger AS $$
+BEGIN
+    UPDATE clientes c
+    SET saldo = c.saldo + m.monto,
+        ultimo_movimiento = GREATEST(c.ultimo_movimiento, m.fecha)
+    FROM (
+        SELECT cliente_id, SUM(monto) as monto, MAX(fecha) as fecha
+        FROM nuevos
+        GROUP BY 1
+    ) m
+    WHERE c.id = m.cliente_id;
+
+    INSERT INTO deudas_abiertas AS d (cliente_id, dia, pendiente)
+    SELECT cliente_id, fecha::DATE, SUM(monto)
+    FROM nuevos
+    WHERE monto > 0
+    GROUP BY 1, 2
+    ON CONFLICT (cliente_id, dia) DO UPDATE SET pendiente = d.pendiente + EXCLUDED.pendiente;
+
+    PERFORM ajustar_deudas_abiertas(ARRAY(SELECT DISTINCT cliente_id FROM nuevos));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cuentas_clientes_insert ON movimientos_cliente;
+CREATE TRIGGER trg_cuentas_clientes_insert AFTER INSERT ON movimientos_cliente
+    REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION acumular_cuentas_clientes();
+
+-- Cada venta fiada con nombre de cliente se asienta en su cuenta; el cliente
+-- se crea la primera vez y su teléfono se actualiza si la venta trae uno nuevo
+CREATE OR REPLACE FUNCTION asentar_ventas_fiadas() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO clientes AS c (nombre, telefono)
+    SELECT DISTINCT ON (normalizar_nombre(cliente_fiado))
+        BTRIM(cliente_fiado), NULLIF(BTRIM(telefono_fiado), '')
+    FROM nuevas
+    WHERE metodo_pago = 'Fiado' AND deuda > 0 AND normalizar_nombre(cliente_fiado) <> ''
+    ORDER BY normalizar_nombre(cliente_fiado), NULLIF(BTRIM(telefono_fiado), '') IS NULL, fecha DESC
+    ON CONFLICT (nombre_normalizado) DO UPDATE SET telefono = EXCLUDED.telefono
+    WHERE EXCLUDED.telefono IS NOT NULL AND EXCLUDED.telefono IS DISTINCT FROM c.telefono;
+
+    INSERT INTO movimientos_cliente (cliente_id, fecha, tipo, monto, sucursal, metodo_pago, venta_id)
+    SELECT c.id, n.fecha, 'fiado', n.deuda, n.sucursal, n.metodo_pago, n.id
+    FROM nuevas n
+    JOIN clientes c ON c.nombre_normalizado = normalizar_nombre(n.cliente_fiado)
+    WHERE n.metodo_pago = 'Fiado' AND n.deuda > 0;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cuentas_clientes_ventas ON ventas;
+CREATE TRIGGER trg_cuentas_clientes_ventas AFTER INSERT ON ventas
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION asentar_ventas_fiadas();
+
+-- Reconstruye saldos y deuda abierta de todos los clientes a partir de los movimientos
+CREATE OR REPLACE FUNCTION recalcular_cuentas_clientes() RETURNS void AS $$
+BEGIN
+    UPDATE clientes c
+    SET saldo = COALESCE(m.saldo, 0),
+        ultimo_movimiento = m.ultimo
+    FROM clientes t
+    LEFT JOIN (
+        SELECT cliente_id, SUM(monto) as saldo, MAX(fecha) as ultimo
+        FROM movimientos_cliente
+        GROUP BY 1
+    ) m ON m.cliente_id = t.id
+    WHERE c.id = t.id;
+
+    DELETE FROM deudas_abiertas;
+    INSERT INTO deudas_abiertas (cliente_id, dia, pendiente)
+    SELECT cliente_id, fecha::DATE, SUM(monto)
+    FROM movimientos_cliente
+    WHERE monto > 0
+    GROUP BY 1, 2;
+
+    PERFORM ajustar_deudas_abiertas(ARRAY(SELECT id FROM clientes));
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cuentas iniciales con las ventas fiadas que siguen en la base (hasta ahora
+-- no se registraban cobros, así que toda esa deuda figura como pendiente).
+-- Las de meses archivados en Parquet no se incluyen.
+INSERT INTO clientes (nombre, telefono)
+SELECT DISTINCT ON (normalizar_nombre(cliente_fiado))
+    BTRIM(cliente_fiado), NULLIF(BTRIM(telefono_fiado), '')
+FROM ventas
+WHERE metodo_pago = 'Fiado' AND deuda > 0 AND normalizar_nombre(cliente_fiado) <> ''
+ORDER BY normalizar_nombre(cliente_fiado), NULLIF(BTRIM(telefono_fiado), '') IS NULL, fecha DESC
+ON CONFLICT (nombre_normalizado) DO NOTHING;
+
+ALTER TABLE movimientos_cliente DISABLE TRIGGER trg_cuentas_clientes_insert;
+INSERT INTO movimientos_cliente (cliente_id, fecha, tipo, monto, sucursal, metodo_pago, venta_id)
+SELECT c.id, v.fecha, 'fiado', v.deuda, v.sucursal, v.metodo_pago, v.id
+FROM ventas v
+JOIN clientes c ON c.nombre_normalizado = normalizar_nombre(v.cliente_fiado)
+WHERE v.metodo_pago = 'Fiado' AND v.deuda > 0;
+ALTER TABLE movimientos_cliente ENABLE TRIGGER trg_cuentas_clientes_insert;
+
+SELECT recalcular_cuentas_clientes();
@@ -0,0 +1,22 @@
+-- Búsqueda de clientes por nombre o teléfono al cargar una venta fiada (ver
+-- clientes.py). El teléfono se guarda también solo con dígitos para que
+-- "11 4455-6677" y "1144556677" coincidan.
+ALTER TABLE clientes ADD COLUMN IF NOT EXISTS telefono_normalizado TEXT
+    GENERATED ALWAYS AS (NULLIF(REGEXP_REPLACE(telefono, '\D', '', 'g'), '')) STORED;
+
+-- Con pg_trgm, índices GIN de trigramas: LIKE '%texto%' y la similitud (para
+-- errores de tipeo) se resuelven con el índice. Si la extensión no está
+-- instalada en el servidor, clientes.py busca en un índice de prefijos en memoria.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_clientes_nombre_trgm ON clientes USING GIN (nombre_normalizado gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_clientes_telefono_trgm ON clientes USING GIN (telefono_normalizado gin_trgm_ops);
+    ELSE
+        RAISE NOTICE 'pg_trgm no está disponible: la búsqueda de clientes usa el índice en memoria';
+    END IF;
+EXCEPTION WHEN insufficient_privilege THEN
+    RAISE NOTICE 'Sin permisos para crear pg_trgm: la búsqueda de clientes usa el índice en memoria';
+END;
+$$;
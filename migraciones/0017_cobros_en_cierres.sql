@@ -0,0 +1,9 @@
+-- Los cobros de cuentas de clientes entran en la caja del turno: los de
+-- efectivo suman al saldo teórico y los digitales se informan aparte. Sin
+-- esto, cada cobro en efectivo aparecía como sobrante en el cierre.
+ALTER TABLE cierres ADD COLUMN IF NOT EXISTS cobros_efectivo DECIMAL(12,2) NOT NULL DEFAULT 0;
+ALTER TABLE cierres ADD COLUMN IF NOT EXISTS cobros_digital DECIMAL(12,2) NOT NULL DEFAULT 0;
+
+-- Cobros del turno de una sucursal (ver _TURNO_ABIERTO en consultas.py)
+CREATE INDEX IF NOT EXISTS idx_movimientos_cliente_cobros ON movimientos_cliente (sucursal, fecha)
+    WHERE tipo = 'cobro';
@@ -0,0 +1,61 @@
+-- Las ventas fiadas se asientan por el id del cliente elegido en la búsqueda
+-- y no por el nombre: dos clientes pueden llamarse igual. El nombre deja de
+-- ser único y queda como dato para buscar.
+ALTER TABLE ventas ADD COLUMN IF NOT EXISTS cliente_id INTEGER;
+
+ALTER TABLE clientes DROP CONSTRAINT IF EXISTS clientes_nombre_normalizado_key;
+CREATE INDEX IF NOT EXISTS idx_clientes_nombre_normalizado ON clientes (nombre_normalizado);
+
+-- Ventas fiadas anteriores: el cliente con el que ya se asentaron
+UPDATE ventas v
+SET cliente_id = m.cliente_id
+FROM movimientos_cliente m
+WHERE m.tipo = 'fiado' AND m.venta_id = v.id AND v.cliente_id IS NULL;
+
+-- Venta fiada sin cliente_id (importaciones, operaciones viejas del diario o
+-- un cliente nuevo): se usa el cliente con ese nombre solo si hay uno y su
+-- teléfono no contradice al de la venta; si no, se crea uno nuevo. El
+-- teléfono del cliente solo se completa cuando no tenía.
+CREATE OR REPLACE FUNCTION resolver_cliente_fiado() RETURNS trigger AS $$
+DECLARE
+    telefono_venta TEXT := NULLIF(BTRIM(NEW.telefono_fiado), '');
+BEGIN
+    IF NEW.cliente_id IS NULL AND normalizar_nombre(NEW.cliente_fiado) <> '' THEN
+        SELECT MIN(c.id) INTO NEW.cliente_id
+        FROM clientes c
+        WHERE c.nombre_normalizado = normalizar_nombre(NEW.cliente_fiado)
+        AND (telefono_venta IS NULL OR c.telefono_normalizado IS NULL
+             OR c.telefono_normalizado = REGEXP_REPLACE(telefono_venta, '\D', '', 'g'))
+        HAVING COUNT(*) = 1;
+
+        IF NEW.cliente_id IS NULL THEN
+            INSERT INTO clientes (nombre, telefono)
+            VALUES (BTRIM(NEW.cliente_fiado), telefono_venta)
+            RETURNING id INTO NEW.cliente_id;
+            RETURN NEW;
+        END IF;
+    END IF;
+
+    IF NEW.cliente_id IS NOT NULL AND telefono_venta IS NOT NULL THEN
+        UPDATE clientes SET telefono = telefono_venta
+        WHERE id = NEW.cliente_id AND telefono IS NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_clientes_ventas_fiadas ON ventas;
+CREATE TRIGGER trg_clientes_ventas_fiadas BEFORE INSERT ON ventas
+    FOR EACH ROW WHEN (NEW.metodo_pago = 'Fiado' AND NEW.deuda > 0)
+    EXECUTE FUNCTION resolver_cliente_fiado();
+
+CREATE OR REPLACE FUNCTION asentar_ventas_fiadas() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO movimientos_cliente (cliente_id, fecha, tipo, monto, sucursal, metodo_pago, venta_id)
+    SELECT cliente_id, fecha, 'fiado', deuda, sucursal, metodo_pago, id
+    FROM nuevas
+    WHERE metodo_pago = 'Fiado' AND deuda > 0 AND cliente_id IS NOT NULL;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,83 @@
+-- Cada fila de los resúmenes diarios guarda cuándo la tocó un trigger por
+-- última vez. La réplica analítica (analitica.py) verifica solo los días
+-- modificados desde su última verificación en vez de toda la historia. Las
+-- filas existentes quedan en -infinity: ya se verificaron completas.
+ALTER TABLE resumen_ventas_diario ADD COLUMN IF NOT EXISTS actualizado_en TIMESTAMP NOT NULL DEFAULT '-infinity';
+ALTER TABLE resumen_ventas_diario ALTER COLUMN actualizado_en SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE resumen_egresos_diario ADD COLUMN IF NOT EXISTS actualizado_en TIMESTAMP NOT NULL DEFAULT '-infinity';
+ALTER TABLE resumen_egresos_diario ALTER COLUMN actualizado_en SET DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_resumen_ventas_diario_actualizado ON resumen_ventas_diario (actualizado_en);
+CREATE INDEX IF NOT EXISTS idx_resumen_egresos_diario_actualizado ON resumen_egresos_diario (actualizado_en);
+
+-- Igual que en 0005, más la marca de actualización en las filas existentes
+-- (las nuevas la toman del default; recalcular_resumenes() las vuelve a insertar)
+CREATE OR REPLACE FUNCTION acumular_resumen_ventas() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('caja.omitir_resumen', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO resumen_ventas_diario AS r (dia, sucursal, metodo_pago, cantidad, monto, ingreso, deuda)
+        SELECT fecha::DATE, sucursal, COALESCE(metodo_pago, 'Sin especificar'),
+               -COUNT(*), -SUM(COALESCE(monto, 0)), -SUM(COALESCE(ingreso, 0)), -SUM(COALESCE(deuda, 0))
+        FROM viejas
+        GROUP BY 1, 2, 3
+        ON CONFLICT (dia, sucursal, metodo_pago) DO UPDATE SET
+            cantidad = r.cantidad + EXCLUDED.cantidad,
+            monto = r.monto + EXCLUDED.monto,
+            ingreso = r.ingreso + EXCLUDED.ingreso,
+            deuda = r.deuda + EXCLUDED.deuda,
+            actualizado_en = CURRENT_TIMESTAMP;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO resumen_ventas_diario AS r (dia, sucursal, metodo_pago, cantidad, monto, ingreso, deuda)
+        SELECT fecha::DATE, sucursal, COALESCE(metodo_pago, 'Sin especificar'),
+               COUNT(*), SUM(COALESCE(monto, 0)), SUM(COALESCE(ingreso, 0)), SUM(COALESCE(deuda, 0))
+        FROM nuevas
+        GROUP BY 1, 2, 3
+        ON CONFLICT (dia, sucursal, metodo_pago) DO UPDATE SET
+            cantidad = r.cantidad + EXCLUDED.cantidad,
+            monto = r.monto + EXCLUDED.monto,
+            ingreso = r.ingreso + EXCLUDED.ingreso,
+            deuda = r.deuda + EXCLUDED.deuda,
+            actualizado_en = CURRENT_TIMESTAMP;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION acumular_resumen_egresos() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('caja.omitir_resumen', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO resumen_egresos_diario AS r (dia, sucursal, motivo, cantidad, monto)
+        SELECT fecha::DATE, sucursal, motivo, -COUNT(*), -SUM(COALESCE(monto, 0))
+        FROM viejas
+        GROUP BY 1, 2, 3
+        ON CONFLICT (dia, sucursal, motivo) DO UPDATE SET
+            cantidad = r.cantidad + EXCLUDED.cantidad,
+            monto = r.monto + EXCLUDED.monto,
+            actualizado_en = CURRENT_TIMESTAMP;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO resumen_egresos_diario AS r (dia, sucursal, motivo, cantidad, monto)
+        SELECT fecha::DATE, sucursal, motivo, COUNT(*), SUM(COALESCE(monto, 0))
+        FROM nuevas
+        GROUP BY 1, 2, 3
+        ON CONFLICT (dia, sucursal, motivo) DO UPDATE SET
+            cantidad = r.cantidad + EXCLUDED.cantidad,
+            monto = r.monto + EXCLUDED.monto,
+            actualizado_en = CURRENT_TIMESTAMP;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
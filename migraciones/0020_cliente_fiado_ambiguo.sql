@@ -0,0 +1,35 @@
+-- Con dos clientes del mismo nombre, una venta fiada sin cliente_id ni
+-- teléfono no coincidía con ninguno y creaba otro cliente más cada vez,
+-- repartiendo el saldo entre copias. Ahora se elige uno siempre igual: el del
+-- mismo teléfono, si no el de movimiento más reciente. Solo se crea un
+-- cliente cuando ninguno del mismo nombre es compatible con la venta.
+CREATE OR REPLACE FUNCTION resolver_cliente_fiado() RETURNS trigger AS $$
+DECLARE
+    telefono_venta TEXT := NULLIF(BTRIM(NEW.telefono_fiado), '');
+    digitos_venta TEXT := NULLIF(REGEXP_REPLACE(NEW.telefono_fiado, '\D', '', 'g'), '');
+BEGIN
+    IF NEW.cliente_id IS NULL AND normalizar_nombre(NEW.cliente_fiado) <> '' THEN
+        SELECT c.id INTO NEW.cliente_id
+        FROM clientes c
+        WHERE c.nombre_normalizado = normalizar_nombre(NEW.cliente_fiado)
+        AND (digitos_venta IS NULL OR c.telefono_normalizado IS NULL OR c.telefono_normalizado = digitos_venta)
+        ORDER BY c.telefono_normalizado IS NOT DISTINCT FROM digitos_venta DESC,
+                 c.ultimo_movimiento DESC NULLS LAST,
+                 c.id
+        LIMIT 1;
+
+        IF NEW.cliente_id IS NULL THEN
+            INSERT INTO clientes (nombre, telefono)
+            VALUES (BTRIM(NEW.cliente_fiado), telefono_venta)
+            RETURNING id INTO NEW.cliente_id;
+            RETURN NEW;
+        END IF;
+    END IF;
+
+    IF NEW.cliente_id IS NOT NULL AND telefono_venta IS NOT NULL THEN
+        UPDATE clientes SET telefono = telefono_venta
+        WHERE id = NEW.cliente_id AND telefono IS NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,159 @@
+# migrar.py
+import argparse
+import re
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import sql as psql
+
+from db import parametros_conexion
+
+DIRECTORIO = Path(__file__).resolve().parent / "migraciones"
+PATRON_ARCHIVO = re.compile(r"^(\d+)_(\w+)\.sql$")
+# Las migraciones con esta marca en la primera línea se ejecutan fuera de una
+# transacción, sentencia por sentencia (p. ej. CREATE INDEX CONCURRENTLY)
+MARCA_SIN_TRANSACCION = "-- migrar: sin transaccion"
+# Clave del advisory lock que evita que dos procesos migren a la vez
+CLAVE_BLOQUEO = 7310452
+# Apertura o cierre de una cadena entre dólares: $$ o $etiqueta$
+CITA_DOLAR = re.compile(r"\$([A-Za-z_]\w*)?\$")
+
+# Un CREATE INDEX CONCURRENTLY que falla deja el índice creado pero INVALID, y
+# el IF NOT EXISTS del reintento lo daría por hecho: se borra antes de crearlo
+# y se verifica que haya quedado válido
+INDICE_CONCURRENTE = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+                                re.IGNORECASE)
+INDICE_INVALIDO = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND pg_table_is_visible(c.oid) AND NOT i.indisvalid
+    )
+"""
+
+
+def migraciones_disponibles():
+    migraciones = []
+    for ruta in DIRECTORIO.glob("*.sql"):
+        coincidencia = PATRON_ARCHIVO.match(ruta.name)
+        if coincidencia:
+            migraciones.append((int(coincidencia.group(1)), coincidencia.group(2), ruta))
+    return sorted(migraciones)
+
+
+def _sentencias(sql):
+    # Separación simple por ';' al final de línea; alcanza para las migraciones
+    # sin transacción. No corta dentro de un cuerpo $$...$$ (DO, funciones) ni
+    # en una línea de comentario
+    actual, sentencias, cita = [], [], None
+    for linea in sql.splitlines():
+        comentario = linea.strip().startswith("--")
+        if (comentario or not linea.strip()) and not actual:
+            continue
+        actual.append(linea)
+        if comentario:
+            continue
+        for marca in CITA_DOLAR.findall(linea):
+            if cita is None:
+                cita = marca
+            elif marca == cita:
+                cita = None
+        if cita is None and linea.rstrip().endswith(";"):
+            sentencias.append("\n".join(actual))
+            actual = []
+    if "".join(actual).strip():
+        sentencias.append("\n".join(actual))
+    return sentencias
+
+
+def _indice_invalido(cur, nombre):
+    cur.execute(INDICE_INVALIDO, (nombre,))
+    return cur.fetchone()[0]
+
+
+def _ejecutar_sin_transaccion(cur, sentencia):
+    indice = INDICE_CONCURRENTE.search(sentencia)
+    if indice and _indice_invalido(cur, indice.group(1)):
+        cur.execute(psql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(psql.Identifier(indice.group(1))))
+    cur.execute(sentencia)
+    if indice and _indice_invalido(cur, indice.group(1)):
+        raise RuntimeError(f"El índice {indice.group(1)} quedó inválido; revisar y volver a migrar")
+
+
+def versiones_aplicadas(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("SELECT version FROM schema_version")
+    return {fila[0] for fila in cur.fetchall()}
+
+
+def aplicar_migraciones(conn, mostrar=print):
+    """Aplica en orden las migraciones pendientes y devuelve las versiones aplicadas.
+
+    Es idempotente: las versiones ya registradas en schema_version se saltean.
+    """
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s)", (CLAVE_BLOQUEO,))
+    aplicadas_ahora = []
+    try:
+        aplicadas = versiones_aplicadas(cur)
+        for version, nombre, ruta in migraciones_disponibles():
+            if version in aplicadas:
+                continue
+            sql = ruta.read_text(encoding="utf-8")
+            if sql.startswith(MARCA_SIN_TRANSACCION):
+                for sentencia in _sentencias(sql):
+                    _ejecutar_sin_transaccion(cur, sentencia)
+                cur.execute("INSERT INTO schema_version (version, nombre) VALUES (%s, %s)", (version, nombre))
+            else:
+                conn.autocommit = False
+                try:
+                    cur.execute(sql)
+                    cur.execute("INSERT INTO schema_version (version, nombre) VALUES (%s, %s)", (version, nombre))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.autocommit = True
+            aplicadas_ahora.append(version)
+            mostrar(f"✅ Migración {version:04d} {nombre} aplicada")
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (CLAVE_BLOQUEO,))
+    return aplicadas_ahora
+
+
+def migrar(mostrar=print):
+    # Conexión propia (fuera del pool) porque las migraciones cambian autocommit
+    conn = psycopg2.connect(**parametros_conexion())
+    try:
+        return aplicar_migraciones(conn, mostrar)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la caja")
+    parser.add_argument("--estado", action="store_true", help="solo listar migraciones aplicadas y pendientes")
+    args = parser.parse_args()
+
+    if args.estado:
+        conn = psycopg2.connect(**parametros_conexion())
+        try:
+            cur = conn.cursor()
+            aplicadas = versiones_aplicadas(cur)
+            conn.commit()
+            for version, nombre, _ in migraciones_disponibles():
+                marca = "✅" if version in aplicadas else "⏳"
+                print(f"{marca} {version:04d} {nombre}")
+        finally:
+            conn.close()
+    else:
+        if not migrar():
+            print("✅ El esquema ya está al día.")
@@ -0,0 +1,51 @@
+# paralelo.py
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+
+import db
+
+# Hilos compartidos por todas las sesiones para las consultas del Dashboard;
+# cada consulta toma su propia conexión del pool
+PARALELO_HILOS = int(os.getenv("PARALELO_HILOS", 8))
+# Segundos que el Dashboard espera cada consulta antes de mostrar un aviso
+PARALELO_TIMEOUT = float(os.getenv("PARALELO_TIMEOUT", 15))
+
+_ejecutor = ThreadPoolExecutor(max_workers=PARALELO_HILOS, thread_name_prefix="consultas")
+
+
+def _ejecutar(cargar, timeout):
+    db.limite_consulta.set(timeout)
+    return cargar()
+
+
+def lanzar(cargas, timeout=PARALELO_TIMEOUT):
+    """Lanza a la vez cada función de ``cargas`` ({nombre: cargar}) y devuelve {futuro: nombre}.
+
+    Cada carga corre en una copia del contexto actual (así el perfilador la
+    agrupa en la vista que la pidió) y con statement_timeout de ``timeout``.
+    """
+    futuros = {}
+    for nombre, cargar in cargas.items():
+        contexto = contextvars.copy_context()
+        futuros[_ejecutor.submit(contexto.run, _ejecutar, cargar, timeout)] = nombre
+    return futuros
+
+
+def a_medida_que_terminan(futuros, timeout=PARALELO_TIMEOUT):
+    """Genera (nombre, resultado, error) en el orden en que terminan las cargas.
+
+    Las que no terminan dentro de ``timeout`` salen al final con TimeoutError;
+    siguen corriendo y, si terminan, su resultado queda en la cache.
+    """
+    pendientes = set(futuros)
+    try:
+        for futuro in as_completed(futuros, timeout=timeout):
+            pendientes.discard(futuro)
+            try:
+                yield futuros[futuro], futuro.result(), None
+            except Exception as e:
+                yield futuros[futuro], None, e
+    except TimeoutError:
+        for futuro in pendientes:
+            yield futuros[futuro], None, TimeoutError(f"sin respuesta en {timeout:g} s")
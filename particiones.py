@@ -0,0 +1,115 @@
+# particiones.py
+import argparse
+from datetime import date
+
+from psycopg2 import sql
+
+import consultas
+from db import conexion
+
+# Particiones mensuales de ventas y egresos (migraciones/0012_particiones_mensuales.sql).
+# Este script crea por adelantado los meses que vienen y puede separar los
+# meses viejos: una partición separada queda como tabla suelta (ventas_2023_01)
+# fuera de las consultas de la app, pero sus totales siguen en los resúmenes.
+TABLAS_PARTICIONADAS = ("ventas", "egresos")
+# Meses a crear por adelantado además del actual
+PARTICIONES_ADELANTE = 3
+
+PARTICIONES = """
+    SELECT tabla, particion, mes, filas_estimadas, bytes
+    FROM particiones_mensuales
+    ORDER BY tabla, mes
+"""
+
+FUERA_DE_RANGO = """
+    SELECT 'ventas', COUNT(*) FROM ventas_fuera_de_rango
+    UNION ALL
+    SELECT 'egresos', COUNT(*) FROM egresos_fuera_de_rango
+"""
+
+PARTICIONES_ANTERIORES = """
+    SELECT tabla, particion FROM particiones_mensuales
+    WHERE mes < %s
+    ORDER BY tabla, mes
+"""
+
+
+def asegurar_particiones(adelante=PARTICIONES_ADELANTE, hoy=None):
+    """Crea las particiones desde el mes actual hasta ``adelante`` meses después.
+
+    Devuelve cuántas particiones nuevas se crearon. Si alguna venta o egreso ya
+    había caído en la partición por defecto, se mueve a la suya.
+    """
+    hoy = hoy or date.today()
+    hasta = consultas.restar_meses(hoy.replace(day=1), -adelante)
+    creadas = 0
+    with conexion(escritura=True) as conn:
+        cur = conn.cursor()
+        for tabla in TABLAS_PARTICIONADAS:
+            cur.execute("SELECT asegurar_particiones(%s, %s, %s)", (tabla, hoy, hasta))
+            creadas += cur.fetchone()[0]
+        conn.commit()
+    return creadas
+
+
+def separar_particiones(antes):
+    """Separa las particiones de los meses anteriores a ``antes`` y devuelve sus nombres.
+
+    Ojo: recalcular_resumenes() sobre un rango separado dejaría esos días en cero.
+    """
+    if antes > date.today().replace(day=1):
+        raise ValueError("Solo se pueden separar meses ya cerrados")
+    with conexion(escritura=True) as conn:
+        cur = conn.cursor()
+        cur.execute(PARTICIONES_ANTERIORES, (antes.replace(day=1),))
+        separadas = cur.fetchall()
+        for tabla, particion in separadas:
+            cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                sql.Identifier(tabla), sql.Identifier(particion)
+            ))
+        conn.commit()
+    return [particion for _, particion in separadas]
+
+
+def estado_particiones():
+    """Devuelve (particiones, fuera_de_rango): las particiones adjuntas y las filas sin mes propio."""
+    with conexion() as conn:
+        cur = conn.cursor()
+        cur.execute(PARTICIONES)
+        particiones = cur.fetchall()
+        cur.execute(FUERA_DE_RANGO)
+        return particiones, dict(cur.fetchall())
+
+
+def _mes(texto):
+    anio, mes = texto.split("-")
+    return date(int(anio), int(mes), 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de las particiones mensuales de ventas y egresos")
+    parser.add_argument("--adelante", type=int, default=PARTICIONES_ADELANTE,
+                        help="meses a crear por adelantado además del actual")
+    parser.add_argument("--separar-antes", type=_mes, metavar="AAAA-MM",
+                        help="separar las particiones de los meses anteriores a este")
+    parser.add_argument("--estado", action="store_true", help="solo listar las particiones")
+    args = parser.parse_args()
+
+    if not args.estado:
+        creadas = asegurar_particiones(args.adelante)
+        print(f"✅ {creadas} particiones nuevas" if creadas else "✅ Las particiones ya estaban creadas.")
+        if args.separar_antes:
+            if args.separar_antes > date.today().replace(day=1):
+                raise SystemExit("❌ Solo se pueden separar meses ya cerrados")
+            separadas = separar_particiones(args.separar_antes)
+            for particion in separadas:
+                print(f"📦 {particion} separada")
+            if not separadas:
+                print(f"✅ No hay particiones anteriores a {args.separar_antes:%Y-%m}.")
+
+    particiones, fuera_de_rango = estado_particiones()
+    for tabla, particion, mes, filas, bytes_ in particiones:
+        print(f"{particion:<20} {mes:%m/%Y}  ~{filas:>9} filas  {bytes_ / 1024 / 1024:8.1f} MB")
+    for tabla, filas in fuera_de_rango.items():
+        if filas:
+            print(f"⚠️ {filas} filas de {tabla} fuera de las particiones mensuales")
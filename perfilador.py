@@ -0,0 +1,251 @@
+# perfilador.py
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PERFIL_ACTIVO = os.getenv("PERFIL_ACTIVO", "1") == "1"
+# Una consulta de lectura más lenta que esto (ms) se repite con EXPLAIN (ANALYZE, BUFFERS)
+PERFIL_UMBRAL_MS = float(os.getenv("PERFIL_UMBRAL_MS", 250))
+# Segundos mínimos entre dos EXPLAIN de la misma consulta
+PERFIL_EXPLAIN_CADA = float(os.getenv("PERFIL_EXPLAIN_CADA", 300))
+# EXPLAIN esperando al hilo que los corre; con la cola llena se descartan
+PERFIL_EXPLAIN_COLA = int(os.getenv("PERFIL_EXPLAIN_COLA", 8))
+# Huellas distintas que se guardan (las menos usadas recientemente se descartan)
+PERFIL_MAX_HUELLAS = int(os.getenv("PERFIL_MAX_HUELLAS", 200))
+# Últimas ejecuciones por huella usadas para promedio y p95
+PERFIL_VENTANA = int(os.getenv("PERFIL_VENTANA", 200))
+# Log JSONL opcional, rotado por tamaño
+PERFIL_LOG = os.getenv("PERFIL_LOG")
+PERFIL_LOG_MAX_MB = float(os.getenv("PERFIL_LOG_MAX_MB", 10))
+PERFIL_LOG_COPIAS = int(os.getenv("PERFIL_LOG_COPIAS", 3))
+
+# Vista de la app que está ejecutando las consultas del hilo actual
+vista_actual = ContextVar("vista_actual", default="sin vista")
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|%s|\b\d+(?:\.\d+)?\b")
+_COMENTARIOS = re.compile(r"--[^\n]*")
+_ESCRITURA = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE|REFRESH|COPY|LOCK)\b", re.IGNORECASE)
+# SELECT recalcular_resumenes(...), SELECT asegurar_particiones(...): la función puede escribir
+_LLAMADA = re.compile(r"^SELECT\s+[\w.]+\s*\(", re.IGNORECASE)
+_FROM = re.compile(r"\bFROM\b", re.IGNORECASE)
+# SELECT ... FOR UPDATE / FOR SHARE toma bloqueos: repetirlo con EXPLAIN ANALYZE los volvería a tomar
+_BLOQUEO = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def huella(sql):
+    """SQL normalizado: sin comentarios, literales ni parámetros y con espacios colapsados."""
+    sql = _COMENTARIOS.sub(" ", sql)
+    sql = _LITERALES.sub("?", sql)
+    return " ".join(sql.split()).rstrip(";")
+
+
+def es_lectura(huella_sql):
+    if _LLAMADA.match(huella_sql) and not _FROM.search(huella_sql):
+        return False
+    return (huella_sql.upper().startswith(("SELECT", "WITH"))
+            and not _ESCRITURA.search(huella_sql) and not _BLOQUEO.search(huella_sql))
+
+
+@contextmanager
+def vista(nombre):
+    token = vista_actual.set(nombre)
+    try:
+        yield
+    finally:
+        vista_actual.reset(token)
+
+
+class EstadisticaConsulta:
+    def __init__(self, huella_sql):
+        self.huella = huella_sql
+        self.tiempos = deque(maxlen=PERFIL_VENTANA)
+        self.llamadas = 0
+        self.filas = 0
+        self.vistas = set()
+        self.max_ms = 0.0
+        self.explain = None
+        self.explain_en = 0.0
+
+    def fila(self):
+        tiempos = sorted(self.tiempos)
+        return {
+            "huella": self.huella,
+            "vistas": ", ".join(sorted(self.vistas)),
+            "llamadas": self.llamadas,
+            "promedio_ms": sum(tiempos) / len(tiempos),
+            "p95_ms": tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))],
+            "max_ms": self.max_ms,
+            "filas_promedio": self.filas / self.llamadas,
+            "explain": self.explain,
+        }
+
+
+class Perfilador:
+    """Latencias por consulta agrupadas por huella, para el panel del dueño."""
+
+    def __init__(self, maximo=PERFIL_MAX_HUELLAS):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._log = _logger_jsonl(PERFIL_LOG) if PERFIL_LOG else None
+
+    def registrar(self, huella_sql, ms, filas):
+        nombre_vista = vista_actual.get()
+        with self._lock:
+            estadistica = self._datos.get(huella_sql)
+            if estadistica is None:
+                estadistica = self._datos[huella_sql] = EstadisticaConsulta(huella_sql)
+                while len(self._datos) > self.maximo:
+                    self._datos.popitem(last=False)
+            self._datos.move_to_end(huella_sql)
+            estadistica.tiempos.append(ms)
+            estadistica.llamadas += 1
+            estadistica.filas += max(filas, 0)
+            estadistica.vistas.add(nombre_vista)
+            estadistica.max_ms = max(estadistica.max_ms, ms)
+        if self._log:
+            self._log.info(json.dumps({
+                "fecha": datetime.now().isoformat(timespec="milliseconds"),
+                "vista": nombre_vista,
+                "huella": huella_sql,
+                "ms": round(ms, 3),
+                "filas": filas,
+            }, ensure_ascii=False))
+
+    def guardar_explain(self, huella_sql, explain):
+        with self._lock:
+            estadistica = self._datos.get(huella_sql)
+            if estadistica is not None:
+                estadistica.explain = explain
+        if self._log:
+            self._log.info(json.dumps({
+                "fecha": datetime.now().isoformat(timespec="milliseconds"),
+                "vista": vista_actual.get(),
+                "huella": huella_sql,
+                "explain": explain,
+            }, ensure_ascii=False))
+
+    def pedir_explain(self, huella_sql, ms):
+        """True si la consulta es lenta y no se le sacó un plan hace poco."""
+        if ms < PERFIL_UMBRAL_MS or not es_lectura(huella_sql):
+            return False
+        ahora = time.monotonic()
+        with self._lock:
+            estadistica = self._datos.get(huella_sql)
+            if estadistica is None or ahora - estadistica.explain_en < PERFIL_EXPLAIN_CADA:
+                return False
+            # Se reserva antes de correr el EXPLAIN para no repetirlo desde otro hilo
+            estadistica.explain_en = ahora
+            return True
+
+    def top(self, n=10, orden="p95_ms"):
+        with self._lock:
+            filas = [estadistica.fila() for estadistica in self._datos.values()]
+        return sorted(filas, key=lambda fila: fila[orden], reverse=True)[:n]
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+def _logger_jsonl(ruta):
+    logger = logging.getLogger("perfilador.consultas")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        manejador = logging.handlers.RotatingFileHandler(
+            ruta, maxBytes=int(PERFIL_LOG_MAX_MB * 1024 * 1024), backupCount=PERFIL_LOG_COPIAS, encoding="utf-8")
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(manejador)
+    return logger
+
+
+# ---------- REGISTRO DEL PROCESO ----------
+consultas = Perfilador()
+
+
+# ---------- EXPLAIN EN SEGUNDO PLANO ----------
+# El EXPLAIN (ANALYZE, BUFFERS) vuelve a ejecutar la consulta lenta: lo corre
+# un hilo propio con una conexión del pool, así no se suma a la demora de
+# quien hizo la consulta ni ocupa su conexión o su transacción
+_explains = queue.Queue(maxsize=PERFIL_EXPLAIN_COLA)
+_hilo_explain = None
+_hilo_explain_lock = threading.Lock()
+
+
+def _explicar(huella_sql, consulta):
+    import db  # db importa este módulo para el cursor_factory del pool
+
+    try:
+        # Mismo origen (primario o réplica) que elegiría la consulta original
+        with db.conexion_lectura() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+            cur.execute(b"EXPLAIN (ANALYZE, BUFFERS) " + consulta)
+            explain = "\n".join(fila[0] for fila in cur.fetchall())
+    except (psycopg2.Error, db.PoolAgotado):
+        return
+    consultas.guardar_explain(huella_sql, explain)
+
+
+def _bucle_explain():
+    while True:
+        contexto, huella_sql, consulta = _explains.get()
+        try:
+            contexto.run(_explicar, huella_sql, consulta)
+        except Exception:
+            pass
+
+
+def encolar_explain(huella_sql, consulta):
+    """Pide el EXPLAIN de ``consulta`` (bytes, con los parámetros ya aplicados)."""
+    global _hilo_explain
+    if _hilo_explain is None:
+        with _hilo_explain_lock:
+            if _hilo_explain is None:
+                _hilo_explain = threading.Thread(target=_bucle_explain, name="perfilador-explain", daemon=True)
+                _hilo_explain.start()
+    try:
+        _explains.put_nowait((contextvars.copy_context(), huella_sql, consulta))
+    except queue.Full:
+        pass
+
+
+class CursorInstrumentado(psycopg2.extensions.cursor):
+    """Cursor que mide cada execute y lo registra en ``consultas``.
+
+    Se usa como cursor_factory de las conexiones del pool (ver db.py) salvo
+    que PERFIL_ACTIVO esté apagado.
+    """
+
+    def execute(self, sql, parametros=None):
+        texto = sql if isinstance(sql, str) else sql.decode() if isinstance(sql, bytes) else sql.as_string(self)
+        huella_sql = huella(texto)
+        inicio = time.perf_counter()
+        try:
+            resultado = super().execute(sql, parametros)
+        except Exception:
+            consultas.registrar(huella_sql, (time.perf_counter() - inicio) * 1000, -1)
+            raise
+        ms = (time.perf_counter() - inicio) * 1000
+        consultas.registrar(huella_sql, ms, self.rowcount)
+        if consultas.pedir_explain(huella_sql, ms):
+            encolar_explain(huella_sql, self.query)
+        return resultado
@@ -0,0 +1,85 @@
+# refrescar.py
+import threading
+from datetime import date
+
+import cache
+import perfilador
+from db import conexion
+
+REFRESCAR_RESUMEN_MENSUAL = """
+    REFRESH MATERIALIZED VIEW CONCURRENTLY resumen_mensual;
+    UPDATE refrescos_materializados
+    SET refrescada_en = CURRENT_TIMESTAMP,
+        hasta_mes = DATE_TRUNC('month', CURRENT_DATE)::DATE,
+        pendiente = FALSE
+    WHERE vista = 'resumen_mensual';
+"""
+
+ESTADO_RESUMEN_MENSUAL = """
+    SELECT refrescada_en, hasta_mes, pendiente
+    FROM refrescos_materializados
+    WHERE vista = 'resumen_mensual'
+"""
+
+
+def refrescar_resumen_mensual():
+    # El refresco y la marca de tiempo van en la misma transacción; CONCURRENTLY
+    # permite que el Dashboard siga leyendo la vista mientras tanto
+    with conexion(escritura=True) as conn:
+        cur = conn.cursor()
+        cur.execute(REFRESCAR_RESUMEN_MENSUAL)
+        cur.execute(ESTADO_RESUMEN_MENSUAL)
+        estado = cur.fetchone()
+        conn.commit()
+    return estado
+
+
+def estado_resumen_mensual():
+    with conexion() as conn:
+        cur = conn.cursor()
+        cur.execute(ESTADO_RESUMEN_MENSUAL)
+        return cur.fetchone()
+
+
+# ---------- REFRESCO EN SEGUNDO PLANO ----------
+# El Dashboard no espera el REFRESH: lo lanza en un hilo propio (sin el
+# statement_timeout de sus consultas) y mientras tanto lee la vista como está
+_hilo = None
+_hilo_lock = threading.Lock()
+ultimo_error = None
+
+
+def _refrescar_en_segundo_plano():
+    global ultimo_error
+    perfilador.vista_actual.set("Refresco de resumen_mensual")
+    try:
+        refrescar_resumen_mensual()
+    except Exception as e:
+        ultimo_error = str(e).strip()
+        return
+    ultimo_error = None
+    # Los resultados del Dashboard que abarcan todas las sucursales se vuelven a leer
+    cache.resultados.invalidar(None)
+
+
+def asegurar_resumen_mensual():
+    """Si cerró un mes desde el último refresco o hubo escrituras en meses ya
+    materializados, lanza el refresco en segundo plano sin esperarlo.
+
+    Devuelve (refrescada_en, desactualizada) con el estado de la vista que se va a leer.
+    """
+    global _hilo
+    refrescada_en, hasta_mes, pendiente = estado_resumen_mensual()
+    desactualizada = pendiente or hasta_mes < date.today().replace(day=1)
+    if desactualizada:
+        with _hilo_lock:
+            if _hilo is None or not _hilo.is_alive():
+                _hilo = threading.Thread(target=_refrescar_en_segundo_plano,
+                                         name="refresco-resumen-mensual", daemon=True)
+                _hilo.start()
+    return refrescada_en, desactualizada
+
+
+if __name__ == "__main__":
+    refrescada_en, hasta_mes, _ = refrescar_resumen_mensual()
+    print(f"✅ resumen_mensual refrescado el {refrescada_en:%d/%m/%Y %H:%M} (meses anteriores a {hasta_mes:%m/%Y})")
@@ -0,0 +1,90 @@
+# sucursales.py
+import argparse
+import os
+import threading
+import time
+
+import cache
+from db import conexion, consultar
+
+# Sucursales registradas (migraciones/0014_sucursales.sql). La lista de
+# activas se lee en cada pantalla, así que se guarda en memoria del proceso y
+# se vuelve a leer cada SUCURSALES_TTL segundos o cuando este proceso la cambia.
+SUCURSALES_TTL = float(os.getenv("SUCURSALES_TTL", 300))
+
+SUCURSALES_ACTIVAS = "SELECT nombre FROM sucursales WHERE activa ORDER BY id"
+
+AGREGAR_SUCURSAL = """
+    INSERT INTO sucursales (nombre) VALUES (%s)
+    ON CONFLICT (nombre) DO UPDATE SET activa = TRUE
+"""
+
+DAR_DE_BAJA = "UPDATE sucursales SET activa = FALSE WHERE nombre = %s"
+
+TODAS = "SELECT nombre, activa, creada_en FROM sucursales ORDER BY activa DESC, id"
+
+_activas = (0.0, ())
+_lock = threading.Lock()
+
+
+def activas():
+    """Nombres de las sucursales activas, en el orden en que se dieron de alta."""
+    global _activas
+    vence, nombres = _activas
+    if vence > time.monotonic():
+        return nombres
+    with _lock:
+        vence, nombres = _activas
+        if vence <= time.monotonic():
+            nombres = tuple(nombre for (nombre,) in consultar(SUCURSALES_ACTIVAS))
+            _activas = (time.monotonic() + SUCURSALES_TTL, nombres)
+    return nombres
+
+
+def invalidar():
+    global _activas
+    with _lock:
+        _activas = (0.0, ())
+    # La comparativa del Dashboard incluye a las sucursales activas sin movimientos
+    cache.resultados.limpiar()
+
+
+def _modificar(sql, nombre):
+    with conexion(escritura=True) as conn:
+        cur = conn.cursor()
+        cur.execute(sql, (nombre,))
+        modificadas = cur.rowcount
+        conn.commit()
+    invalidar()
+    return modificadas
+
+
+def agregar(nombre):
+    """Registra una sucursal nueva o vuelve a activar una dada de baja."""
+    return _modificar(AGREGAR_SUCURSAL, nombre.strip())
+
+
+def dar_de_baja(nombre):
+    """Deja de ofrecer la sucursal; devuelve 0 si no estaba registrada."""
+    return _modificar(DAR_DE_BAJA, nombre)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alta y baja de sucursales")
+    parser.add_argument("--agregar", metavar="NOMBRE")
+    parser.add_argument("--baja", metavar="NOMBRE")
+    args = parser.parse_args()
+
+    if args.agregar:
+        agregar(args.agregar)
+        print(f"✅ {args.agregar.strip()} activa")
+    if args.baja:
+        if dar_de_baja(args.baja):
+            print(f"✅ {args.baja} dada de baja")
+        else:
+            print(f"⚠️ {args.baja} no está registrada")
+
+    for nombre, activa, creada_en in consultar(TODAS):
+        print(f"{'✅' if activa else '⛔'} {nombre:<30} desde {creada_en:%d/%m/%Y}")
+    print("Los procesos de la app toman los cambios en a lo sumo "
+          f"{SUCURSALES_TTL:g} s (SUCURSALES_TTL).")
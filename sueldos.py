@@ -0,0 +1,66 @@
+# sueldos.py
+from datetime import date, datetime
+
+from db import conexion
+
+# Una sola sentencia: crea la corrida, registra los pagos que todavía no se
+# hicieron en el período y los asienta como egresos. Los empleados ya pagados
+# en el período los descarta el ON CONFLICT, así repetir la corrida no duplica.
+PAGAR_SUELDOS = """
+    WITH corrida AS (
+        INSERT INTO corridas_sueldo (sucursal, periodo, observacion)
+        VALUES (%(sucursal)s, %(periodo)s, %(observacion)s)
+        RETURNING id
+    ), seleccion AS (
+        SELECT *
+        FROM UNNEST(%(empleados)s::INTEGER[], %(montos)s::DECIMAL(12,2)[]) AS s (empleado_id, monto)
+    ), pagos AS (
+        INSERT INTO pagos_sueldo (corrida_id, empleado_id, periodo, monto)
+        SELECT corrida.id, emp.id, %(periodo)s, s.monto
+        FROM corrida
+        CROSS JOIN seleccion s
+        JOIN empleados emp ON emp.id = s.empleado_id AND emp.sucursal = %(sucursal)s
+        ON CONFLICT (empleado_id, periodo) DO NOTHING
+        RETURNING empleado_id, monto
+    ), egresos_pagados AS (
+        INSERT INTO egresos (sucursal, motivo, monto, observacion, fecha, detalle, empleado_id)
+        SELECT %(sucursal)s, 'Sueldos', p.monto, %(observacion)s, %(fecha)s, CONCAT('Sueldo de ', emp.nombre), emp.id
+        FROM pagos p
+        JOIN empleados emp ON emp.id = p.empleado_id
+        RETURNING monto
+    )
+    SELECT (SELECT id FROM corrida), COUNT(*), COALESCE(SUM(monto), 0)
+    FROM egresos_pagados
+"""
+
+
+def periodo_de(dia):
+    # Los sueldos se liquidan por mes: el período es el primer día del mes
+    return date(dia.year, dia.month, 1)
+
+
+def pagar_sueldos(sucursal, empleados, observacion=None, fecha=None, periodo=None):
+    """Paga los sueldos de una corrida en una sola ida y vuelta a la base.
+
+    ``empleados`` es una lista de (id de empleado, monto). Devuelve
+    (id de la corrida, sueldos pagados, total pagado); si todos ya estaban
+    pagados en el período no se guarda la corrida y el id es None.
+    """
+    fecha = fecha or datetime.now()
+    parametros = {
+        "sucursal": sucursal,
+        "periodo": periodo or periodo_de(fecha),
+        "observacion": observacion,
+        "fecha": fecha,
+        "empleados": [int(empleado_id) for empleado_id, _ in empleados],
+        "montos": [round(float(monto), 2) for _, monto in empleados],
+    }
+    with conexion(escritura=True) as conn:
+        cur = conn.cursor()
+        cur.execute(PAGAR_SUELDOS, parametros)
+        corrida_id, pagados, total = cur.fetchone()
+        if not pagados:
+            conn.rollback()
+            return None, 0, total
+        conn.commit()
+    return corrida_id, pagados, total
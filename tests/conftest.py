@@ -0,0 +1,28 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Las pruebas contra Postgres usan la base que indique PRUEBAS_DB_NAME (con las
+# migraciones aplicadas) y deshacen todo al terminar; sin la variable se saltean
+# para no tocar nunca la base configurada en .env
+PRUEBAS_DB_NAME = os.getenv("PRUEBAS_DB_NAME")
+
+
+@pytest.fixture
+def conn_prueba():
+    if not PRUEBAS_DB_NAME:
+        pytest.skip("definir PRUEBAS_DB_NAME con una base de prueba migrada")
+    import psycopg2
+
+    from db import parametros_conexion
+
+    conn = psycopg2.connect(**dict(parametros_conexion(), database=PRUEBAS_DB_NAME))
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,122 @@
+import threading
+from datetime import date
+
+import pytest
+
+import cache
+
+MAYO = (date(2024, 5, 1), date(2024, 6, 1))
+JUNIO = (date(2024, 6, 1), date(2024, 7, 1))
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(cache.time, "monotonic", reloj)
+    return reloj
+
+
+def _cargar(valor, cargas):
+    def cargar():
+        cargas.append(valor)
+        return valor
+    return cargar
+
+
+def test_obtener_guarda_y_reutiliza(reloj):
+    resultados, cargas = cache.CacheResultados(ttl=60), []
+
+    assert resultados.obtener("ventas", "Centro", MAYO, _cargar(1, cargas)) == 1
+    assert resultados.obtener("ventas", "Centro", MAYO, _cargar(2, cargas)) == 1
+
+    assert cargas == [1]
+    assert resultados.estadisticas() == {"entradas": 1, "aciertos": 1, "fallos": 1, "invalidaciones": 0}
+
+
+def test_entrada_vencida_se_vuelve_a_cargar(reloj):
+    resultados, cargas = cache.CacheResultados(ttl=60), []
+    resultados.obtener("ventas", "Centro", MAYO, _cargar(1, cargas))
+
+    reloj.ahora += 59
+    assert resultados.obtener("ventas", "Centro", MAYO, _cargar(2, cargas)) == 1
+    reloj.ahora += 1
+    assert resultados.obtener("ventas", "Centro", MAYO, _cargar(2, cargas)) == 2
+
+    assert cargas == [1, 2]
+
+
+def test_descarta_la_menos_usada(reloj):
+    resultados, cargas = cache.CacheResultados(maximo=2, ttl=60), []
+    resultados.obtener("a", None, MAYO, _cargar("a", cargas))
+    resultados.obtener("b", None, MAYO, _cargar("b", cargas))
+    resultados.obtener("a", None, MAYO, _cargar("a2", cargas))
+    resultados.obtener("c", None, MAYO, _cargar("c", cargas))
+
+    assert resultados.obtener("a", None, MAYO, _cargar("a3", cargas)) == "a"
+    assert resultados.obtener("b", None, MAYO, _cargar("b2", cargas)) == "b2"
+
+
+def test_invalidar_por_sucursal_y_dia(reloj):
+    resultados = cache.CacheResultados(ttl=60)
+    for vista, sucursal, periodo in [("v", "Centro", MAYO), ("v", "Norte", MAYO), ("v", None, MAYO),
+                                     ("v", "Centro", JUNIO)]:
+        resultados.obtener(vista, sucursal, periodo, lambda: "viejo")
+
+    resultados.invalidar("Centro", date(2024, 5, 31))
+
+    cargas = []
+    assert resultados.obtener("v", "Centro", MAYO, _cargar("nuevo", cargas)) == "nuevo"
+    # Los resultados de todas las sucursales incluyen la escrita
+    assert resultados.obtener("v", None, MAYO, _cargar("nuevo", cargas)) == "nuevo"
+    assert resultados.obtener("v", "Norte", MAYO, _cargar("nuevo", cargas)) == "viejo"
+    # El período es semiabierto: el 31 de mayo no toca junio
+    assert resultados.obtener("v", "Centro", JUNIO, _cargar("nuevo", cargas)) == "viejo"
+    assert resultados.estadisticas()["invalidaciones"] == 2
+
+
+def test_invalidar_sin_dia_usa_hoy(reloj):
+    resultados = cache.CacheResultados(ttl=60)
+    hoy = date.today()
+    periodo = (hoy, date.fromordinal(hoy.toordinal() + 1))
+    resultados.obtener("v", "Centro", periodo, lambda: "viejo")
+
+    resultados.invalidar("Centro")
+
+    assert resultados.obtener("v", "Centro", periodo, lambda: "nuevo") == "nuevo"
+
+
+def test_carga_cruzada_con_invalidacion_no_se_guarda(reloj):
+    resultados = cache.CacheResultados(ttl=60)
+    cargando, seguir = threading.Event(), threading.Event()
+
+    def cargar_lento():
+        cargando.set()
+        seguir.wait()
+        return "desactualizado"
+
+    hilo = threading.Thread(target=resultados.obtener, args=("v", "Centro", MAYO, cargar_lento))
+    hilo.start()
+    cargando.wait()
+    # La escritura llega mientras la carga lee datos anteriores a ella
+    resultados.invalidar("Centro", date(2024, 5, 10))
+    seguir.set()
+    hilo.join()
+
+    assert resultados.obtener("v", "Centro", MAYO, lambda: "nuevo") == "nuevo"
+
+
+def test_limpiar(reloj):
+    resultados = cache.CacheResultados(ttl=60)
+    resultados.obtener("v", "Centro", MAYO, lambda: "viejo")
+
+    resultados.limpiar()
+
+    assert resultados.estadisticas()["entradas"] == 0
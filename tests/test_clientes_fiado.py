@@ -0,0 +1,49 @@
+from datetime import datetime
+
+
+def _venta_fiada(cur, nombre, telefono=None):
+    cur.execute("""
+        INSERT INTO ventas (sucursal, monto, metodo_pago, entregado, vuelto, ingreso, deuda, fecha,
+                            cliente_fiado, telefono_fiado)
+        VALUES ('Prueba', 100, 'Fiado', 0, 0, 0, 100, %s, %s, %s)
+        RETURNING cliente_id
+    """, (datetime.now(), nombre, telefono))
+    return cur.fetchone()[0]
+
+
+def _clientes(cur, nombre):
+    cur.execute("SELECT COUNT(*) FROM clientes WHERE nombre_normalizado = normalizar_nombre(%s)", (nombre,))
+    return cur.fetchone()[0]
+
+
+def test_nombre_repetido_sin_telefono_no_crea_clientes(conn_prueba):
+    cur = conn_prueba.cursor()
+    nombre = "Cliente Repetido De Prueba"
+    cur.execute("INSERT INTO clientes (nombre, telefono) VALUES (%s, '1111'), (%s, '2222')", (nombre, nombre))
+
+    primero = _venta_fiada(cur, nombre)
+    segundo = _venta_fiada(cur, nombre)
+
+    assert _clientes(cur, nombre) == 2
+    assert primero == segundo
+
+
+def test_nombre_repetido_prefiere_el_mismo_telefono(conn_prueba):
+    cur = conn_prueba.cursor()
+    nombre = "Cliente Repetido De Prueba"
+    cur.execute("INSERT INTO clientes (nombre, telefono) VALUES (%s, '1111'), (%s, '2222') RETURNING id",
+                (nombre, nombre))
+    _, con_telefono = [fila[0] for fila in cur.fetchall()]
+
+    assert _venta_fiada(cur, nombre, "22-22") == con_telefono
+    assert _clientes(cur, nombre) == 2
+
+
+def test_telefono_distinto_crea_otro_cliente(conn_prueba):
+    cur = conn_prueba.cursor()
+    nombre = "Cliente Repetido De Prueba"
+    cur.execute("INSERT INTO clientes (nombre, telefono) VALUES (%s, '1111')", (nombre,))
+
+    _venta_fiada(cur, nombre, "3333")
+
+    assert _clientes(cur, nombre) == 2
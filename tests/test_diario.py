@@ -0,0 +1,96 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+
+import diario
+
+
+class CursorFalso:
+    def __init__(self, enviadas, rechazar):
+        self.enviadas = enviadas
+        self.rechazar = rechazar
+
+    def execute(self, sql, datos=None):
+        if datos is None:
+            return
+        # Demora para que dos reenvíos simultáneos se crucen si nada los ordena
+        time.sleep(0.02)
+        if datos["clave"] in self.rechazar:
+            raise psycopg2.DataError("dato inválido")
+        self.enviadas.append(datos["clave"])
+
+
+class ConexionFalsa:
+    def __init__(self, enviadas, rechazar):
+        self._cursor = CursorFalso(enviadas, rechazar)
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def postgres_falso(monkeypatch):
+    enviadas, rechazar = [], set()
+
+    @contextmanager
+    def conexion(escritura=False):
+        yield ConexionFalsa(enviadas, rechazar)
+
+    monkeypatch.setattr(diario, "conexion", conexion)
+    return enviadas, rechazar
+
+
+@pytest.fixture
+def diario_temporal(tmp_path):
+    return diario.Diario(str(tmp_path / "diario.db"))
+
+
+def _venta(monto):
+    return {"sucursal": "Prueba", "fecha": "2024-05-10T12:00:00", "metodo_pago": "Efectivo", "monto": monto}
+
+
+def _en_paralelo(*funciones):
+    hilos = [threading.Thread(target=funcion) for funcion in funciones]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+
+def test_reenvios_simultaneos_envian_cada_operacion_una_vez_y_en_orden(diario_temporal, postgres_falso):
+    enviadas, _ = postgres_falso
+    claves = [diario_temporal.encolar("venta", _venta(monto)) for monto in range(5)]
+
+    _en_paralelo(diario_temporal.sincronizar, diario_temporal.vaciar)
+
+    assert enviadas == claves
+    assert diario_temporal.estado()["pendientes"] == 0
+
+
+def test_reenvios_simultaneos_cuentan_cada_intento(diario_temporal, postgres_falso):
+    _, rechazar = postgres_falso
+    rechazar.add(diario_temporal.encolar("venta", _venta(1)))
+
+    _en_paralelo(diario_temporal.sincronizar, diario_temporal.sincronizar)
+
+    intentos = diario_temporal._conn.execute("SELECT intentos FROM pendientes").fetchone()[0]
+    assert intentos == 2
+
+
+def test_operacion_rechazada_se_aparta_tras_max_intentos(diario_temporal, postgres_falso, monkeypatch):
+    enviadas, rechazar = postgres_falso
+    monkeypatch.setattr(diario, "DIARIO_MAX_INTENTOS", 2)
+    rechazar.add(diario_temporal.encolar("venta", _venta(1)))
+    valida = diario_temporal.encolar("venta", _venta(2))
+
+    diario_temporal.sincronizar()
+    diario_temporal.sincronizar()
+
+    assert enviadas == [valida]
+    assert diario_temporal.estado() == {"pendientes": 0, "con_error": 1, "ultimo_error": "dato inválido"}
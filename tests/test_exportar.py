@@ -0,0 +1,60 @@
+from datetime import date
+
+from exportar import _tramos
+
+
+def test_sin_meses_archivados():
+    assert _tramos(date(2024, 1, 1), date(2025, 1, 1), []) == [(date(2024, 1, 1), date(2025, 1, 1), None)]
+
+
+def test_mes_archivado_en_medio():
+    assert _tramos(date(2024, 1, 1), date(2024, 6, 1), [(date(2024, 3, 1), "marzo")]) == [
+        (date(2024, 1, 1), date(2024, 3, 1), None),
+        (date(2024, 3, 1), date(2024, 4, 1), "marzo"),
+        (date(2024, 4, 1), date(2024, 6, 1), None),
+    ]
+
+
+def test_meses_archivados_en_los_bordes():
+    archivados = [(date(2024, 1, 1), "enero"), (date(2024, 5, 1), "mayo")]
+
+    assert _tramos(date(2024, 1, 1), date(2024, 6, 1), archivados) == [
+        (date(2024, 1, 1), date(2024, 2, 1), "enero"),
+        (date(2024, 2, 1), date(2024, 5, 1), None),
+        (date(2024, 5, 1), date(2024, 6, 1), "mayo"),
+    ]
+
+
+def test_meses_archivados_consecutivos():
+    archivados = [(date(2024, 2, 1), "febrero"), (date(2024, 3, 1), "marzo")]
+
+    assert _tramos(date(2024, 1, 1), date(2024, 5, 1), archivados) == [
+        (date(2024, 1, 1), date(2024, 2, 1), None),
+        (date(2024, 2, 1), date(2024, 3, 1), "febrero"),
+        (date(2024, 3, 1), date(2024, 4, 1), "marzo"),
+        (date(2024, 4, 1), date(2024, 5, 1), None),
+    ]
+
+
+def test_rango_dentro_de_un_mes_archivado():
+    # MESES_ARCHIVADOS trae el mes aunque el período empiece a mitad de mes
+    assert _tramos(date(2024, 3, 10), date(2024, 3, 20), [(date(2024, 3, 1), "marzo")]) == [
+        (date(2024, 3, 10), date(2024, 3, 20), "marzo"),
+    ]
+
+
+def test_rango_completamente_archivado():
+    archivados = [(date(2023, mes, 1), f"{mes}") for mes in range(1, 13)]
+
+    tramos = _tramos(date(2023, 1, 1), date(2024, 1, 1), archivados)
+
+    assert all(archivo is not None for _, _, archivo in tramos)
+    assert tramos[0][0] == date(2023, 1, 1) and tramos[-1][1] == date(2024, 1, 1)
+    assert all(anterior[1] == siguiente[0] for anterior, siguiente in zip(tramos, tramos[1:]))
+
+
+def test_diciembre_archivado_cierra_en_enero():
+    assert _tramos(date(2023, 12, 1), date(2024, 2, 1), [(date(2023, 12, 1), "diciembre")]) == [
+        (date(2023, 12, 1), date(2024, 1, 1), "diciembre"),
+        (date(2024, 1, 1), date(2024, 2, 1), None),
+    ]
@@ -0,0 +1,97 @@
+import pandas as pd
+
+import importar
+
+
+def _csv(filas):
+    # Como lo lee leer_lotes: todo texto y las celdas vacías como ""
+    return pd.DataFrame(filas, dtype=str).fillna("")
+
+
+def test_coma_decimal_y_separador_de_miles():
+    validas, rechazadas = importar.preparar_ventas(_csv([
+        {"fecha": "2024-05-10", "monto": "$ 1.234,50", "metodo_pago": "Mercado Pago", "sucursal": "Centro"},
+    ]), decimal=",")
+
+    assert rechazadas.empty
+    assert validas["monto"].tolist() == [1234.5]
+
+
+def test_punto_decimal_por_defecto():
+    validas, _ = importar.preparar_ventas(_csv([
+        {"fecha": "2024-05-10", "monto": "1234.50", "metodo_pago": "Cuenta DNI", "sucursal": "Centro"},
+    ]))
+
+    assert validas["monto"].tolist() == [1234.5]
+
+
+def test_fecha_con_dia_primero():
+    filas = [{"fecha": "03/04/2024 10:30", "monto": "10", "metodo_pago": "Efectivo", "sucursal": "Centro"}]
+
+    dia_primero, _ = importar.preparar_ventas(_csv(filas), dia_primero=True)
+    mes_primero, _ = importar.preparar_ventas(_csv(filas))
+
+    assert dia_primero["fecha"].tolist() == [pd.Timestamp(2024, 4, 3, 10, 30)]
+    assert mes_primero["fecha"].tolist() == [pd.Timestamp(2024, 3, 4, 10, 30)]
+
+
+def test_rechaza_metodo_desconocido_y_datos_invalidos():
+    validas, rechazadas = importar.preparar_ventas(_csv([
+        {"fecha": "2024-05-10", "monto": "10", "metodo_pago": "Cheque", "sucursal": "Centro"},
+        {"fecha": "no es fecha", "monto": "10", "metodo_pago": "Efectivo", "sucursal": "Centro"},
+        {"fecha": "2024-05-10", "monto": "0", "metodo_pago": "Efectivo", "sucursal": "Centro"},
+        {"fecha": "2024-05-10", "monto": "10", "metodo_pago": "Efectivo", "sucursal": ""},
+        {"fecha": "2024-05-10", "monto": "10", "metodo_pago": "Efectivo", "sucursal": "Centro", "entregado": "5"},
+        {"fecha": "2024-05-10", "monto": "10", "metodo_pago": "Fiado", "sucursal": "Centro"},
+    ]))
+
+    assert validas.empty
+    assert rechazadas["error"].tolist() == [
+        "método de pago desconocido",
+        "fecha inválida",
+        "el monto debe ser mayor a 0",
+        "falta la sucursal",
+        "el dinero entregado es menor al monto",
+        "falta el cliente de la venta fiada",
+    ]
+
+
+def test_importes_segun_metodo_de_pago():
+    validas, rechazadas = importar.preparar_ventas(_csv([
+        {"fecha": "2024-05-10", "monto": "80", "metodo_pago": "Efectivo", "entregado": "100"},
+        {"fecha": "2024-05-10", "monto": "80", "metodo_pago": "Efectivo", "entregado": ""},
+        {"fecha": "2024-05-10", "monto": "80", "metodo_pago": "Mercado Pago", "entregado": "100"},
+        {"fecha": "2024-05-10", "monto": "80", "metodo_pago": "Fiado", "entregado": "100",
+         "cliente_fiado": " Ana ", "telefono_fiado": "11 4455"},
+    ]), sucursal="Centro")
+
+    assert rechazadas.empty
+    assert validas["sucursal"].tolist() == ["Centro"] * 4
+    assert validas["entregado"].tolist() == [100.0, 80.0, 80.0, 0.0]
+    assert validas["vuelto"].tolist() == [20.0, 0.0, 0.0, 0.0]
+    assert validas["ingreso"].tolist() == [80.0, 80.0, 80.0, 0.0]
+    assert validas["deuda"].tolist() == [0.0, 0.0, 0.0, 80.0]
+    assert validas["cliente_fiado"].tolist() == [None, None, None, "Ana"]
+    assert validas["telefono_fiado"].tolist() == [None, None, None, "11 4455"]
+
+
+def test_sucursal_del_archivo_tiene_prioridad():
+    validas, _ = importar.preparar_ventas(_csv([
+        {"fecha": "2024-05-10", "monto": "10", "metodo_pago": "Efectivo", "sucursal": "Norte"},
+        {"fecha": "2024-05-10", "monto": "10", "metodo_pago": "Efectivo", "sucursal": ""},
+    ]), sucursal="Centro")
+
+    assert validas["sucursal"].tolist() == ["Norte", "Centro"]
+
+
+def test_egresos():
+    validas, rechazadas = importar.preparar_egresos(_csv([
+        {"Fecha": "10/05/2024", "Monto": "1.500,00", "Motivo": " Proveedores ", "Observacion": ""},
+        {"Fecha": "10/05/2024", "Monto": "100", "Motivo": ""},
+    ]), sucursal="Centro", dia_primero=True, decimal=",")
+
+    assert validas["monto"].tolist() == [1500.0]
+    assert validas["fecha"].tolist() == [pd.Timestamp(2024, 5, 10)]
+    assert validas["motivo"].tolist() == ["Proveedores"]
+    assert validas["observacion"].tolist() == [None]
+    assert rechazadas["error"].tolist() == ["falta el motivo"]
@@ -0,0 +1,44 @@
+from migrar import _sentencias
+
+MIGRACION = """-- migrar: sin transaccion
+-- Comentario de cabecera; con punto y coma
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_a ON ventas (fecha);
+
+-- El bloque DO tiene ';' al final de varias líneas
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    END IF;
+END;
+$$;
+CREATE FUNCTION f() RETURNS int AS $cuerpo$
+    SELECT 1; -- adentro de la función
+$cuerpo$ LANGUAGE sql;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_b
+    -- comentario en medio de la sentencia;
+    ON egresos (fecha);
+"""
+
+
+def test_separa_sentencias_sin_cortar_bloques_ni_comentarios():
+    sentencias = _sentencias(MIGRACION)
+
+    assert [s.strip().splitlines()[0] for s in sentencias] == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_a ON ventas (fecha);",
+        "DO $$",
+        "CREATE FUNCTION f() RETURNS int AS $cuerpo$",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_b",
+    ]
+    assert sentencias[1].rstrip().endswith("$$;")
+    assert "CREATE EXTENSION IF NOT EXISTS pg_trgm;" in sentencias[1]
+    assert sentencias[2].rstrip().endswith("$cuerpo$ LANGUAGE sql;")
+    assert sentencias[3].rstrip().endswith("ON egresos (fecha);")
+
+
+def test_sentencia_final_sin_punto_y_coma():
+    assert _sentencias("SELECT 1;\nSELECT 2\n") == ["SELECT 1;", "SELECT 2"]
+
+
+def test_solo_comentarios():
+    assert _sentencias("-- migrar: sin transaccion\n-- nada más;\n") == []
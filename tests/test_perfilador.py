@@ -0,0 +1,42 @@
+import pytest
+
+import perfilador
+from perfilador import es_lectura, huella
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT fecha, monto FROM ventas WHERE sucursal = %(sucursal)s",
+    "WITH t AS (SELECT 1) SELECT * FROM t",
+    "SELECT COUNT(*) FROM clientes WHERE nombre_normalizado LIKE 'a%'",
+])
+def test_lecturas(sql):
+    assert es_lectura(huella(sql))
+
+
+@pytest.mark.parametrize("sql", [
+    "INSERT INTO ventas (monto) VALUES (1)",
+    "WITH n AS (INSERT INTO ventas (monto) VALUES (1) RETURNING id) SELECT id FROM n",
+    "SELECT recalcular_resumenes(%s, %s)",
+    "SELECT id FROM cierres WHERE sucursal = %s FOR UPDATE",
+    "SELECT id FROM cierres WHERE sucursal = %s FOR NO KEY UPDATE",
+    "SELECT id FROM cierres WHERE sucursal = %s FOR SHARE",
+    "select id from cierres for key share skip locked",
+])
+def test_no_lecturas(sql):
+    assert not es_lectura(huella(sql))
+
+
+def test_explain_una_vez_por_intervalo():
+    perfil = perfilador.Perfilador()
+    sql = huella("SELECT * FROM ventas")
+    lenta = perfilador.PERFIL_UMBRAL_MS + 1
+
+    perfil.registrar(sql, lenta, 1)
+
+    assert not perfil.pedir_explain(sql, perfilador.PERFIL_UMBRAL_MS - 1)
+    assert perfil.pedir_explain(sql, lenta)
+    assert not perfil.pedir_explain(sql, lenta)
+
+
+def test_sin_explain_para_huellas_no_registradas():
+    assert not perfilador.Perfilador().pedir_explain(huella("SELECT * FROM ventas"), 10 ** 6)